@@ -5,6 +5,7 @@ import streamlit as st
 import json
 import tempfile
 import os
+import time
 from pathlib import Path
 import cv2
 import numpy as np
@@ -13,10 +14,18 @@ import plotly.express as px
 import plotly.graph_objects as go
 
 # Import our modules
-from fp2layout import detect_layout
+from fp2layout import detect_layout, reocr_region
 from zhongxuan_scorer import score_layout
 from locales import get_texts, get_language_options
 
+# Optional: draw the correction box on the plan (falls back to numeric inputs)
+try:
+    from streamlit_cropper import st_cropper
+
+    CROPPER_AVAILABLE = True
+except ImportError:
+    CROPPER_AVAILABLE = False
+
 # Page configuration
 st.set_page_config(
     page_title="房屋布局评分系统",
@@ -231,6 +240,10 @@ def main():
                         # Clean up temp file
                         os.unlink(temp_path)
 
+            # Region correction: re-OCR a user-selected box only
+            if st.session_state.get("analysis_done", False):
+                display_region_correction(image, house_facing, texts)
+
     with col2:
         st.header(texts["results_section"])
 
@@ -257,6 +270,76 @@ def main():
                 st.markdown(f"- **{description}**")
 
 
+def display_region_correction(image, house_facing, texts):
+    """Re-OCR a user-selected region and merge it into the current layout"""
+    with st.expander(texts["region_correction"]):
+        st.caption(texts["region_correction_help"])
+
+        img_bgr = cv2.cvtColor(np.array(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+        H, W = img_bgr.shape[:2]
+
+        if CROPPER_AVAILABLE:
+            # Drag/resize the box on the plan; the box comes back in image pixels
+            st.caption(texts["region_draw_help"])
+            box = st_cropper(
+                image.convert("RGB"),
+                realtime_update=True,
+                box_color="#FF0000",
+                return_type="box",
+                key="region_box",
+            )
+            x, y = int(box["left"]), int(box["top"])
+            w, h = max(2, int(box["width"])), max(2, int(box["height"]))
+        else:
+            x, y, w, h = region_inputs(W, H, texts)
+
+            # Draw the selected box on a preview copy
+            preview = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+            cv2.rectangle(
+                preview, (x, y), (x + w, y + h), (255, 0, 0), max(2, W // 300)
+            )
+            st.image(
+                preview, caption=texts["region_preview_caption"], use_column_width=True
+            )
+
+        if st.button(texts["region_reocr_button"], use_container_width=True):
+            with st.spinner(texts["analyzing_text"]):
+                try:
+                    t0 = time.perf_counter()
+                    layout_data = reocr_region(
+                        img_bgr,
+                        (x, y, w, h),
+                        st.session_state.layout_data,
+                        house_facing,
+                    )
+                    score_data = score_layout(
+                        layout_data,
+                        st.session_state.hemisphere,
+                        st.session_state.language,
+                    )
+                    st.session_state.layout_data = layout_data
+                    st.session_state.score_data = score_data
+
+                    st.success(
+                        texts["region_reocr_success"].format(
+                            count=len(layout_data["rooms"]),
+                            seconds=time.perf_counter() - t0,
+                        )
+                    )
+                except Exception as e:
+                    st.error(f"{texts['analysis_error']}: {str(e)}")
+
+
+def region_inputs(W, H, texts):
+    """Numeric box inputs, used when streamlit-cropper is not installed"""
+    c1, c2 = st.columns(2)
+    x = int(c1.number_input(texts["region_x"], 0, W - 1, 0, step=10))
+    y = int(c2.number_input(texts["region_y"], 0, H - 1, 0, step=10))
+    w = int(c1.number_input(texts["region_width"], 2, W, min(W, 200), step=10))
+    h = int(c2.number_input(texts["region_height"], 2, H, min(H, 100), step=10))
+    return x, y, w, h
+
+
 def display_score_card(score_data, texts):
     """Display the main score card"""
     total = score_data["total"]
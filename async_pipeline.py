@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量分析流水线（asyncio）
+Asyncio batch pipeline: read -> decode/preprocess -> OCR -> layout + score.
+
+各阶段由有界队列连接、各自独立并发：读文件用 I/O 线程池，解码与预处理
+用 CPU 线程池（OpenCV 会释放 GIL），OCR 用进程池（预处理结果经共享内存
+传递，见 shm_transfer），解析与评分直接在事件循环上运行。下游变慢时队列写满，上游自然停下（背压），内存占用有上限。
+单张图片失败只记录在该图的结果里，不影响其他图片。
+
+识别流程与 fp2layout.detect_layout 的默认设置相同（外框裁剪、自动选择
+预处理配置、整页转正、缺关键标签时升级补识别、房间分割，见
+fp2layout.recognize_lines），同一张图得到同样的 layout；唯一的区别是
+没有标签模板库（fp2layout --templates）。
+
+    python async_pipeline.py plans/*.png --north-deg 0 --out results.jsonl
+    python async_pipeline.py plans/*.png --ocr-workers 4 --queue-size 8
+
+    results = asyncio.run(analyze_batch(paths, north_deg=0.0))
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Union
+
+import fp2layout
+from pipeline_metrics import (
+    ANALYSES_COMPLETED,
+    ANALYSES_FAILED,
+    ANALYSES_STARTED,
+    observe_stages,
+)
+from ocr_models import ModelBundleError
+from room_regions import annotate_palace_area, segment_rooms
+from shm_transfer import ShmRing, ocr_from_shm
+from vector_plans import is_vector_plan, read_vector_plan
+from zhongxuan_scorer import score_layout
+
+_STOP = object()
+
+
+@dataclass
+class PipelineResult:
+    """单张图片的处理结果；error 非空时 layout/score 可能为 None"""
+
+    index: int
+    source: str
+    north_deg: float
+    house_facing: Optional[str] = None
+    layout: Optional[Dict] = None
+    score: Optional[Dict] = None
+    error: Optional[str] = None
+    stages: Dict[str, float] = field(default_factory=dict)  # 各阶段耗时（ms）
+    # 阶段之间传递的中间数据，不对外输出
+    _data: Optional[bytes] = field(default=None, repr=False)
+    _gray: object = field(default=None, repr=False)
+    _prep: object = field(default=None, repr=False)
+    _profile: str = field(default="balanced", repr=False)
+    _size: tuple = field(default=(0, 0), repr=False)
+    _scale: tuple = field(default=(1.0, 1.0, 0, 0), repr=False)
+    _frame: Optional[List[int]] = field(default=None, repr=False)
+    _rooms: object = field(default=None, repr=False)
+    _lines: Optional[List[Dict]] = field(default=None, repr=False)
+
+    def as_dict(self) -> Dict:
+        return {
+            "source": self.source,
+            "layout": self.layout,
+            "score": self.score,
+            "error": self.error,
+            "stages": self.stages,
+        }
+
+
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def decode_and_preprocess(data: bytes):
+    """
+    灰度（必要时降采样）解码 + 裁剪到平面外框 + 房间分割 + 预处理。
+    返回 (灰度图, 二值图, 预处理配置, 原图 (W, H), 坐标映射 (sx, sy, dx, dy),
+    外框或 None, RoomRaster)
+    """
+    img, (W, H) = fp2layout.load_gray(data)
+    sx, sy = W / img.shape[1], H / img.shape[0]
+    img, (dx, dy), frame = fp2layout.crop_to_footprint(img, sx, sy)
+    rooms = segment_rooms(img, frame or (0, 0, W, H), (dx, dy), sx, sy)
+    profile = fp2layout.choose_profile(fp2layout.probe_quality(img))
+    prep = fp2layout.preprocess_for_ocr(img, profile)
+    return img, prep, profile, (W, H), (sx, sy, dx, dy), frame, rooms
+
+
+def run_ocr(gray, prep, profile: str, need_facing: bool) -> List[Dict]:
+    # 运行时再取 fp2layout.ocr_lines，便于测试替换
+    return fp2layout.recognize_lines(gray, prep, profile, need_facing)
+
+
+class AsyncPipeline:
+    """
+    io_workers：并发读文件数；cpu_workers：并发解码/预处理数；
+    ocr_workers：OCR 进程数（executor="thread" 时为线程）；
+    queue_size：每个阶段之间最多缓冲的图片数；
+    shared_memory：进程池模式下经共享内存把预处理结果传给 OCR 进程（不 pickle）；
+    vocabulary：OCR 工作者的受限识别模式（见 fp2layout.set_ocr_vocabulary）；
+    model_dir：OCR 工作者加载模型的离线模型包（见 fp2layout.set_ocr_model_dir）。
+    """
+
+    def __init__(
+        self,
+        io_workers: int = 4,
+        cpu_workers: Optional[int] = None,
+        ocr_workers: int = 2,
+        queue_size: int = 4,
+        executor: str = "process",
+        hemisphere: str = "northern",
+        language: str = "zh",
+        score: bool = True,
+        shared_memory: bool = True,
+        vocabulary: str = "off",
+        model_dir: Optional[str] = None,
+    ):
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers or max(1, (os.cpu_count() or 2) // 2)
+        self.ocr_workers = ocr_workers
+        self.queue_size = queue_size
+        self.executor_kind = executor
+        self.hemisphere = hemisphere
+        self.language = language
+        self.score = score
+        self.use_shm = shared_memory and executor == "process"
+        self.vocabulary = vocabulary
+        self.model_dir = model_dir
+        self._ring: Optional[ShmRing] = None
+        self._io_pool: Optional[Executor] = None
+        self._cpu_pool: Optional[Executor] = None
+        self._ocr_pool: Optional[Executor] = None
+
+    def __enter__(self) -> "AsyncPipeline":
+        self._io_pool = ThreadPoolExecutor(self.io_workers, "pipeline-io")
+        self._cpu_pool = ThreadPoolExecutor(self.cpu_workers, "pipeline-cpu")
+        if self.executor_kind == "process":
+            self._ocr_pool = ProcessPoolExecutor(
+                max_workers=self.ocr_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=functools.partial(
+                    fp2layout.warm_up, self.vocabulary, self.model_dir
+                ),
+            )
+            if self.use_shm:
+                # 每个 OCR 协程同时最多占用一个块
+                self._ring = ShmRing(slots=self.ocr_workers)
+        else:
+            self._ocr_pool = ThreadPoolExecutor(
+                self.ocr_workers,
+                "pipeline-ocr",
+                initializer=functools.partial(
+                    fp2layout.warm_up, self.vocabulary, self.model_dir
+                ),
+            )
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for pool in (self._io_pool, self._cpu_pool, self._ocr_pool):
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+        self._io_pool = self._cpu_pool = self._ocr_pool = None
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+    # ---- 各阶段 ----
+
+    async def _read(self, job: PipelineResult) -> None:
+        if job._data is None:
+            loop = asyncio.get_running_loop()
+            job._data = await loop.run_in_executor(
+                self._io_pool, read_bytes, job.source
+            )
+
+    async def _preprocess(self, job: PipelineResult) -> None:
+        loop = asyncio.get_running_loop()
+        if is_vector_plan(job._data):
+            # 矢量平面图直接读出文本行，后面跳过 OCR 与房间分割
+            plan = await loop.run_in_executor(
+                self._cpu_pool, read_vector_plan, job._data
+            )
+            job._lines, job._size, job._frame = plan.lines, plan.size, plan.frame
+            job._data = None
+            return
+        (
+            job._gray,
+            job._prep,
+            job._profile,
+            job._size,
+            job._scale,
+            job._frame,
+            job._rooms,
+        ) = await loop.run_in_executor(self._cpu_pool, decode_and_preprocess, job._data)
+        job._data = None
+
+    async def _ocr(self, job: PipelineResult) -> None:
+        if job._lines is not None:
+            return
+        loop = asyncio.get_running_loop()
+        need_facing = not job.house_facing
+        if self._ring is None:
+            job._lines = await loop.run_in_executor(
+                self._ocr_pool, run_ocr, job._gray, job._prep, job._profile, need_facing
+            )
+        else:
+            # 灰度图与二值图同尺寸，直接写进同一块的两层
+            handle = await loop.run_in_executor(
+                self._cpu_pool, self._ring.put_stack, (job._gray, job._prep)
+            )
+            try:
+                job._lines = await loop.run_in_executor(
+                    self._ocr_pool, ocr_from_shm, handle, job._profile, need_facing
+                )
+            finally:
+                self._ring.release(handle)
+        job._gray = job._prep = None
+
+    async def _finish(self, job: PipelineResult) -> None:
+        W, H = job._size
+        lines = fp2layout.scale_lines(job._lines, *job._scale)
+        job.layout = fp2layout.assemble_layout(
+            lines, W, H, job.north_deg, job.house_facing, frame=job._frame
+        )
+        if job._rooms is not None:
+            annotate_palace_area(job.layout["rooms"], job._rooms, job.north_deg)
+        job._lines = job._rooms = None
+        if self.score and job.layout["house_facing"]:
+            job.score = score_layout(job.layout, self.hemisphere, self.language)
+
+    async def _stage(self, name, fn, inq, outq, concurrency, n_down) -> None:
+        async def worker():
+            while True:
+                job = await inq.get()
+                if job is _STOP:
+                    return
+                if job.error is None:
+                    t0 = time.perf_counter()
+                    try:
+                        await fn(job)
+                    except Exception as e:
+                        job.error = f"{type(e).__name__}: {e}"
+                        ANALYSES_FAILED.labels(reason=type(e).__name__).inc()
+                    job.stages[name] = round((time.perf_counter() - t0) * 1000.0, 3)
+                await outq.put(job)
+
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        for _ in range(n_down):
+            await outq.put(_STOP)
+
+    # ---- 对外接口 ----
+
+    async def run(
+        self,
+        sources: Iterable[Union[str, bytes]],
+        north_deg: float = 0.0,
+        house_facing: Optional[str] = None,
+    ) -> AsyncIterator[PipelineResult]:
+        """按完成顺序逐个产出结果（result.index 为输入顺序）"""
+        if self._ocr_pool is None:
+            raise RuntimeError("use AsyncPipeline inside a 'with' block")
+        qsize = self.queue_size
+        q_read, q_prep, q_ocr, q_fin, q_out = (asyncio.Queue(qsize) for _ in range(5))
+
+        async def feed():
+            for i, src in enumerate(sources):
+                job = PipelineResult(i, "<bytes>", north_deg, house_facing)
+                if isinstance(src, (bytes, bytearray, memoryview)):
+                    job._data = bytes(src)
+                else:
+                    job.source = str(src)
+                ANALYSES_STARTED.inc()
+                await q_read.put(job)
+            for _ in range(self.io_workers):
+                await q_read.put(_STOP)
+
+        tasks = [
+            asyncio.ensure_future(feed()),
+            asyncio.ensure_future(
+                self._stage(
+                    "imread",
+                    self._read,
+                    q_read,
+                    q_prep,
+                    self.io_workers,
+                    self.cpu_workers,
+                )
+            ),
+            asyncio.ensure_future(
+                self._stage(
+                    "preprocess",
+                    self._preprocess,
+                    q_prep,
+                    q_ocr,
+                    self.cpu_workers,
+                    self.ocr_workers,
+                )
+            ),
+            asyncio.ensure_future(
+                self._stage("ocr", self._ocr, q_ocr, q_fin, self.ocr_workers, 1)
+            ),
+            asyncio.ensure_future(
+                self._stage("layout", self._finish, q_fin, q_out, 1, 1)
+            ),
+        ]
+        try:
+            while True:
+                job = await q_out.get()
+                if job is _STOP:
+                    break
+                if job.error is None:
+                    ANALYSES_COMPLETED.inc()
+                    observe_stages({k: {"wall_ms": v} for k, v in job.stages.items()})
+                yield job
+            await asyncio.gather(*tasks)
+        finally:
+            # 调用方提前退出时取消剩余阶段
+            for t in tasks:
+                t.cancel()
+
+
+async def analyze_batch(
+    sources: Iterable[Union[str, bytes]],
+    north_deg: float = 0.0,
+    house_facing: Optional[str] = None,
+    **pipeline_kwargs,
+) -> List[PipelineResult]:
+    """一次性处理整批图片，按输入顺序返回"""
+    with AsyncPipeline(**pipeline_kwargs) as pipe:
+        results = [r async for r in pipe.run(sources, north_deg, house_facing)]
+    return sorted(results, key=lambda r: r.index)
+
+
+async def _main(args) -> int:
+    kwargs = dict(
+        io_workers=args.io_workers,
+        cpu_workers=args.cpu_workers,
+        ocr_workers=args.ocr_workers,
+        queue_size=args.queue_size,
+        executor=args.executor,
+        hemisphere=args.hemisphere,
+        language=args.language,
+        shared_memory=not args.no_shm,
+        vocabulary=args.vocabulary,
+        model_dir=fp2layout.OCR_MODEL_DIR,
+    )
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    failed = 0
+    t0 = time.perf_counter()
+    try:
+        with AsyncPipeline(**kwargs) as pipe:
+            async for r in pipe.run(args.images, args.north_deg, args.house_facing):
+                failed += r.error is not None
+                out.write(json.dumps(r.as_dict(), ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - t0
+    print(
+        f"[ok] {len(args.images)} images in {elapsed:.2f}s "
+        f"({len(args.images) / elapsed:.2f} img/s), {failed} failed",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Batch floorplan analysis pipeline (same recognition as "
+        "fp2layout.py, without --templates)"
+    )
+    ap.add_argument("images", nargs="+")
+    ap.add_argument("--north-deg", type=float, default=0.0)
+    ap.add_argument("--house-facing", choices=sorted(fp2layout.ALLOWED_FACING))
+    ap.add_argument(
+        "--hemisphere", choices=["northern", "southern"], default="northern"
+    )
+    ap.add_argument("--language", choices=["zh", "en"], default="zh")
+    ap.add_argument("--io-workers", type=int, default=4)
+    ap.add_argument("--cpu-workers", type=int, default=None)
+    ap.add_argument("--ocr-workers", type=int, default=2)
+    ap.add_argument("--queue-size", type=int, default=4)
+    ap.add_argument("--executor", choices=["process", "thread"], default="process")
+    ap.add_argument(
+        "--no-shm", action="store_true", help="pickle images to OCR workers instead"
+    )
+    ap.add_argument(
+        "--vocabulary",
+        choices=fp2layout.OCR_VOCABULARY_MODES,
+        default="off",
+        help="constrain recognition to the room vocabulary (see fp2layout --vocabulary)",
+    )
+    ap.add_argument(
+        "--model-dir",
+        default=fp2layout.OCR_MODEL_DIR,
+        help="offline OCR model bundle (see ocr_models.py)",
+    )
+    ap.add_argument("--out", help="write JSONL results here (default: stdout)")
+    args = ap.parse_args()
+    try:
+        fp2layout.set_ocr_model_dir(args.model_dir)
+    except ModelBundleError as e:
+        ap.exit(2, f"[error] {e}\n")
+    sys.exit(asyncio.run(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
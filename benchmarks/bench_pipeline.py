@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+端到端基准：detect_layout -> score_layout
+End-to-end benchmark of detect_layout -> score_layout on synthetic plans.
+
+报告吞吐量、各阶段延迟分位数、峰值内存，以及相对真值的标签召回率、
+精确率和九宫准确率。使用 fp2layout 当前可用的 OCR 引擎（EasyOCR 或
+Tesseract），无需联网。
+
+    python -m benchmarks.bench_pipeline --sizes 800x600 1600x1200 --per-size 3
+    python -m benchmarks.bench_pipeline --corpus-dir synth --out bench.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from benchmarks.synth_floorplan import DEFAULT_SIZES, generate_corpus, parse_size
+from fp2layout import OCR_ENGINE_NAME, detect_layout
+from zhongxuan_scorer import score_layout
+
+
+def percentiles(values: Sequence[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    arr = np.asarray(values, dtype=np.float64)
+    return {
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p90": round(float(np.percentile(arr, 90)), 3),
+        "p99": round(float(np.percentile(arr, 99)), 3),
+        "mean": round(float(arr.mean()), 3),
+    }
+
+
+def match_labels(truth_labels: List[Dict], rooms: List[Dict]) -> Dict[str, int]:
+    """
+    按归一化类型 + 中心落入真值框（放宽一半）做一对一匹配。
+    Greedy one-to-one matching on label type and box center.
+    """
+    used = set()
+    matched = palace_ok = 0
+    for gt in truth_labels:
+        l, t, w, h = gt["bbox"]
+        for i, r in enumerate(rooms):
+            if i in used or r["norm_label"] != gt["norm_label"]:
+                continue
+            rl, rt, rw, rh = r["bbox"]
+            cx, cy = rl + rw / 2.0, rt + rh / 2.0
+            if l - w / 2 <= cx <= l + 1.5 * w and t - h / 2 <= cy <= t + 1.5 * h:
+                used.add(i)
+                matched += 1
+                palace_ok += int(r["palace9"] == gt["palace9"])
+                break
+    return {
+        "truth": len(truth_labels),
+        "detected": len(rooms),
+        "matched": matched,
+        "palace_ok": palace_ok,
+    }
+
+
+def iter_cases(args) -> List[Tuple[str, Dict]]:
+    """返回 (图片路径, 真值) 列表；未指定语料目录时生成到临时目录"""
+    if args.corpus_dir and os.path.exists(
+        os.path.join(args.corpus_dir, "manifest.json")
+    ):
+        with open(
+            os.path.join(args.corpus_dir, "manifest.json"), encoding="utf-8"
+        ) as f:
+            return [(m["image"], m["truth"]) for m in json.load(f)]
+
+    out_dir = args.corpus_dir or os.path.join(
+        os.environ.get("TMPDIR", "/tmp"), "fengshui_synth"
+    )
+    manifest = generate_corpus(
+        out_dir, args.sizes, args.per_size, args.seed, args.north_deg
+    )
+    return [(m["image"], m["truth"]) for m in manifest]
+
+
+def analyze(path: str, north_deg: float, detect_kwargs: Dict) -> Dict:
+    layout = detect_layout(path, north_deg, metrics=True, **detect_kwargs)
+    if layout["house_facing"]:
+        layout["score"] = score_layout(layout, metrics=True)
+    return layout
+
+
+def peak_memory(cases: List[Tuple[str, Dict]], detect_kwargs: Dict) -> int:
+    """
+    单独一轮（不计时）测 Python 堆峰值：tracemalloc 跟踪每次分配，
+    开着它计时会明显拖慢延迟和吞吐量
+    """
+    peaks = []
+    for path, truth in cases:
+        tracemalloc.start()
+        analyze(path, truth["north_deg"], detect_kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+    return max(peaks, default=0)
+
+
+def run_benchmark(
+    cases: List[Tuple[str, Dict]], detect_kwargs=None, memory: bool = True
+) -> Dict:
+    detect_kwargs = detect_kwargs or {}
+    stage_ms = defaultdict(list)
+    per_size = defaultdict(lambda: defaultdict(int))
+    totals_ms = []
+
+    # 预热：首次调用会加载 OCR 模型，不计入统计
+    if cases:
+        detect_layout(cases[0][0], cases[0][1]["north_deg"], **detect_kwargs)
+
+    t_start = time.perf_counter()
+    for path, truth in cases:
+        t0 = time.perf_counter()
+        layout = analyze(path, truth["north_deg"], detect_kwargs)
+        totals_ms.append((time.perf_counter() - t0) * 1000.0)
+        if "score" in layout:
+            stage_ms["score"].append(layout["score"]["metrics"]["total_wall_ms"])
+
+        for name, st in layout["metrics"]["stages"].items():
+            stage_ms[name].append(st["wall_ms"])
+        size = f"{truth['image_size']['width']}x{truth['image_size']['height']}"
+        for k, v in match_labels(truth["labels"], layout["rooms"]).items():
+            per_size[size][k] += v
+        per_size[size]["images"] += 1
+    elapsed = time.perf_counter() - t_start
+    peak = peak_memory(cases, detect_kwargs) if memory else 0
+
+    accuracy = {}
+    for size, c in per_size.items():
+        accuracy[size] = {
+            "images": c["images"],
+            "recall": round(c["matched"] / max(1, c["truth"]), 4),
+            "precision": round(c["matched"] / max(1, c["detected"]), 4),
+            "palace_accuracy": round(c["palace_ok"] / max(1, c["matched"]), 4),
+        }
+
+    return {
+        "ocr_engine": OCR_ENGINE_NAME,
+        "images": len(cases),
+        "throughput_img_per_s": round(len(cases) / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": percentiles(totals_ms),
+        "stage_latency_ms": {k: percentiles(v) for k, v in stage_ms.items()},
+        "peak_traced_mb": round(peak / 2**20, 2) if memory else None,
+        "max_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1
+        ),
+        "accuracy": accuracy,
+    }
+
+
+def print_report(report: Dict) -> None:
+    print(f"OCR engine: {report['ocr_engine']}  images: {report['images']}")
+    print(f"throughput: {report['throughput_img_per_s']} img/s")
+    print(f"latency ms: {report['latency_ms']}")
+    peak = report["peak_traced_mb"]
+    peak = "n/a" if peak is None else f"{peak} MB"
+    print(f"peak traced: {peak}  max RSS: {report['max_rss_mb']} MB")
+    print(f"{'stage':<12}{'p50':>10}{'p90':>10}{'p99':>10}")
+    for name, p in report["stage_latency_ms"].items():
+        print(f"{name:<12}{p['p50']:>10}{p['p90']:>10}{p['p99']:>10}")
+    print(f"{'size':<12}{'recall':>10}{'precision':>11}{'palace':>10}")
+    for size, a in report["accuracy"].items():
+        print(
+            f"{size:<12}{a['recall']:>10}{a['precision']:>11}{a['palace_accuracy']:>10}"
+        )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="End-to-end pipeline benchmark")
+    ap.add_argument("--corpus-dir", help="reuse/generate plans in this directory")
+    ap.add_argument("--sizes", nargs="+", type=parse_size, default=list(DEFAULT_SIZES))
+    ap.add_argument("--per-size", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--north-deg", type=float, default=0.0)
+    ap.add_argument("--out", help="write the JSON report here")
+    ap.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="skip the extra untimed pass that measures peak traced memory",
+    )
+    args = ap.parse_args()
+
+    cases = iter_cases(args)
+    report = run_benchmark(cases, memory=not args.no_memory)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[ok] saved: {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+预处理配置基准：延迟 vs 召回
+Preprocessing profile benchmark: latency vs label recall.
+
+在合成语料（干净图 + 扫描风格副本）上分别用 fast / balanced / scan / auto
+预处理，报告预处理耗时分位数，以及 OCR 后相对真值的召回率与精确率。
+auto 的耗时包含质量探测，并统计每类图被选中的配置。
+
+    python -m benchmarks.bench_preprocess --sizes 800x600 1600x1200 --per-size 3
+    python -m benchmarks.bench_preprocess --no-ocr   # 只测预处理耗时
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence
+
+from benchmarks.bench_pipeline import match_labels, percentiles
+from benchmarks.synth_floorplan import DEFAULT_SIZES, generate_corpus, parse_size
+from fp2layout import (
+    PREPROCESS_PROFILES,
+    assemble_layout,
+    choose_profile,
+    load_gray,
+    ocr_lines,
+    preprocess_for_ocr,
+    probe_quality,
+    scale_lines,
+)
+
+PROFILES = list(PREPROCESS_PROFILES) + ["auto"]
+
+
+def run(manifest: List[Dict], profiles: Sequence[str], ocr: bool) -> Dict:
+    lat = defaultdict(list)
+    counts = defaultdict(lambda: defaultdict(int))
+    chosen = defaultdict(Counter)
+
+    for case in manifest:
+        variant = case.get("variant", "clean")
+        truth = case["truth"]
+        gray, (W, H) = load_gray(case["image"])
+        sx, sy = W / gray.shape[1], H / gray.shape[0]
+        for profile in profiles:
+            t0 = time.perf_counter()
+            name = profile
+            if profile == "auto":
+                name = choose_profile(probe_quality(gray))
+                chosen[variant][name] += 1
+            prep = preprocess_for_ocr(gray, name)
+            key = f"{variant}/{profile}"
+            lat[key].append((time.perf_counter() - t0) * 1000.0)
+            if not ocr:
+                continue
+            lines = scale_lines(ocr_lines(prep), sx, sy)
+            layout = assemble_layout(lines, W, H, truth["north_deg"])
+            for k, v in match_labels(truth["labels"], layout["rooms"]).items():
+                counts[key][k] += v
+
+    results = {}
+    for key, values in lat.items():
+        c = counts.get(key)
+        results[key] = {"preprocess_ms": percentiles(values)}
+        if c:
+            results[key]["recall"] = round(c["matched"] / max(1, c["truth"]), 4)
+            results[key]["precision"] = round(c["matched"] / max(1, c["detected"]), 4)
+    return {
+        "images": len(manifest),
+        "results": results,
+        "auto_choice": {v: dict(c) for v, c in chosen.items()},
+    }
+
+
+def print_report(report: Dict) -> None:
+    print(f"images: {report['images']}")
+    print(f"{'variant/profile':<20}{'p50ms':>10}{'p90ms':>10}{'recall':>9}{'prec':>9}")
+    for key, r in report["results"].items():
+        p = r["preprocess_ms"]
+        print(
+            f"{key:<20}{p['p50']:>10}{p['p90']:>10}"
+            f"{r.get('recall', '-'):>9}{r.get('precision', '-'):>9}"
+        )
+    for variant, c in report["auto_choice"].items():
+        print(f"auto on {variant}: {c}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Preprocessing profile benchmark")
+    ap.add_argument("--corpus-dir", help="generate plans into this directory")
+    ap.add_argument("--sizes", nargs="+", type=parse_size, default=list(DEFAULT_SIZES))
+    ap.add_argument("--per-size", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--profiles", nargs="+", choices=PROFILES, default=PROFILES)
+    ap.add_argument("--no-ocr", action="store_true", help="time preprocessing only")
+    ap.add_argument("--out", help="write the JSON report here")
+    args = ap.parse_args()
+
+    out_dir = args.corpus_dir or os.path.join(
+        os.environ.get("TMPDIR", "/tmp"), "fengshui_synth_scan"
+    )
+    manifest = generate_corpus(out_dir, args.sizes, args.per_size, args.seed, scan=True)
+    report = run(manifest, args.profiles, ocr=not args.no_ocr)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[ok] saved: {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
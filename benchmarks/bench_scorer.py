@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+score_layout 微基准
+Microbenchmark for score_layout over a synthetic layout corpus.
+
+对南北半球 × 中英文四种组合分别测量：单次延迟分位数、批量吞吐、
+单次调用的峰值分配字节与分配块数、调用后残留的内存块（泄漏指示）以及
+语料内存占用。结果连同 git commit 追加写入 JSONL，便于跨提交比较趋势。
+
+    python -m benchmarks.bench_scorer --n 20000
+    python -m benchmarks.bench_scorer --corpus layouts.jsonl --compare
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.synth_layouts import generate_layouts, read_jsonl
+from zhongxuan_scorer import score_layout
+
+COMBOS = [
+    ("northern", "zh"),
+    ("northern", "en"),
+    ("southern", "zh"),
+    ("southern", "en"),
+]
+
+DEFAULT_RESULTS = os.path.join(os.path.dirname(__file__), "results", "scorer.jsonl")
+
+
+def _percentile(sorted_ns: List[int], q: float) -> float:
+    idx = min(len(sorted_ns) - 1, int(round(q / 100.0 * (len(sorted_ns) - 1))))
+    return sorted_ns[idx] / 1000.0
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def load_corpus(args) -> Tuple[List[Dict], float]:
+    """加载语料，返回 (layouts, 占用 MB)"""
+    tracemalloc.start()
+    if args.corpus:
+        layouts = list(read_jsonl(args.corpus, args.n))
+    else:
+        layouts = list(generate_layouts(args.n, args.seed))
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return layouts, size / 2**20
+
+
+def bench_combo(
+    layouts: List[Dict], hemisphere: str, language: str, alloc_sample: int
+) -> Dict:
+    # 预热
+    for layout in layouts[:100]:
+        score_layout(layout, hemisphere, language)
+
+    # 单次延迟
+    lat = []
+    clock = time.perf_counter_ns
+    for layout in layouts:
+        t0 = clock()
+        score_layout(layout, hemisphere, language)
+        lat.append(clock() - t0)
+    lat.sort()
+
+    # 批量吞吐（不逐次计时）
+    t0 = time.perf_counter()
+    for layout in layouts:
+        score_layout(layout, hemisphere, language)
+    elapsed = time.perf_counter() - t0
+
+    # 分配：抽样若干次调用的峰值字节、结果对象的块数与残留块数
+    sample = layouts[:alloc_sample]
+    peaks, blocks = [], []
+    tracemalloc.start()
+    retained0 = sys.getallocatedblocks()
+    for layout in sample:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        before = sys.getallocatedblocks()
+        out = score_layout(layout, hemisphere, language)
+        blocks.append(sys.getallocatedblocks() - before)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - base)
+        del out
+    retained = sys.getallocatedblocks() - retained0
+    tracemalloc.stop()
+
+    n = len(layouts)
+    return {
+        "latency_us": {
+            "p50": round(_percentile(lat, 50), 3),
+            "p90": round(_percentile(lat, 90), 3),
+            "p99": round(_percentile(lat, 99), 3),
+            "mean": round(sum(lat) / n / 1000.0, 3),
+        },
+        "throughput_per_s": round(n / elapsed, 1),
+        "peak_alloc_bytes_per_call": int(sum(peaks) / max(1, len(peaks))),
+        "result_blocks_per_call": round(sum(blocks) / max(1, len(blocks)), 1),
+        "retained_blocks": retained,
+    }
+
+
+def run(args) -> Dict:
+    layouts, corpus_mb = load_corpus(args)
+    results = {}
+    for hemisphere, language in COMBOS:
+        results[f"{hemisphere}/{language}"] = bench_combo(
+            layouts, hemisphere, language, args.alloc_sample
+        )
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "n_layouts": len(layouts),
+        "corpus": args.corpus or f"synthetic(seed={args.seed})",
+        "corpus_mb": round(corpus_mb, 2),
+        "results": results,
+    }
+
+
+def load_history(path: str) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(path: str, record: Dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def compare(record: Dict, base: Optional[Dict]) -> None:
+    if not base:
+        print("(no previous run to compare with)")
+        return
+    print(f"compare {record['commit']} vs {base['commit']} ({base['timestamp']})")
+    for combo, cur in record["results"].items():
+        old = base["results"].get(combo)
+        if not old:
+            continue
+        p50, p50_old = cur["latency_us"]["p50"], old["latency_us"]["p50"]
+        tp, tp_old = cur["throughput_per_s"], old["throughput_per_s"]
+        print(
+            f"  {combo:<14} p50 {p50_old:>8} -> {p50:>8} us "
+            f"({(p50 - p50_old) / p50_old * 100:+.1f}%)  "
+            f"throughput {tp_old:>10} -> {tp:>10}/s"
+        )
+
+
+def print_report(record: Dict) -> None:
+    print(
+        f"commit {record['commit']}  layouts {record['n_layouts']}  "
+        f"corpus {record['corpus_mb']} MB"
+    )
+    print(
+        f"{'combo':<16}{'p50us':>9}{'p90us':>9}{'p99us':>9}"
+        f"{'per_s':>12}{'peakB':>9}{'blocks':>9}"
+    )
+    for combo, r in record["results"].items():
+        lat = r["latency_us"]
+        print(
+            f"{combo:<16}{lat['p50']:>9}{lat['p90']:>9}{lat['p99']:>9}"
+            f"{r['throughput_per_s']:>12}{r['peak_alloc_bytes_per_call']:>9}"
+            f"{r['result_blocks_per_call']:>9}"
+        )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="score_layout microbenchmark")
+    ap.add_argument("--n", type=int, default=20000, help="number of layouts")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--corpus", help="JSONL corpus (default: generate in memory)")
+    ap.add_argument("--alloc-sample", type=int, default=2000)
+    ap.add_argument("--results", default=DEFAULT_RESULTS, help="history JSONL")
+    ap.add_argument("--no-save", action="store_true")
+    ap.add_argument(
+        "--compare", action="store_true", help="compare with the previous saved run"
+    )
+    args = ap.parse_args()
+
+    record = run(args)
+    print_report(record)
+    history = load_history(args.results)
+    if args.compare:
+        compare(record, history[-1] if history else None)
+    if not args.no_save:
+        append_history(args.results, record)
+        print(f"[ok] appended to {args.results}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+进程间传图基准：pickle vs 共享内存
+Benchmark: pickled ndarray transfer vs shared-memory handles.
+
+对不同尺寸的彩色解码图（HxWx3）和预处理二值图（HxW）分别测量把数组交给
+工作进程并取回一个小结果的往返耗时。工作进程只做一次轻量读取（抽样求和），
+因此差异主要来自传输本身。
+
+    python -m benchmarks.bench_shm --sizes 800x600 1600x1200 3200x2400 --rounds 50
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.bench_pipeline import percentiles
+from benchmarks.synth_floorplan import DEFAULT_SIZES, parse_size
+from shm_transfer import ShmHandle, ShmRing, call_with_shm
+
+
+def touch(arr: np.ndarray) -> int:
+    """工作进程里的轻量读取：确保数据真的被访问到"""
+    return int(arr[::97, ::89].sum())
+
+
+def touch_shm(handle: ShmHandle) -> int:
+    return call_with_shm(touch, handle)
+
+
+def _noop(_) -> None:
+    pass
+
+
+def bench_case(
+    pool: ProcessPoolExecutor, arr: np.ndarray, rounds: int, workers: int
+) -> Dict:
+    expected = touch(arr)
+    out = {"mb": round(arr.nbytes / 2**20, 2)}
+
+    # pickle：每次提交都序列化整块数组
+    lat = []
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        t = time.perf_counter()
+        assert pool.submit(touch, arr).result() == expected
+        lat.append((time.perf_counter() - t) * 1000.0)
+    elapsed = time.perf_counter() - t0
+    out["pickle"] = {
+        "latency_ms": percentiles(lat),
+        "per_s": round(rounds / elapsed, 1),
+    }
+
+    # 共享内存：拷进环形缓冲，只传句柄
+    lat = []
+    with ShmRing(slots=workers) as ring:
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            t = time.perf_counter()
+            handle = ring.put(arr)
+            try:
+                assert pool.submit(touch_shm, handle).result() == expected
+            finally:
+                ring.release(handle)
+            lat.append((time.perf_counter() - t) * 1000.0)
+        elapsed = time.perf_counter() - t0
+    out["shm"] = {"latency_ms": percentiles(lat), "per_s": round(rounds / elapsed, 1)}
+    out["speedup_p50"] = round(
+        out["pickle"]["latency_ms"]["p50"] / max(1e-9, out["shm"]["latency_ms"]["p50"]),
+        2,
+    )
+    return out
+
+
+def run(sizes: List[Tuple[int, int]], rounds: int, workers: int) -> Dict:
+    rng = np.random.default_rng(0)
+    ctx = multiprocessing.get_context("spawn")
+    report = {"rounds": rounds, "workers": workers, "cases": {}}
+    with ProcessPoolExecutor(workers, mp_context=ctx) as pool:
+        # 预热：启动工作进程
+        list(pool.map(_noop, range(workers)))
+        for w, h in sizes:
+            color = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+            binary = (rng.random((h, w)) > 0.9).astype(np.uint8) * 255
+            report["cases"][f"{w}x{h} bgr"] = bench_case(pool, color, rounds, workers)
+            report["cases"][f"{w}x{h} mask"] = bench_case(pool, binary, rounds, workers)
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print(f"rounds {report['rounds']}  workers {report['workers']}")
+    print(
+        f"{'case':<18}{'MB':>8}{'pickle p50':>12}{'shm p50':>10}"
+        f"{'pickle/s':>10}{'shm/s':>9}{'speedup':>9}"
+    )
+    for name, c in report["cases"].items():
+        print(
+            f"{name:<18}{c['mb']:>8}{c['pickle']['latency_ms']['p50']:>12}"
+            f"{c['shm']['latency_ms']['p50']:>10}{c['pickle']['per_s']:>10}"
+            f"{c['shm']['per_s']:>9}{c['speedup_p50']:>9}"
+        )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="pickle vs shared-memory transfer")
+    ap.add_argument("--sizes", nargs="+", type=parse_size, default=list(DEFAULT_SIZES))
+    ap.add_argument("--rounds", type=int, default=50)
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--out", help="write the JSON report here")
+    args = ap.parse_args()
+
+    report = run(args.sizes, args.rounds, args.workers)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[ok] saved: {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+冷启动基准：OCR 工作进程从启动到模型就绪的耗时与内存
+Cold-start benchmark: time and memory for a fresh worker to get its OCR
+engine ready, with the engine's default model location vs an offline
+model bundle (ocr_models).
+
+每一轮都起一个全新的解释器（与 spawn 出来的工作进程相同），分别记录
+import fp2layout、校验模型包（完整 sha256 / 只比字节数）、warm_up 加载
+模型三段耗时，以及就绪后的 RSS 和其中的 Shared_Clean
+（/proc/self/smaps_rollup；主要是共享库的代码页，模型权重在私有内存里）。
+
+    python -m benchmarks.bench_startup --rounds 5
+    python -m benchmarks.bench_startup --model-dir /opt/fengshui/ocr-models --out startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+PHASES = ("import", "verify", "load", "total")
+
+
+def memory_mb() -> Dict[str, float]:
+    """当前进程的 RSS 与 Shared_Clean（MB），非 Linux 时为空"""
+    fields = {"Rss": "rss_mb", "Shared_Clean": "shared_clean_mb"}
+    out = {}
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for row in f:
+                key, _, value = row.partition(":")
+                if key in fields:
+                    out[fields[key]] = round(int(value.split()[0]) / 1024.0, 1)
+    except OSError:
+        pass
+    return out
+
+
+def child(model_dir: Optional[str], checksums: bool) -> None:
+    """在全新进程中跑一次启动流程，最后一行输出 JSON"""
+    t0 = time.perf_counter()
+    import fp2layout
+
+    t1 = time.perf_counter()
+    if model_dir:
+        fp2layout.set_ocr_model_dir(model_dir, checksums=checksums)
+    t2 = time.perf_counter()
+    engine = fp2layout.warm_up()
+    t3 = time.perf_counter()
+    result = {
+        "engine": engine,
+        "import": (t1 - t0) * 1000.0,
+        "verify": (t2 - t1) * 1000.0,
+        "load": (t3 - t2) * 1000.0,
+        "total": (t3 - t0) * 1000.0,
+    }
+    result.update(memory_mb())
+    print(json.dumps(result))
+
+
+def run_case(
+    rounds: int, model_dir: Optional[str] = None, checksums: bool = False
+) -> Dict:
+    # bench_pipeline 会导入 fp2layout：只在父进程里取，子进程的 import 计时才准
+    from benchmarks.bench_pipeline import percentiles
+
+    cmd = [sys.executable, "-m", "benchmarks.bench_startup", "--child"]
+    if model_dir:
+        cmd += ["--model-dir", model_dir]
+    if checksums:
+        cmd.append("--checksums")
+    env = dict(os.environ)
+    env.pop("FENGSHUI_OCR_MODELS", None)  # 只用命令行给出的模型目录
+    samples: List[Dict] = []
+    for _ in range(rounds):
+        t = time.perf_counter()
+        proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+        wall = (time.perf_counter() - t) * 1000.0
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+        sample = json.loads(proc.stdout.strip().splitlines()[-1])
+        sample["process"] = wall
+        samples.append(sample)
+    out = {"engine": samples[0]["engine"]}
+    for phase in PHASES + ("process",):
+        out[f"{phase}_ms"] = percentiles([s[phase] for s in samples])
+    for key in ("rss_mb", "shared_clean_mb"):
+        if key in samples[0]:
+            out[key] = round(sum(s[key] for s in samples) / len(samples), 1)
+    return out
+
+
+def run(rounds: int, model_dir: Optional[str]) -> Dict:
+    report = {"rounds": rounds, "cases": {"default": run_case(rounds)}}
+    if model_dir:
+        report["model_dir"] = model_dir
+        # 工作进程（只比字节数）与主进程（完整 sha256）两种启动
+        report["cases"]["bundle"] = run_case(rounds, model_dir)
+        report["cases"]["bundle+sha256"] = run_case(rounds, model_dir, True)
+        base = report["cases"]["default"]["total_ms"]["p50"]
+        bundle = report["cases"]["bundle"]["total_ms"]["p50"]
+        report["speedup_p50"] = round(base / max(1e-9, bundle), 2)
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print(
+        f"{'case':<16}{'engine':<11}" + "".join(f"{p + ' p50':>13}" for p in PHASES),
+        end="",
+    )
+    print(f"{'rss MB':>9}{'shr.clean':>11}")
+    for name, case in report["cases"].items():
+        row = "".join(f"{case[p + '_ms']['p50']:>13.1f}" for p in PHASES)
+        rss, shared = case.get("rss_mb", float("nan")), case.get(
+            "shared_clean_mb", float("nan")
+        )
+        mem = f"{rss:>9.1f}{shared:>11.1f}"
+        print(f"{name:<16}{case['engine']:<11}{row}{mem}")
+    if "speedup_p50" in report:
+        print(f"bundle speedup (total p50): {report['speedup_p50']}x")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="OCR worker cold-start benchmark")
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument(
+        "--model-dir",
+        default=os.environ.get("FENGSHUI_OCR_MODELS"),
+        help="offline model bundle to compare against the default location",
+    )
+    ap.add_argument("--out", help="write the JSON report here")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--checksums", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        child(args.model_dir, args.checksums)
+        return
+    report = run(args.rounds, args.model_dir)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[ok] saved: {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
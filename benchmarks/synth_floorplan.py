@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+合成平面图生成器（确定性）
+Deterministic synthetic floorplan generator.
+
+按随机种子生成带墙体、房间标签（ROOM_PATTERNS 词汇）、尺寸标注和图例的平面图，
+并返回每个标签的真值：文字、归一化类型、像素框、旋转角、字号、九宫（相对平面外框）。
+只依赖 OpenCV 自带的 Hershey 字体，可离线运行。
+
+    python -m benchmarks.synth_floorplan --out-dir synth --sizes 800x600 1600x1200
+"""
+
+import argparse
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from fp2layout import normalize_label, rotate_point, to_direction8, to_palace9
+
+# (标签文字, 归一化类型)；文字必须能被 ROOM_PATTERNS 匹配到对应类型
+LABEL_VOCAB = [
+    ("ENTRY", "entry"),
+    ("PORCH", "entry"),
+    ("FOYER", "entry"),
+    ("KITCHEN", "kitchen"),
+    ("PANTRY", "pantry"),
+    ("MASTER BED", "master_bedroom"),
+    ("MASTER BEDROOM", "master_bedroom"),
+    ("BED", "bedroom"),
+    ("LOUNGE", "lounge"),
+    ("LIVING/DINING", "living_dining"),
+    ("GARAGE", "garage"),
+    ("DOUBLE GARAGE", "garage"),
+    ("ALFRESCO", "alfresco"),
+    ("BATH", "bath"),
+    ("BATHROOM", "bath"),
+    ("ENS", "ensuite"),
+    ("ENSUITE", "ensuite"),
+    ("WC", "wc"),
+    ("POWDER", "wc"),
+    ("LDRY", "laundry"),
+    ("LAUNDRY", "laundry"),
+    ("WIR", "wir"),
+    ("WALK IN ROBE", "wir"),
+    ("ROBE", "robe"),
+    ("STUDY", "study"),
+    ("OFFICE", "study"),
+]
+
+# 每张图必有的房间（评分依赖入口/主卧/厨房）
+REQUIRED_ROOMS = ["entry", "kitchen", "master_bedroom", "lounge", "bath"]
+OPTIONAL_ROOMS = [
+    "bedroom",
+    "bedroom",
+    "bedroom",
+    "ensuite",
+    "wc",
+    "laundry",
+    "garage",
+    "alfresco",
+    "study",
+    "pantry",
+    "wir",
+    "robe",
+    "living_dining",
+]
+
+# 图例 / 标题等非房间文字（不应被计入房间）
+NOISE_TEXTS = ["FLOOR PLAN", "SCALE 1:100", "NOT TO SCALE", "LOT 12"]
+
+DEFAULT_SIZES = ((800, 600), (1600, 1200), (3200, 2400))
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+@dataclass
+class SynthLabel:
+    text: str
+    norm_label: str  # 与 detect_layout 输出一致（bedroom_2 等）
+    bbox: Tuple[int, int, int, int]  # left, top, width, height（像素）
+    angle: int  # 0 / 90 / 270，逆时针
+    font_scale: float
+    center_xy: Tuple[float, float]  # 旋转 north_deg 后的归一化坐标
+    direction8: str
+    palace9: str
+
+
+def _split_rooms(
+    rng: np.random.Generator, rect: Tuple[int, int, int, int], n: int
+) -> List[Tuple[int, int, int, int]]:
+    """二叉空间划分：反复沿长边切最大的矩形"""
+    rects = [rect]
+    while len(rects) < n:
+        rects.sort(key=lambda r: r[2] * r[3])
+        x, y, w, h = rects.pop()
+        f = rng.uniform(0.35, 0.65)
+        if w >= h:
+            cut = int(w * f)
+            rects += [(x, y, cut, h), (x + cut, y, w - cut, h)]
+        else:
+            cut = int(h * f)
+            rects += [(x, y, w, cut), (x, y + cut, w, h - cut)]
+    rects.sort(key=lambda r: (r[1], r[0]))
+    return rects
+
+
+def _pick_text(rng: np.random.Generator, norm: str) -> str:
+    options = [t for t, n in LABEL_VOCAB if n == norm]
+    return options[int(rng.integers(len(options)))]
+
+
+def _draw_text(
+    img: np.ndarray,
+    text: str,
+    center: Tuple[int, int],
+    scale: float,
+    thickness: int,
+    angle: int,
+) -> Tuple[int, int, int, int]:
+    """在 center 处画（可旋转的）文字，返回像素框"""
+    (tw, th), base = cv2.getTextSize(text, FONT, scale, thickness)
+    pad = thickness + 2
+    canvas = np.full((th + base + 2 * pad, tw + 2 * pad), 255, dtype=np.uint8)
+    cv2.putText(canvas, text, (pad, pad + th), FONT, scale, 0, thickness, cv2.LINE_AA)
+    if angle == 90:
+        canvas = cv2.rotate(canvas, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    elif angle == 270:
+        canvas = cv2.rotate(canvas, cv2.ROTATE_90_CLOCKWISE)
+    ch, cw = canvas.shape
+    H, W = img.shape[:2]
+    x0 = int(np.clip(center[0] - cw // 2, 0, W - cw))
+    y0 = int(np.clip(center[1] - ch // 2, 0, H - ch))
+    roi = img[y0 : y0 + ch, x0 : x0 + cw]
+    np.minimum(roi, canvas[:, :, None], out=roi)
+    return x0, y0, cw, ch
+
+
+def truth_geometry(
+    bbox: Tuple[int, int, int, int],
+    frame: Tuple[int, int, int, int],
+    north_deg: float,
+) -> Tuple[Tuple[float, float], str, str]:
+    """
+    与 fp2layout 相同的坐标变换：中心（相对平面外框 frame）-> 旋转 -> 八方位 / 九宫
+    """
+    l, t, w, h = bbox
+    fx, fy, fw, fh = frame
+    cx, cy = rotate_point(((l + w / 2.0 - fx) / fw, (t + h / 2.0 - fy) / fh), north_deg)
+    return (round(cx, 4), round(cy, 4)), to_direction8((cx, cy)), to_palace9((cx, cy))
+
+
+def render_floorplan(
+    width: int = 1600,
+    height: int = 1200,
+    seed: int = 0,
+    n_rooms: Optional[int] = None,
+    north_deg: float = 0.0,
+    rotate_labels: bool = True,
+    dimensions: bool = True,
+    legend: bool = True,
+) -> Tuple[np.ndarray, Dict]:
+    """
+    生成一张合成平面图。
+    Render one synthetic floorplan. Returns (BGR image, ground truth dict).
+    """
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 3), 255, dtype=np.uint8)
+    unit = min(width, height) / 1000.0
+    wall = max(2, int(round(6 * unit)))
+
+    # 平面外框（留白边，模拟宣传册排版）
+    mx, my = int(width * rng.uniform(0.05, 0.1)), int(height * rng.uniform(0.08, 0.14))
+    plan = (mx, my, width - 2 * mx, height - 2 * my)
+    n = n_rooms or int(rng.integers(len(REQUIRED_ROOMS) + 2, len(REQUIRED_ROOMS) + 8))
+    n = max(n, len(REQUIRED_ROOMS))
+    rects = _split_rooms(rng, plan, n)
+
+    kinds = list(REQUIRED_ROOMS)
+    extra = list(OPTIONAL_ROOMS)
+    rng.shuffle(extra)
+    kinds += extra[: n - len(kinds)]
+    while len(kinds) < n:
+        kinds.append("bedroom")
+    rng.shuffle(kinds)
+
+    # 墙体 + 门洞
+    for x, y, w, h in rects:
+        cv2.rectangle(img, (x, y), (x + w, y + h), (0, 0, 0), wall)
+    for x, y, w, h in rects:
+        door = int(rng.uniform(0.15, 0.25) * min(w, h))
+        dx = x + int(rng.uniform(0.2, 0.6) * w)
+        cv2.line(img, (dx, y), (dx + door, y), (255, 255, 255), wall + 1)
+    x, y, w, h = plan
+    cv2.rectangle(img, (x, y), (x + w, y + h), (0, 0, 0), wall + 2)
+
+    labels: List[SynthLabel] = []
+    bed_no = 2
+    for (x, y, w, h), kind in zip(rects, kinds):
+        text = _pick_text(rng, kind)
+        norm = kind
+        if kind == "bedroom":
+            text = f"BED {bed_no}" if rng.random() < 0.5 else f"BEDROOM {bed_no}"
+            norm = f"bedroom_{bed_no}"
+            bed_no += 1
+        scale = float(round(rng.uniform(0.7, 1.3) * unit * 1.1, 2))
+        thickness = max(1, int(round(scale * 2)))
+        (tw, th), _ = cv2.getTextSize(text, FONT, scale, thickness)
+        angle = 0
+        if tw > 0.85 * w:
+            if rotate_labels and h > w and tw < 0.85 * h:
+                angle = 90 if rng.random() < 0.5 else 270
+            else:
+                scale = float(round(scale * 0.85 * w / tw, 2))
+                thickness = max(1, int(round(scale * 2)))
+        cx = int(x + w / 2 + rng.uniform(-0.1, 0.1) * w)
+        cy = int(y + h / 2 + rng.uniform(-0.1, 0.1) * h)
+        bbox = _draw_text(img, text, (cx, cy), scale, thickness, angle)
+        center, d8, p9 = truth_geometry(bbox, plan, north_deg)
+        labels.append(SynthLabel(text, norm, bbox, angle, scale, center, d8, p9))
+
+        if dimensions and angle == 0:
+            dim = f"{w / (100 * unit):.1f} x {h / (100 * unit):.1f}"
+            dscale = scale * 0.6
+            dy = bbox[1] + bbox[3] + int(12 * dscale + 4)
+            if dy < y + h - wall:
+                _draw_text(img, dim, (cx, dy), dscale, 1, 0)
+
+    if legend:
+        # 标题与图例放在平面外的白边里
+        title = NOISE_TEXTS[int(rng.integers(len(NOISE_TEXTS)))]
+        _draw_text(img, title, (width // 2, my // 2), unit * 1.2, 2, 0)
+        _draw_text(img, "SCALE 1:100", (width - mx, height - my // 2), unit * 0.7, 1, 0)
+
+    truth = {
+        "seed": seed,
+        "image_size": {"width": width, "height": height},
+        "north_deg": north_deg,
+        "plan_bbox": list(plan),
+        "labels": [asdict(lb) for lb in labels],
+    }
+    return img, truth
+
+
+def degrade_scan(img: np.ndarray, seed: int = 0, strength: float = 1.0) -> np.ndarray:
+    """
+    模拟扫描/拍照件：纸张偏灰、光照不均、轻微模糊、传感器噪声。
+    Make a clean render look scanned (grey paper, uneven light, blur, noise).
+    """
+    rng = np.random.default_rng(seed)
+    h, w = img.shape[:2]
+    out = img.astype(np.float32)
+    # 压低对比：白纸 -> 灰纸，黑墨 -> 深灰
+    out = 60 + out * (175.0 / 255.0)
+    # 光照渐变
+    gx = np.linspace(-1, 1, w, dtype=np.float32)[None, :, None]
+    gy = np.linspace(-1, 1, h, dtype=np.float32)[:, None, None]
+    ax, ay = rng.uniform(-1, 1, 2)
+    out *= 1.0 - 0.15 * strength * (ax * gx + ay * gy + 1.0) / 2.0
+    out = cv2.GaussianBlur(out, (3, 3), 0)
+    out += rng.normal(0, 8.0 * strength, out.shape).astype(np.float32)
+    return np.clip(out, 0, 255).astype(np.uint8)
+
+
+def generate_corpus(
+    out_dir: str,
+    sizes: Sequence[Tuple[int, int]] = DEFAULT_SIZES,
+    per_size: int = 5,
+    seed: int = 0,
+    north_deg: float = 0.0,
+    scan: bool = False,
+) -> List[Dict]:
+    """
+    批量生成 PNG + 真值 JSON，返回清单（同时写入 manifest.json）。
+    scan=True 时每张图额外生成一张扫描风格的副本（清单中 variant="scan"）。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = []
+    for w, h in sizes:
+        for i in range(per_size):
+            s = seed * 100003 + w * 31 + h * 7 + i
+            img, truth = render_floorplan(w, h, seed=s, north_deg=north_deg)
+            name = f"plan_{w}x{h}_{i:03d}"
+            with open(
+                os.path.join(out_dir, name + ".json"), "w", encoding="utf-8"
+            ) as f:
+                json.dump(truth, f, ensure_ascii=False, indent=2)
+            variants = [("clean", name, img)]
+            if scan:
+                variants.append(("scan", name + "_scan", degrade_scan(img, s)))
+            for variant, stem, im in variants:
+                png = os.path.join(out_dir, stem + ".png")
+                cv2.imwrite(png, im)
+                manifest.append({"image": png, "truth": truth, "variant": variant})
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    return manifest
+
+
+def check_vocab() -> List[str]:
+    """确认 LABEL_VOCAB 与 ROOM_PATTERNS 一致，返回不一致的文字"""
+    bad = []
+    for text, norm in LABEL_VOCAB:
+        got = normalize_label(text)
+        if not got or got[0] != norm:
+            bad.append(text)
+    return bad
+
+
+def parse_size(s: str) -> Tuple[int, int]:
+    w, h = s.lower().split("x")
+    return int(w), int(h)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Render synthetic floorplans")
+    ap.add_argument("--out-dir", required=True)
+    ap.add_argument(
+        "--sizes",
+        nargs="+",
+        type=parse_size,
+        default=list(DEFAULT_SIZES),
+        help="WxH, e.g. 1600x1200",
+    )
+    ap.add_argument("--per-size", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--north-deg", type=float, default=0.0)
+    ap.add_argument(
+        "--scan", action="store_true", help="also write scan-style degraded copies"
+    )
+    args = ap.parse_args()
+    manifest = generate_corpus(
+        args.out_dir, args.sizes, args.per_size, args.seed, args.north_deg, args.scan
+    )
+    print(f"[ok] {len(manifest)} plans -> {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
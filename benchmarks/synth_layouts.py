@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+合成 layout 语料生成器（评分侧）
+Synthetic layout corpus generator for scorer benchmarks.
+
+生成与 detect_layout 输出同结构的 layout 字典：随机朝向、从 LABEL_BUCKET
+词汇中抽取的房间组合、按权重分布的九宫（中宫较少）以及落在对应宫格内的
+中心坐标。惰性生成，可直接写成上百万行的 JSONL。
+
+    python -m benchmarks.synth_layouts --n 1000000 --out layouts.jsonl
+"""
+
+import argparse
+import json
+import random
+from typing import Dict, Iterator, List
+
+from zhongxuan_scorer import ALL_DIR8, LABEL_BUCKET
+
+# 九宫在 [0,1]^2 中的 (列, 行)
+PALACE_CELLS = {
+    "NW": (0, 0),
+    "N": (1, 0),
+    "NE": (2, 0),
+    "W": (0, 1),
+    "C": (1, 1),
+    "E": (2, 1),
+    "SW": (0, 2),
+    "S": (1, 2),
+    "SE": (2, 2),
+}
+PALACES = list(PALACE_CELLS)
+# 中宫一般是走廊/客厅，房间标签落在中宫的概率较低
+PALACE_WEIGHTS = [1.0 if p != "C" else 0.35 for p in PALACES]
+
+# (类型, 出现概率, 最多个数)
+ROOM_MIX = [
+    ("main_door", 0.92, 1),
+    ("kitchen", 0.95, 2),
+    ("master", 0.9, 1),
+    ("wet", 0.97, 4),
+    ("bed", 0.85, 4),
+    ("garage", 0.7, 3),
+]
+EXTRA_LABELS = ["lounge", "living_dining", "alfresco", "study"]
+
+
+def _room(rng: random.Random, label: str) -> Dict:
+    palace = rng.choices(PALACES, PALACE_WEIGHTS)[0]
+    col, row = PALACE_CELLS[palace]
+    cx = round((col + rng.uniform(0.05, 0.95)) / 3.0, 4)
+    cy = round((row + rng.uniform(0.05, 0.95)) / 3.0, 4)
+    w, h = rng.randint(40, 160), rng.randint(12, 40)
+    l, t = int(cx * 1600 - w / 2), int(cy * 1200 - h / 2)
+    return {
+        "raw_text": label.upper().replace("_", " "),
+        "norm_label": label,
+        "bbox": [l, t, w, h],
+        "conf": round(rng.uniform(0.3, 1.0), 3),
+        "center_xy": [cx, cy],
+        "direction8": palace if palace != "C" else "N",
+        "palace9": palace,
+    }
+
+
+def random_layout(rng: random.Random) -> Dict:
+    rooms: List[Dict] = []
+    for bucket, prob, max_n in ROOM_MIX:
+        if rng.random() > prob:
+            continue
+        vocab = sorted(LABEL_BUCKET[bucket])
+        for _ in range(rng.randint(1, max_n)):
+            rooms.append(_room(rng, rng.choice(vocab)))
+    for label in EXTRA_LABELS:
+        if rng.random() < 0.5:
+            rooms.append(_room(rng, label))
+    rng.shuffle(rooms)
+    return {
+        "image_size": {"width": 1600, "height": 1200},
+        "north_deg": 0.0,
+        "house_facing": rng.choice(ALL_DIR8),
+        "rooms": rooms,
+        "schema_version": "v1",
+    }
+
+
+def generate_layouts(n: int, seed: int = 0) -> Iterator[Dict]:
+    """惰性生成 n 个 layout（同一 seed 结果完全相同）"""
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield random_layout(rng)
+
+
+def write_jsonl(path: str, n: int, seed: int = 0) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for layout in generate_layouts(n, seed):
+            f.write(json.dumps(layout, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+
+
+def read_jsonl(path: str, limit: int = 0) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if limit and i >= limit:
+                break
+            yield json.loads(line)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate synthetic layout JSONL")
+    ap.add_argument("--n", type=int, default=100000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args()
+    write_jsonl(args.out, args.n, args.seed)
+    print(f"[ok] {args.n} layouts -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
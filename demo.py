@@ -18,11 +18,19 @@ def demo_analysis():
     print("🏠 房屋布局评分系统演示")
     print("=" * 50)
 
-    # 检查测试图片是否存在
+    # 检查测试图片是否存在，不存在时用合成平面图代替
     test_image = "data/test.png"
     if not os.path.exists(test_image):
-        print(f"❌ 测试图片不存在: {test_image}")
-        return
+        import tempfile
+
+        import cv2
+
+        from benchmarks.synth_floorplan import render_floorplan
+
+        print(f"⚠️ 测试图片不存在: {test_image}，改用合成平面图")
+        img, _ = render_floorplan(1600, 1200, seed=0)
+        test_image = os.path.join(tempfile.gettempdir(), "fengshui_demo_synth.png")
+        cv2.imwrite(test_image, img)
 
     print(f"📁 使用测试图片: {test_image}")
 
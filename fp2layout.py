@@ -2,13 +2,45 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import io
 import json
+import os
 import re
+import shlex
+import threading
 from dataclasses import asdict, dataclass
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 import cv2
 import numpy as np
+from PIL import Image
+
+from instrumentation import NULL_TIMER, MetricsCallback, finish, make_timer
+from pipeline_metrics import (
+    ANALYSES_COMPLETED,
+    ANALYSES_FAILED,
+    ANALYSES_STARTED,
+    OCR_ENGINE,
+    OCR_ESCALATIONS,
+    OCR_LINES_REJECTED,
+    OCR_REQUESTS,
+    ORIENTATION_CORRECTIONS,
+    REVISIONS,
+    TEMPLATE_MATCHES,
+    observe_stages,
+    write_textfile,
+)
+from label_templates import LabelTemplates
+from ocr_models import (
+    MODEL_DIR_ENV,
+    ModelBundleError,
+    load_easyocr_reader,
+    verify_bundle,
+)
+from room_regions import annotate_palace_area, segment_rooms
+from spatial_index import GridIndex
+from vector_plans import read_vector_plan, vector_kind
 
 # 尝试导入 EasyOCR，如果失败则回退到 Tesseract
 try:
@@ -19,15 +51,32 @@ try:
 except ImportError:
     EASYOCR_AVAILABLE = False
     print("EasyOCR not available, trying Tesseract...")
+# Tesseract 优先用 tesserocr（进程内常驻引擎），其次 pytesseract（每次调用起子进程）
+try:
+    import tesserocr
+
+    TESSERACT_BACKEND = "tesserocr"
+except ImportError:
     try:
         import pytesseract
 
-        TESSERACT_AVAILABLE = True
-        print("Using Tesseract for text recognition")
+        TESSERACT_BACKEND = "pytesseract"
     except ImportError:
-        TESSERACT_AVAILABLE = False
+        TESSERACT_BACKEND = None
+TESSERACT_AVAILABLE = TESSERACT_BACKEND is not None
+if not EASYOCR_AVAILABLE:
+    if TESSERACT_AVAILABLE:
+        print(f"Using Tesseract ({TESSERACT_BACKEND}) for text recognition")
+    else:
         print("No OCR engine available!")
 
+OCR_ENGINE_NAME = (
+    "easyocr" if EASYOCR_AVAILABLE else ("tesseract" if TESSERACT_AVAILABLE else "none")
+)
+OCR_ENGINE.labels(engine=OCR_ENGINE_NAME).set(1)
+# 本地模型目录（离线模型包，见 ocr_models）；None 时用各引擎默认位置
+OCR_MODEL_DIR: Optional[str] = os.environ.get(MODEL_DIR_ENV) or None
+
 # --------- 可调词典：房间名正则 -> 归一化类型 ----------
 # --------- Adjustable dictionary: Room name regex -> Normalized type ----------
 ROOM_PATTERNS = [
@@ -50,6 +99,47 @@ ROOM_PATTERNS = [
     (r"\bstudy\b|\boffice\b", "study"),
 ]
 
+# 受限识别用的房间词表：每个短语都应能被 ROOM_PATTERNS 匹配（改正则时同步）
+# Room vocabulary for constrained recognition; keep in sync with ROOM_PATTERNS
+ROOM_VOCABULARY = [
+    "MASTER BEDROOM",
+    "MASTER BED",
+    "BEDROOM",
+    "BED",
+    "LOUNGE",
+    "LIVING / DINING",
+    "KITCHEN",
+    "PANTRY",
+    "DOUBLE GARAGE",
+    "GARAGE",
+    "ALFRESCO",
+    "ENTRY",
+    "FOYER",
+    "PORCH",
+    "BATHROOM",
+    "BATH",
+    "ENSUITE",
+    "ENS",
+    "WC",
+    "TOILET",
+    "POWDER",
+    "LDRY",
+    "LAUNDRY",
+    "WIR",
+    "WALK-IN ROBE",
+    "ROBE",
+    "CLOSET",
+    "STUDY",
+    "OFFICE",
+]
+ROOM_LEXICON = frozenset(
+    w.lower() for phrase in ROOM_VOCABULARY for w in re.findall(r"[A-Za-z]+", phrase)
+)
+_VOCAB_LETTERS = sorted(set("".join(ROOM_LEXICON)))
+ROOM_ALLOWLIST = (
+    "".join(_VOCAB_LETTERS) + "".join(_VOCAB_LETTERS).upper() + "0123456789 /-'"
+)
+
 DIRECTION_8 = ["N", "NE", "E", "SE", "S", "SW", "W", "NW"]
 
 # 允许的朝向 & 反向映射
@@ -102,45 +192,239 @@ def infer_house_facing(rooms: List[DetectedLabel]) -> Optional[str]:
     return None
 
 
-def preprocess_for_ocr(img: np.ndarray) -> np.ndarray:
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    # 提高对比 + 去噪
-    # Enhance contrast + denoise
-    gray = cv2.bilateralFilter(gray, 7, 50, 50)
-    # 自适应阈值（反白）
-    # Adaptive threshold (invert to white)
-    th = cv2.adaptiveThreshold(
-        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 35, 15
-    )
+# 预处理配置：
+# - fast：矢量导出的干净图，只做 Otsu 全局阈值，不去噪
+# - balanced：原有流程（双边滤波 + 35px 自适应阈值）
+# - scan：扫描/拍照件，先中值去椒盐噪点，更大的阈值窗口应对光照不均
+PREPROCESS_PROFILES = {
+    "fast": {"median": 0, "bilateral": 0, "threshold": "otsu", "dilate": 2},
+    "balanced": {
+        "median": 0,
+        "bilateral": 7,
+        "threshold": "adaptive",
+        "block": 35,
+        "C": 15,
+        "dilate": 2,
+    },
+    "scan": {
+        "median": 3,
+        "bilateral": 9,
+        "threshold": "adaptive",
+        "block": 51,
+        "C": 12,
+        "dilate": 2,
+    },
+}
+
+# 自动选择阈值：噪声（灰度级标准差）与对比度（p98 - p2，0~1）
+FAST_MAX_NOISE = 1.5
+FAST_MIN_CONTRAST = 0.6
+SCAN_MIN_NOISE = 5.0
+SCAN_MAX_CONTRAST = 0.4
+_PROBE_SIDE = 1024
+
+
+def probe_quality(gray: np.ndarray) -> Dict[str, float]:
+    """
+    快速图像质量估计（只看中心最多 1024x1024 区域）：
+    noise 用拉普拉斯残差的中位数估计（线条/文字稀疏，对中位数影响小），
+    contrast 为 2%/98% 分位灰度差。
+
+    Cheap quality probe: robust noise sigma from the median absolute
+    Laplacian residual, and contrast as the 2nd-98th percentile spread.
+    """
+    h, w = gray.shape[:2]
+    y0, x0 = max(0, (h - _PROBE_SIDE) // 2), max(0, (w - _PROBE_SIDE) // 2)
+    crop = gray[y0 : y0 + _PROBE_SIDE, x0 : x0 + _PROBE_SIDE]
+    kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+    resid = np.abs(cv2.filter2D(crop, cv2.CV_16S, kernel)).ravel()
+    # 残差是整数，用直方图求中位数；高斯噪声经该核后标准差为 6σ，MAD -> σ 除以 0.6745
+    counts = np.bincount(resid).cumsum()
+    noise = float(np.searchsorted(counts, counts[-1] / 2.0)) / 0.6745 / 6.0
+    hist = np.bincount(crop.ravel(), minlength=256).cumsum()
+    lo = int(np.searchsorted(hist, 0.02 * hist[-1]))
+    hi = int(np.searchsorted(hist, 0.98 * hist[-1]))
+    return {"noise": round(noise, 3), "contrast": round((hi - lo) / 255.0, 3)}
+
+
+def choose_profile(quality: Dict[str, float]) -> str:
+    if quality["noise"] <= FAST_MAX_NOISE and quality["contrast"] >= FAST_MIN_CONTRAST:
+        return "fast"
+    if quality["noise"] >= SCAN_MIN_NOISE or quality["contrast"] <= SCAN_MAX_CONTRAST:
+        return "scan"
+    return "balanced"
+
+
+def preprocess_for_ocr(img: np.ndarray, profile: str = "balanced") -> np.ndarray:
+    """profile 为 PREPROCESS_PROFILES 中的名字，或 "auto"（按 probe_quality 选择）"""
+    # 接受 BGR 或已是灰度的图
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if profile == "auto":
+        profile = choose_profile(probe_quality(gray))
+    cfg = PREPROCESS_PROFILES[profile]
+    # 去噪
+    # Denoise
+    if cfg["median"]:
+        gray = cv2.medianBlur(gray, cfg["median"])
+    if cfg["bilateral"]:
+        gray = cv2.bilateralFilter(gray, cfg["bilateral"], 50, 50)
+    # 二值化（反白）
+    # Threshold (invert to white)
+    if cfg["threshold"] == "otsu":
+        _, th = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    else:
+        th = cv2.adaptiveThreshold(
+            gray,
+            255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY_INV,
+            cfg["block"],
+            cfg["C"],
+        )
     # 膨胀，让细文字连成块
     # Dilate to connect thin text into blocks
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+    k = cfg["dilate"]
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (k, k))
     th = cv2.dilate(th, kernel, iterations=1)
     return th
 
 
-def ocr_lines(img: np.ndarray) -> List[Dict]:
-    """OCR 函数，优先使用 EasyOCR，回退到 Tesseract"""
+# 受限识别模式：off = 不限制；allowlist = 识别只输出词表字符集；
+# lexicon = 字符集限制 + 按词表纠正单词，无词表单词的行直接丢弃
+OCR_VOCABULARY_MODES = ("off", "allowlist", "lexicon")
+OCR_VOCABULARY = "off"
+
+
+def set_ocr_vocabulary(mode: str) -> None:
+    """设置本进程的受限识别模式（服务/批处理的工作进程经 warm_up 设置）"""
+    global OCR_VOCABULARY
+    if mode not in OCR_VOCABULARY_MODES:
+        raise ValueError(f"unknown OCR vocabulary mode: {mode!r}")
+    OCR_VOCABULARY = mode
 
+
+def ocr_lines(img: np.ndarray, detect_scale: Optional[float] = None) -> List[Dict]:
+    """
+    OCR 函数，优先使用 EasyOCR，回退到 Tesseract。
+    detect_scale：EasyOCR 文字检测所用的缩放比例（None 按图像尺寸自动选择，
+    1.0 关闭双分辨率）；Tesseract 自带版面分析，忽略此参数。
+    OCR_VOCABULARY 不为 "off" 时只识别房间词表字符集（见 set_ocr_vocabulary）。
+    """
+    allowlist = ROOM_ALLOWLIST if OCR_VOCABULARY != "off" else None
     if EASYOCR_AVAILABLE:
-        return ocr_with_easyocr(img)
+        OCR_REQUESTS.labels(engine="easyocr").inc()
+        lines = ocr_with_easyocr(img, detect_scale, allowlist)
     elif TESSERACT_AVAILABLE:
-        return ocr_with_tesseract(img)
+        OCR_REQUESTS.labels(engine="tesseract").inc()
+        lines = ocr_with_tesseract(img, allowlist)
     else:
         raise RuntimeError(
             "No OCR engine available. Please install EasyOCR or Tesseract.\n"
             "For cloud deployment, use: pip install easyocr"
         )
+    if OCR_VOCABULARY == "lexicon":
+        lines = lexicon_decode(lines)
+    return lines
+
+
+def set_ocr_model_dir(path: Optional[str], checksums: bool = True) -> None:
+    """
+    从本地模型目录（离线模型包）加载 OCR 模型，None 恢复引擎默认位置。
+    先按清单校验当前引擎需要的文件，checksums=False 只比对字节数（工作
+    进程用，主进程已完整校验过）；校验失败抛 ocr_models.ModelBundleError。
+    """
+    global OCR_MODEL_DIR
+    if path:
+        verify_bundle(path, OCR_ENGINE_NAME, checksums)
+    OCR_MODEL_DIR = path or None
 
 
-def ocr_with_easyocr(img: np.ndarray) -> List[Dict]:
-    """使用 EasyOCR 进行文本识别"""
-    # 初始化 EasyOCR 读取器（只初始化一次）
-    if not hasattr(ocr_with_easyocr, "reader"):
+def get_easyocr_reader():
+    """EasyOCR 读取器（每个进程只初始化一次，模型目录改变时重建）"""
+    if getattr(ocr_with_easyocr, "model_dir", None) != OCR_MODEL_DIR or not hasattr(
+        ocr_with_easyocr, "reader"
+    ):
         print("Initializing EasyOCR reader...")
-        ocr_with_easyocr.reader = easyocr.Reader(["en"])
+        ocr_with_easyocr.reader = (
+            load_easyocr_reader(OCR_MODEL_DIR)
+            if OCR_MODEL_DIR
+            else easyocr.Reader(["en"])
+        )
+        ocr_with_easyocr.model_dir = OCR_MODEL_DIR
+    return ocr_with_easyocr.reader
+
 
-    results = ocr_with_easyocr.reader.readtext(img)
+def warm_up(vocabulary: Optional[str] = None, model_dir: Optional[str] = None) -> str:
+    """
+    预先加载 OCR 模型（用于常驻服务/工作进程启动时），返回引擎名。
+    vocabulary 非 None 时同时设置受限识别模式；model_dir 非 None 时从该
+    离线模型包加载（只比对字节数，完整校验见 set_ocr_model_dir）。
+    Load OCR models up front (service / worker start-up); returns the engine.
+    """
+    if vocabulary is not None:
+        set_ocr_vocabulary(vocabulary)
+    if model_dir is not None:
+        set_ocr_model_dir(model_dir, checksums=False)
+    if EASYOCR_AVAILABLE:
+        get_easyocr_reader()
+    elif TESSERACT_BACKEND == "tesserocr":
+        get_tesseract_api()
+    return OCR_ENGINE_NAME
+
+
+# 文字检测只需要这么大的图：房间标签在缩小后的图上仍然清晰可检
+DETECT_MAX_SIDE = 1280
+FULL_RES_DETECT = 0.9  # 检测缩放比例不低于此值时直接在原图上检测
+
+
+def choose_detect_scale(
+    shape: Tuple[int, ...], max_side: int = DETECT_MAX_SIDE
+) -> float:
+    return min(1.0, max_side / float(max(shape[:2])))
+
+
+def _readtext_two_pass(
+    reader, img: np.ndarray, scale: float, allowlist: Optional[str] = None
+):
+    """低分辨率上检测文字框，映射回原图后在全分辨率上识别"""
+    H, W = img.shape[:2]
+    small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    horizontal, free = reader.detect(small)
+    # 低分辨率框的量化误差约 1/scale 像素，外扩一点避免裁掉笔画
+    pad = int(np.ceil(1.0 / scale))
+    h_list = [
+        [
+            max(0, int(x0 / scale) - pad),
+            min(W, int(np.ceil(x1 / scale)) + pad),
+            max(0, int(y0 / scale) - pad),
+            min(H, int(np.ceil(y1 / scale)) + pad),
+        ]
+        for x0, x1, y0, y1 in horizontal[0]
+    ]
+    f_list = [[[x / scale, y / scale] for x, y in poly] for poly in free[0]]
+    if not h_list and not f_list:
+        return []
+    kw = {"allowlist": allowlist} if allowlist else {}
+    return reader.recognize(img, horizontal_list=h_list, free_list=f_list, **kw)
+
+
+def ocr_with_easyocr(
+    img: np.ndarray,
+    detect_scale: Optional[float] = None,
+    allowlist: Optional[str] = None,
+) -> List[Dict]:
+    """
+    使用 EasyOCR 进行文本识别。大图先在缩小的副本上检测文字（检测耗时随像素数
+    增长），再只把检测到的框放回全分辨率图上识别。allowlist 限制识别字符集。
+    """
+    reader = get_easyocr_reader()
+    scale = choose_detect_scale(img.shape) if detect_scale is None else detect_scale
+    if scale >= FULL_RES_DETECT:
+        results = reader.readtext(
+            img, **({"allowlist": allowlist} if allowlist else {})
+        )
+    else:
+        results = _readtext_two_pass(reader, img, scale, allowlist)
 
     out = []
     for bbox, text, conf in results:
@@ -161,12 +445,145 @@ def ocr_with_easyocr(img: np.ndarray) -> List[Dict]:
     return out
 
 
-def ocr_with_tesseract(img: np.ndarray) -> List[Dict]:
-    """使用 Tesseract 进行文本识别（回退方案）"""
-    config = "--oem 3 --psm 6"
+TESSERACT_LANG = "eng"
+TESSERACT_CONFIG = "--oem 3 --psm 6"
+_TSV_COLUMNS = (
+    "level",
+    "page_num",
+    "block_num",
+    "par_num",
+    "line_num",
+    "word_num",
+    "left",
+    "top",
+    "width",
+    "height",
+    "conf",
+    "text",
+)
+_tesseract_local = threading.local()
+
+
+def get_tesseract_api():
+    """
+    进程内 Tesseract 引擎（tesserocr）。语言数据只在首次调用时加载；
+    TessBaseAPI 不是线程安全的，所以每个线程各持有一个。
+    """
+    api = getattr(_tesseract_local, "api", None)
+    if api is None or getattr(_tesseract_local, "model_dir", None) != OCR_MODEL_DIR:
+        # 模型包目录直接作为 tessdata 目录
+        kw = {"path": OCR_MODEL_DIR} if OCR_MODEL_DIR else {}
+        if api is not None:
+            api.End()
+        api = tesserocr.PyTessBaseAPI(
+            lang=TESSERACT_LANG,
+            psm=tesserocr.PSM.SINGLE_BLOCK,
+            oem=tesserocr.OEM.DEFAULT,
+            **kw,
+        )
+        _tesseract_local.api = api
+        _tesseract_local.model_dir = OCR_MODEL_DIR
+        _tesseract_local.allowlist = None
+    return api
+
+
+def tesserocr_words(
+    img: np.ndarray, allowlist: Optional[str] = None
+) -> Dict[str, List]:
+    """
+    直接把图像缓冲区交给常驻引擎（不写临时文件、不起子进程），返回与
+    pytesseract.image_to_data(output_type=DICT) 相同列的词级结果。
+    """
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    img = np.ascontiguousarray(img, dtype=np.uint8)
+    H, W = img.shape
+    api = get_tesseract_api()
+    # 引擎常驻，变量会保留到下一次调用：白名单变化时才重新设置
+    if getattr(_tesseract_local, "allowlist", None) != allowlist:
+        api.SetVariable("tessedit_char_whitelist", allowlist or "")
+        _tesseract_local.allowlist = allowlist
+    api.SetImageBytes(img.tobytes(), W, H, 1, W)
+    api.Recognize()
+    rows = [
+        row.split("\t", len(_TSV_COLUMNS) - 1) for row in api.GetTSVText(0).splitlines()
+    ]
+    rows = [row for row in rows if len(row) == len(_TSV_COLUMNS)]
+    return {name: [row[k] for row in rows] for k, name in enumerate(_TSV_COLUMNS)}
+
+
+def words_to_lines(data: Dict[str, List]) -> List[Dict]:
+    """
+    词级结果按 (block, par, line) 聚合成行：bbox 取并集，conf 取平均，
+    文本按出现顺序以空格连接。分组与 bbox/conf 的归约都用 numpy 完成。
+    """
+    conf = np.asarray(data["conf"], dtype=np.float64)
+    keep = np.flatnonzero(conf >= 0)
+    if keep.size == 0:
+        return []
+    conf = conf[keep]
+    keys = np.stack(
+        [
+            np.asarray(data[c], dtype=np.int64)[keep]
+            for c in ("block_num", "par_num", "line_num")
+        ],
+        axis=1,
+    )
+    l = np.asarray(data["left"], dtype=np.int64)[keep]
+    t = np.asarray(data["top"], dtype=np.int64)[keep]
+    r = l + np.asarray(data["width"], dtype=np.int64)[keep]
+    b = t + np.asarray(data["height"], dtype=np.int64)[keep]
+    texts = [str(data["text"][i]).strip() for i in keep]
+
+    _, first, group = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    group = group.ravel()
+    order = np.argsort(group, kind="stable")
+    starts = np.r_[0, np.flatnonzero(np.diff(group[order])) + 1]
+    counts = np.diff(np.r_[starts, order.size])
+    boxes = np.stack(
+        [
+            np.minimum.reduceat(l[order], starts),
+            np.minimum.reduceat(t[order], starts),
+            np.maximum.reduceat(r[order], starts),
+            np.maximum.reduceat(b[order], starts),
+        ],
+        axis=1,
+    )
+    confs = np.add.reduceat(conf[order], starts) / counts
+
+    out = []
+    for g in np.argsort(first, kind="stable"):  # 按首次出现的阅读顺序输出
+        idx = order[starts[g] : starts[g] + counts[g]]
+        joined = " ".join(texts[i] for i in idx if texts[i])
+        if joined.strip():
+            out.append(
+                {
+                    "text": joined,
+                    "bbox": [int(v) for v in boxes[g]],
+                    "conf": float(confs[g]),
+                }
+            )
+    return out
+
+
+def ocr_with_tesseract(img: np.ndarray, allowlist: Optional[str] = None) -> List[Dict]:
+    """使用 Tesseract 进行文本识别（回退方案）；allowlist 限制识别字符集"""
+    if TESSERACT_BACKEND == "tesserocr":
+        return words_to_lines(tesserocr_words(img, allowlist))
+    config = TESSERACT_CONFIG
+    if OCR_MODEL_DIR:
+        config += f' --tessdata-dir "{OCR_MODEL_DIR}"'
+    if allowlist:
+        # pytesseract 用 shlex.split 拆分 config：白名单里的 ' 必须转义；
+        # 空格去掉即可，Tesseract 的分词不受白名单影响
+        whitelist = "tessedit_char_whitelist=" + allowlist.replace(" ", "")
+        config += " -c " + shlex.quote(whitelist)
     try:
         data = pytesseract.image_to_data(
-            img, lang="eng", config=config, output_type=pytesseract.Output.DICT
+            img,
+            lang=TESSERACT_LANG,
+            config=config,
+            output_type=pytesseract.Output.DICT,
         )
     except Exception as e:
         if "tesseract is not installed" in str(e).lower():
@@ -175,43 +592,77 @@ def ocr_with_tesseract(img: np.ndarray) -> List[Dict]:
                 "pip install easyocr"
             ) from e
         raise e
+    return words_to_lines(data)
 
-    n = len(data["text"])
-    lines = {}
-    for i in range(n):
-        text = data["text"][i].strip()
-        conf = float(data["conf"][i]) if data["conf"][i] != "-1" else -1
-        if conf < 0:
-            continue
-        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
-        bbox = (data["left"][i], data["top"][i], data["width"][i], data["height"][i])
-        if key not in lines:
-            lines[key] = {
-                "text": [],
-                "bbox": [bbox[0], bbox[1], bbox[0] + bbox[2], bbox[1] + bbox[3]],
-                "confs": [],
-            }
-        lines[key]["text"].append(text)
-        lines[key]["confs"].append(conf)
-        # 扩展 bbox
-        l, t, r, b = lines[key]["bbox"]
-        l = min(l, bbox[0])
-        t = min(t, bbox[1])
-        r = max(r, bbox[0] + bbox[2])
-        b = max(b, bbox[1] + bbox[3])
-        lines[key]["bbox"] = [l, t, r, b]
 
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein 距离，超过 limit 时提前返回 limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+@lru_cache(maxsize=4096)
+def lexicon_word(token: str) -> Optional[str]:
+    """
+    单词按词表纠正：短词必须完全一致，3-5 个字母允许 1 处编辑，更长允许 2 处；
+    多个候选距离相同时不纠正（返回 None）。
+    """
+    token = token.lower()
+    if token in ROOM_LEXICON:
+        return token
+    limit = 0 if len(token) <= 2 else (1 if len(token) <= 5 else 2)
+    best, best_d, tie = None, limit + 1, False
+    for word in ROOM_LEXICON:
+        d = _edit_distance(token, word, limit)
+        if d < best_d:
+            best, best_d, tie = word, d, False
+        elif d == best_d:
+            tie = True
+    return None if tie or best_d > limit else best
+
+
+_LEXICON_TOKEN = re.compile(r"[^\W_]+(?:[.,]\d+)?")
+_DIGIT_AS_LETTER = str.maketrans("015", "ols")  # 字母被识别成数字的常见混淆
+
+
+def _lexicon_tokens(tok: str) -> List[str]:
+    """单个 OCR 单词 -> 词表单词 / 卧室编号（可能为空）"""
+    if tok.isdigit():
+        return [tok] if len(tok) == 1 and tok != "0" else []
+    if not any(c.isalpha() for c in tok):
+        return []  # 尺寸、面积等数字
+    m = re.fullmatch(r"([^\W\d_]+)([1-9])", tok)
+    if m and lexicon_word(m.group(1)):
+        return [lexicon_word(m.group(1)).upper(), m.group(2)]  # BED2
+    word = lexicon_word(tok.lower().translate(_DIGIT_AS_LETTER))
+    return [word.upper()] if word else []
+
+
+def lexicon_decode(lines: List[Dict]) -> List[Dict]:
+    """
+    按房间词表解码 OCR 行：单词纠正到词表（见 lexicon_word），保留单个数字
+    （卧室编号），其余丢弃；没有任何词表单词的行（尺寸、门窗编号、备注）
+    直接拒绝，不再进入片段合并与标签解析。
+    """
     out = []
-    for _, v in lines.items():
-        joined = " ".join([x for x in v["text"] if x])
-        if joined.strip():
-            out.append(
-                {
-                    "text": joined,
-                    "bbox": v["bbox"],
-                    "conf": float(np.mean(v["confs"])) if v["confs"] else 0.0,
-                }
-            )
+    for ln in lines:
+        text = ln["text"].replace("'", "").replace("’", "")
+        words = [
+            w for tok in _LEXICON_TOKEN.findall(text) for w in _lexicon_tokens(tok)
+        ]
+        if any(not w.isdigit() for w in words):
+            out.append({**ln, "text": " ".join(words)})
+    if len(out) < len(lines):
+        OCR_LINES_REJECTED.inc(len(lines) - len(out))
     return out
 
 
@@ -279,55 +730,1271 @@ def to_palace9(xy: Tuple[float, float]) -> str:
     return grid[(col, row)]
 
 
-def detect_layout(
-    image_path: str, north_deg: float, house_facing: Optional[str] = None
-) -> Dict:
-    img = cv2.imread(image_path)
-    if img is None:
-        raise FileNotFoundError(image_path)
-    H, W = img.shape[:2]
-    prep = preprocess_for_ocr(img)
-    lines = ocr_lines(prep)
+# OCR 常把一个标签拆成几行（"MASTER" / "BED"、"WALK IN" / "ROBE"）
+FRAGMENT_GAP = 1.5  # 同一行相邻片段的最大水平间距（× 字高）
+FRAGMENT_LEADING = 1.0  # 上下两行片段的最大行距（× 字高）
 
-    rooms: List[DetectedLabel] = []
-    for ln in lines:
-        norm = normalize_label(ln["text"])
-        if not norm:
+
+def _follows(a: Dict, b: Dict) -> bool:
+    """按阅读顺序 b 紧跟在 a 之后：同一行的右侧，或下一行且水平方向重叠"""
+    al, at, ar, ab = a["bbox"]
+    bl, bt, br, bb = b["bbox"]
+    h = min(ab - at, bb - bt)
+    if h <= 0:
+        return False
+    if min(ab, bb) - max(at, bt) >= 0.5 * h:
+        return bl > al and -0.5 * h <= bl - ar <= FRAGMENT_GAP * h
+    overlap = min(ar, br) - max(al, bl)
+    return (
+        overlap >= 0.3 * min(ar - al, br - bl)
+        and -0.3 * h <= bt - ab <= FRAGMENT_LEADING * h
+    )
+
+
+def merge_fragments(lines: List[Dict]) -> List[Dict]:
+    """
+    把相邻的文字片段合并成一行：只有拼接后的文字归一化出与两段各自都不同
+    的结果时才合并（"MASTER"+"BED" -> master_bedroom，而 "KITCHEN"+"3.6 x 4.2"
+    保持不变）。近邻通过均匀网格索引查找，不做两两比较。
+
+    Merge neighbouring OCR fragments whose joined text normalizes to a new
+    label; neighbours come from a uniform-grid index.
+    """
+    if len(lines) < 2:
+        return lines
+    heights = sorted(ln["bbox"][3] - ln["bbox"][1] for ln in lines)
+    index = GridIndex(max(1.0, 3.0 * heights[len(heights) // 2]))
+    items = dict(enumerate(lines))
+    for i, ln in items.items():
+        index.insert(i, ln["bbox"])
+    norms: Dict[str, Optional[Tuple[str, Dict]]] = {}
+
+    def norm(text: str):
+        if text not in norms:
+            norms[text] = normalize_label(text)
+        return norms[text]
+
+    # 合并后的行重新入栈，继续尝试与下一段合并（"WALK" + "IN" + "ROBE"）
+    todo = sorted(items, reverse=True)
+    while todo:
+        i = todo.pop()
+        a = items.get(i)
+        if a is None:
+            continue
+        l, t, r, b = a["bbox"]
+        h = b - t
+        region = (l - h, t - 0.5 * h, r + FRAGMENT_GAP * h, b + FRAGMENT_LEADING * h)
+        for j in index.query(region):
+            c = items[j]
+            if j == i or not _follows(a, c):
+                continue
+            text = f"{a['text']} {c['text']}"
+            joined = norm(text)
+            if not joined or joined in (norm(a["text"]), norm(c["text"])):
+                continue
+            cl, ct, cr, cb = c["bbox"]
+            items[i] = {
+                **a,
+                "text": text,
+                "bbox": [min(l, cl), min(t, ct), max(r, cr), max(b, cb)],
+                "conf": min(float(a["conf"]), float(c["conf"])),
+            }
+            del items[j]
+            index.remove(j)
+            index.insert(i, items[i]["bbox"])
+            todo.append(i)
+            break
+    return [items[i] for i in sorted(items)]
+
+
+# 同一标签的重叠框（分块、多轮识别、EasyOCR 重叠输出）视为重复
+NMS_OVERLAP = 0.5  # 交集 / 较小框面积
+
+
+def overlapping_pairs(
+    boxes: np.ndarray, overlap: float = NMS_OVERLAP
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    重叠度 >= overlap 的框对 (i, j)。按左边界排序后用 searchsorted 一次求出
+    每个框在 x 方向可能相交的区间（sweep and prune），只对这些候选对做向量化
+    的重叠计算，不生成 N x N 矩阵。
+    """
+    n = len(boxes)
+    srt = np.argsort(boxes[:, 0], kind="stable")
+    b = boxes[srt]
+    hi = np.searchsorted(b[:, 0], b[:, 2], side="right")
+    counts = np.maximum(hi - np.arange(n) - 1, 0)
+    i = np.repeat(np.arange(n), counts)
+    starts = np.cumsum(counts) - counts
+    j = i + 1 + (np.arange(len(i)) - np.repeat(starts, counts))
+    w = np.minimum(b[i, 2], b[j, 2]) - b[j, 0]
+    h = np.minimum(b[i, 3], b[j, 3]) - np.maximum(b[i, 1], b[j, 1])
+    inter = np.maximum(w, 0) * np.maximum(h, 0)
+    area = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    ov = inter / np.maximum(np.minimum(area[i], area[j]), 1e-9)
+    hit = ov >= overlap
+    return srt[i[hit]], srt[j[hit]]
+
+
+def nms_boxes(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    groups: np.ndarray,
+    overlap: float = NMS_OVERLAP,
+) -> np.ndarray:
+    """
+    按组做贪心 NMS，返回保留下标（升序）。boxes 为 (N, 4) 的 l, t, r, b。
+    不同组的框沿 x 方向平移到互不相交的区间，一次处理所有组。
+    重叠度用交集 / 较小框面积，"BED" 落在 "BEDROOM" 框内也算重复。
+    """
+    n = len(boxes)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    b = np.asarray(boxes, dtype=np.float64).copy()
+    b[:, 2:] = np.maximum(b[:, 2:], b[:, :2])
+    span = b[:, [0, 2]].max() - b[:, [0, 2]].min() + 1.0
+    b[:, [0, 2]] += np.asarray(groups, dtype=np.float64)[:, None] * 2.0 * span
+    pi, pj = overlapping_pairs(b, overlap)
+    # 邻接表（CSR）：每个框的重复候选
+    src = np.concatenate([pi, pj])
+    dst = np.concatenate([pj, pi])
+    srt = np.argsort(src, kind="stable")
+    dst = dst[srt]
+    ptr = np.searchsorted(src[srt], np.arange(n + 1))
+    order = np.argsort(-np.asarray(scores, dtype=np.float64), kind="stable")
+    dropped = np.zeros(n, dtype=bool)
+    keep = []
+    for i in order:
+        if dropped[i]:
             continue
-        norm_label, meta = norm
+        keep.append(i)
+        dropped[dst[ptr[i] : ptr[i + 1]]] = True
+    return np.sort(np.asarray(keep, dtype=np.int64))
+
+
+def consolidate_labels(
+    normed: List[Tuple[Dict, Tuple[str, Dict]]], overlap: float = NMS_OVERLAP
+) -> List[Tuple[Dict, Tuple[str, Dict]]]:
+    """同一归一化标签（卧室按编号区分）的重叠候选只保留置信度最高的一个"""
+    if len(normed) < 2:
+        return normed
+    keys: Dict[Tuple[str, Optional[int]], int] = {}
+    groups = [
+        keys.setdefault((norm, meta.get("number")), len(keys))
+        for _, (norm, meta) in normed
+    ]
+    boxes = np.array([ln["bbox"] for ln, _ in normed], dtype=np.float64)
+    scores = np.array([float(ln["conf"]) for ln, _ in normed])
+    keep = nms_boxes(boxes, scores, np.array(groups), overlap)
+    return [normed[i] for i in keep]
+
+
+def normalize_lines(lines: List[Dict]) -> List[Tuple[Dict, Tuple[str, Dict]]]:
+    """
+    合并拆开的标签片段，保留能归一化为房间类型的 OCR 行并去掉重复候选，
+    返回 (行, 归一化结果)
+    """
+    out = []
+    for ln in merge_fragments(lines):
+        norm = normalize_label(ln["text"])
+        if norm:
+            out.append((ln, norm))
+    return consolidate_labels(out)
+
+
+def place_label(
+    ln: Dict,
+    norm: Tuple[str, Dict],
+    W: int,
+    H: int,
+    north_deg: float,
+    frame: Optional[Tuple[float, float, float, float]] = None,
+) -> DetectedLabel:
+    """
+    根据整图像素坐标计算中心、八方位与九宫。
+    frame=(l, t, w, h) 时九宫以该框（平面外框）为准，否则以整图为准。
+    """
+    norm_label, meta = norm
+    l, t, r, b = ln["bbox"]
+    fx, fy, fw, fh = frame or (0, 0, W, H)
+    cx = ((l + r) / 2.0 - fx) / fw
+    cy = ((t + b) / 2.0 - fy) / fh
+    cxr, cyr = rotate_point((cx, cy), north_deg)
+    direction = to_direction8((cxr, cyr))
+    palace = to_palace9((cxr, cyr))
+    return DetectedLabel(
+        raw_text=ln["text"],
+        norm_label=(
+            norm_label
+            if not (norm_label == "bedroom" and "number" in meta)
+            else f"bedroom_{meta['number']}"
+        ),
+        bbox=(l, t, r - l, b - t),
+        conf=float(ln["conf"]),
+        center_xy=(round(cxr, 4), round(cyr, 4)),
+        direction8=direction,
+        palace9=palace,
+    )
+
+
+def build_rooms(
+    lines: List[Dict], W: int, H: int, north_deg: float, frame=None
+) -> List[DetectedLabel]:
+    return [
+        place_label(ln, norm, W, H, north_deg, frame)
+        for ln, norm in normalize_lines(lines)
+    ]
+
+
+# 评分依赖的关键标签；首轮识别缺失时升级到更强的配置再识别
+KEY_LABELS = {"kitchen": {"kitchen"}, "master": {"master_bedroom"}}
+FACING_LABELS = {"entry", "alfresco"}  # infer_house_facing 需要其一
+ESCALATE_PROFILE = {"fast": "balanced", "balanced": "scan", "scan": "scan"}
+
+
+TEMPLATE_LEARN_CONF = 0.8  # 用于学习模板的 OCR 行的最低置信度
+TEMPLATE_BLOCK_PAD = 6  # 未匹配文字块拼图时的留白（像素）
+
+
+def confirmed_lines(lines: List[Dict]) -> List[Dict]:
+    """可用于学习标签模板的 OCR 行：高置信度、能解析成房间的水平文字"""
+    out = []
+    for ln in lines:
+        conf = float(ln["conf"])
+        conf = conf / 100.0 if conf > 1.0 else conf  # Tesseract 为 0~100
         l, t, r, b = ln["bbox"]
-        cx = (l + r) / 2.0 / W
-        cy = (t + b) / 2.0 / H
-        cxr, cyr = rotate_point((cx, cy), north_deg)
-        direction = to_direction8((cxr, cyr))
-        palace = to_palace9((cxr, cyr))
-        item = DetectedLabel(
-            raw_text=ln["text"],
-            norm_label=(
-                norm_label
-                if not (norm_label == "bedroom" and "number" in meta)
-                else f"bedroom_{meta['number']}"
-            ),
-            bbox=(l, t, r - l, b - t),
-            conf=float(ln["conf"]),
-            center_xy=(round(cxr, 4), round(cyr, 4)),
-            direction8=direction,
-            palace9=palace,
+        if (
+            conf >= TEMPLATE_LEARN_CONF
+            and r - l > b - t
+            and normalize_label(ln["text"])
+        ):
+            out.append(ln)
+    return out
+
+
+def ocr_blocks(
+    gray: np.ndarray, boxes: List[Tuple[int, int, int, int]], profile: str
+) -> List[Dict]:
+    """
+    只 OCR 给定的文字块 (l, t, r, b)：裁出后上下拼成一张小图识别一次，
+    每行按中心所在的块映射回 gray 坐标
+    """
+    if not boxes:
+        return []
+    pad = TEMPLATE_BLOCK_PAD
+    H, W = gray.shape[:2]
+    crops, origins = [], []
+    for l, t, r, b in boxes:
+        x0, y0 = max(l - pad, 0), max(t - pad, 0)
+        crops.append(gray[y0 : min(b + pad, H), x0 : min(r + pad, W)])
+        origins.append((x0, y0))
+    width = max(c.shape[1] for c in crops) + 2 * pad
+    height = sum(c.shape[0] + pad for c in crops) + pad
+    montage = np.full((height, width), 255, dtype=gray.dtype)
+    tops, y = [], pad
+    for c in crops:
+        montage[y : y + c.shape[0], pad : pad + c.shape[1]] = c
+        tops.append(y)
+        y += c.shape[0] + pad
+    out = []
+    for ln in ocr_lines(preprocess_for_ocr(montage, profile)):
+        l, t, r, b = ln["bbox"]
+        i = max(0, int(np.searchsorted(tops, (t + b) / 2.0, side="right")) - 1)
+        dx, dy = origins[i][0] - pad, origins[i][1] - tops[i]
+        out.append({**ln, "bbox": [l + dx, t + dy, r + dx, b + dy]})
+    return out
+
+
+def missing_key_labels(lines: List[Dict], need_facing: bool) -> List[str]:
+    """首轮结果缺少的关键标签（entry 仅在需要推断朝向时检查）"""
+    found = {norm[0] for _, norm in normalize_lines(lines)}
+    missing = [k for k, labels in KEY_LABELS.items() if not found & labels]
+    if need_facing and not found & FACING_LABELS:
+        missing.insert(0, "entry")
+    return missing
+
+
+def _overlaps(a: List[float], b: List[float]) -> bool:
+    """a 的中心落在 b 内，或 b 的中心落在 a 内"""
+    acx, acy = (a[0] + a[2]) / 2.0, (a[1] + a[3]) / 2.0
+    bcx, bcy = (b[0] + b[2]) / 2.0, (b[1] + b[3]) / 2.0
+    return (b[0] <= acx <= b[2] and b[1] <= acy <= b[3]) or (
+        a[0] <= bcx <= a[2] and a[1] <= bcy <= a[3]
+    )
+
+
+def merge_lines(base: List[Dict], extra: List[Dict]) -> List[Dict]:
+    """
+    合并两轮识别结果：新行与已有行重叠时，只在新行能识别为房间而旧行不能
+    （或同为房间但置信度更高）时替换，否则丢弃；不重叠的新行直接加入。
+    """
+    out = list(base)
+    for ln in extra:
+        hit = next(
+            (i for i, old in enumerate(out) if _overlaps(ln["bbox"], old["bbox"])), None
+        )
+        if hit is None:
+            out.append(ln)
+            continue
+        new_room, old_room = normalize_label(ln["text"]), normalize_label(
+            out[hit]["text"]
         )
-        rooms.append(item)
+        if (new_room and not old_room) or (
+            bool(new_room) == bool(old_room) and ln["conf"] > out[hit]["conf"]
+        ):
+            out[hit] = ln
+    return out
+
+
+def unrotate_lines(lines: List[Dict], k: int, W: int, H: int) -> List[Dict]:
+    """
+    np.rot90(img, k) 上的 OCR 框映射回原图 (W, H)
+    （k = 1 逆时针 90° / 2 180° / 3 顺时针 90°，0 原样返回）
+    """
+    k %= 4
+    if k == 0:
+        return lines
+    out = []
+    for ln in lines:
+        x0, y0, x1, y1 = ln["bbox"]
+        if k == 1:
+            bbox = [W - y1, x0, W - y0, x1]
+        elif k == 2:
+            bbox = [W - x1, H - y1, W - x0, H - y0]
+        else:
+            bbox = [y0, H - x1, y1, H - x0]
+        out.append({**ln, "bbox": bbox})
+    return out
+
+
+def escalate_ocr(
+    img: np.ndarray,
+    prep: np.ndarray,
+    lines: List[Dict],
+    profile: str,
+    need_facing: bool,
+    timer=NULL_TIMER,
+    detect_scale: Optional[float] = None,
+    known: Sequence[Dict] = (),
+) -> List[Dict]:
+    """
+    首轮缺少关键标签时依次升级：
+    1) 更强的预处理配置 + 全分辨率文字检测；
+    2) 仍缺失时把图旋转 90°/270° 再识别（竖排标签）。
+    每一步的结果与已有结果合并，关键标签齐全即停止。
+    detect_scale 为首轮所用的值：预处理已是最强且首轮已在全分辨率上检测
+    （或引擎是不缩放检测的 Tesseract）时，第 1 步与首轮相同，直接跳过。
+    known：img 之外已识别的行（修订版沿用的房间），只参与判断是否缺关键标签。
+    """
+    known = list(known)
+    missing = missing_key_labels(known + lines, need_facing)
+    steps = []
+    stronger = ESCALATE_PROFILE[profile]
+    if detect_scale is None:
+        detect_scale = choose_detect_scale(prep.shape)
+    same_pass = stronger == profile and (
+        not EASYOCR_AVAILABLE or detect_scale >= FULL_RES_DETECT
+    )
+    if missing and not same_pass:
+        if stronger != profile:
+            prep = preprocess_for_ocr(img, stronger)
+        lines = merge_lines(lines, ocr_lines(prep, detect_scale=1.0))
+        steps.append(f"profile:{stronger}")
+        missing = missing_key_labels(known + lines, need_facing)
+    if missing:
+        H, W = prep.shape[:2]
+        for k in (1, 3):
+            rotated = np.ascontiguousarray(np.rot90(prep, k))
+            found = ocr_lines(rotated, detect_scale=1.0)
+            lines = merge_lines(lines, unrotate_lines(found, k, W, H))
+        steps.append("rotate")
+        missing = missing_key_labels(known + lines, need_facing)
+    for step in steps:
+        OCR_ESCALATIONS.labels(step=step.split(":")[0]).inc()
+    timer.set(escalation=steps, missing_labels=missing)
+    return lines
+
+
+# 整页方向估计：off = 不估计；auto = 文字以竖排为主时判断转 90° 还是 270°；
+# full = 另外检查横排文字是否倒置（180°，每张图多两次小图 OCR）
+ORIENTATION_MODES = ("off", "auto", "full")
+ORIENT_GLYPH = (6, 120)  # 字符连通域的短边下限 / 长边上限（像素）
+ORIENT_GLYPH_ASPECT = 4.0  # 长边 / 短边上限，排除墙线
+ORIENT_GAP = 0.8  # 同一行相邻字符的最大间距（字高倍数）
+ORIENT_MIN_PAIRS = 6  # 竖排相邻字符对少于此数时不旋转
+ORIENT_MARGIN = 2.0  # 竖排字符对须超过横排的倍数
+ORIENT_PROBE_LINES = 4  # 判断正反方向时 OCR 的最长文字行数
+ORIENT_PROBE_PAD = 6
+
+
+def glyph_boxes(mask: np.ndarray) -> np.ndarray:
+    """二值图中字符大小的连通域 (l, t, r, b)，N x 4"""
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    x, y, w, h = (stats[1:, k] for k in range(4))
+    short, long = np.minimum(w, h), np.maximum(w, h)
+    keep = (
+        (short >= ORIENT_GLYPH[0])
+        & (long <= ORIENT_GLYPH[1])
+        & (long <= ORIENT_GLYPH_ASPECT * short)
+    )
+    return np.stack([x, y, x + w, y + h], axis=1)[keep]
+
+
+def glyph_pairs(
+    boxes: np.ndarray,
+) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """
+    相邻字符对：横排 = 右侧紧邻、字高相近且上下对齐；竖排 = 下方紧邻、
+    字宽相近且左右对齐（旋转 90° 的文字行）。返回 (横排对, 竖排对)。
+    """
+    horizontal: List[Tuple[int, int]] = []
+    vertical: List[Tuple[int, int]] = []
+    if len(boxes) < 2:
+        return horizontal, vertical
+    sizes = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+    index = GridIndex(2.0 * float(np.median(sizes)))
+    for i, box in enumerate(boxes.tolist()):
+        index.insert(i, box)
+    for i, (l, t, r, b) in enumerate(boxes.tolist()):
+        w, h = r - l, b - t
+        for j in index.query((r, t, r + ORIENT_GAP * h, b)):
+            lj, tj, _, bj = boxes[j]
+            hj = bj - tj
+            if (
+                j != i
+                and lj >= r - 0.2 * h
+                and 0.7 <= hj / h <= 1.4
+                and min(b, bj) - max(t, tj) >= 0.7 * min(h, hj)
+            ):
+                horizontal.append((i, j))
+        for j in index.query((l, b, r, b + ORIENT_GAP * w)):
+            lj, tj, rj, _ = boxes[j]
+            wj = rj - lj
+            if (
+                j != i
+                and tj >= b - 0.2 * w
+                and 0.7 <= wj / w <= 1.4
+                and min(r, rj) - max(l, lj) >= 0.7 * min(w, wj)
+            ):
+                vertical.append((i, j))
+    return horizontal, vertical
+
+
+def text_line_boxes(
+    boxes: np.ndarray, pairs: List[Tuple[int, int]], limit: int
+) -> List[Tuple[int, int, int, int]]:
+    """按相邻字符对连成文字行，返回字符最多的 limit 行的外包框"""
+    parent = list(range(len(boxes)))
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        parent[root(j)] = root(i)
+    groups: Dict[int, List[int]] = {}
+    for i, _ in pairs:
+        groups.setdefault(root(i), [])
+    for i in range(len(boxes)):
+        if root(i) in groups:
+            groups[root(i)].append(i)
+    largest = sorted(groups.values(), key=len, reverse=True)[:limit]
+    out = []
+    for members in largest:
+        sel = boxes[members]
+        out.append(
+            (
+                int(sel[:, 0].min()),
+                int(sel[:, 1].min()),
+                int(sel[:, 2].max()),
+                int(sel[:, 3].max()),
+            )
+        )
+    return out
+
+
+def probe_montage(mask: np.ndarray, lines, k: int) -> np.ndarray:
+    """各文字行裁出后按 np.rot90(., k) 旋转，上下拼成一张小图"""
+    pad = ORIENT_PROBE_PAD
+    H, W = mask.shape[:2]
+    crops = [
+        np.rot90(mask[max(t - pad, 0) : b + pad, max(l - pad, 0) : r + pad], k)
+        for l, t, r, b in lines
+    ]
+    width = max(c.shape[1] for c in crops) + 2 * pad
+    rows = []
+    for c in crops:
+        row = np.zeros((c.shape[0] + pad, width), dtype=mask.dtype)
+        row[pad:, pad : pad + c.shape[1]] = c
+        rows.append(row)
+    rows.append(np.zeros((pad, width), dtype=mask.dtype))
+    return np.ascontiguousarray(np.vstack(rows))
+
+
+def probe_score(lines: List[Dict]) -> Tuple[int, float, float]:
+    """(房间标签行数, 房间标签置信度之和, 全部置信度之和)，越大越像正向"""
+    rooms = [ln for ln in lines if normalize_label(ln["text"])]
+    return (
+        len(rooms),
+        round(sum(float(ln["conf"]) for ln in rooms), 4),
+        round(sum(float(ln["conf"]) for ln in lines), 4),
+    )
+
+
+def estimate_orientation(mask: np.ndarray, mode: str = "auto") -> Tuple[int, Dict]:
+    """
+    整页文字方向 -> (k, 依据)，np.rot90(mask, k) 后文字为正向。
+    先看字符连通域的排列：相邻字符对以上下排列为主说明整页转了 90°/270°；
+    正反方向（90° 还是 270°，mode="full" 时还有 0° 还是 180°）无法从
+    全大写标签的投影区分，只对最长的几行文字拼成的小图各 OCR 一次比较，
+    比整页按多个角度 OCR 便宜得多。证据不足时返回 0。
+    """
+    if mode not in ORIENTATION_MODES:
+        raise ValueError(
+            f"unknown orientation mode {mode!r}, expected one of {ORIENTATION_MODES}"
+        )
+    if mode == "off":
+        return 0, {}
+    boxes = glyph_boxes(mask)
+    horizontal, vertical = glyph_pairs(boxes)
+    info: Dict = {"pairs": {"horizontal": len(horizontal), "vertical": len(vertical)}}
+    turned = len(vertical) >= ORIENT_MIN_PAIRS and len(vertical) > ORIENT_MARGIN * len(
+        horizontal
+    )
+    if not turned and (mode != "full" or len(horizontal) < ORIENT_MIN_PAIRS):
+        return 0, info
+    candidates = (1, 3) if turned else (0, 2)
+    lines = text_line_boxes(
+        boxes, vertical if turned else horizontal, ORIENT_PROBE_LINES
+    )
+    scores = {
+        k: probe_score(ocr_lines(probe_montage(mask, lines, k))) for k in candidates
+    }
+    info["probe"] = {k * 90: v for k, v in scores.items()}
+    a, b = candidates
+    if scores[a] == scores[b]:
+        return 0, info
+    return (a if scores[a] > scores[b] else b), info
+
+
+def recognize_lines(
+    img: np.ndarray,
+    prep: np.ndarray,
+    profile: str,
+    need_facing: bool,
+    timer=NULL_TIMER,
+    detect_scale: Optional[float] = None,
+    escalate: bool = True,
+    orientation: str = "auto",
+    templates: Optional[LabelTemplates] = None,
+    known: Sequence[Dict] = (),
+) -> List[Dict]:
+    """
+    预处理之后的识别流程（detect_layout、批处理流水线与修订版的变化区域
+    共用）：估计整页方向并转正 -> OCR -> 缺关键标签时升级补识别 -> 从结果
+    学习模板。img 为灰度图，prep 为其按 profile 预处理的二值图；坐标映射回
+    img。known 为 img 之外已识别的行，只用于判断是否缺关键标签。
+    """
+    # 整页转正后识别；img 保持原方向供房间分割使用
+    k, evidence = estimate_orientation(prep, orientation)
+    upright = img
+    if k:
+        ORIENTATION_CORRECTIONS.labels(degrees=str(k * 90)).inc()
+        upright = np.ascontiguousarray(np.rot90(img, k))
+        prep = np.ascontiguousarray(np.rot90(prep, k))
+    timer.set(page_rotation=k * 90, orientation=evidence)
+    timer.lap("orientation")
+    lines = ocr_lines(prep, detect_scale=detect_scale)
+    timer.lap("ocr")
+    if escalate:
+        lines = escalate_ocr(
+            upright, prep, lines, profile, need_facing, timer, detect_scale, known
+        )
+        timer.lap("escalate")
+    if templates is not None:
+        learned = templates.learn(upright, confirmed_lines(lines))
+        timer.set(templates_learned=learned)
+    return unrotate_lines(lines, k, img.shape[1], img.shape[0])
+
+
+# OCR 需要的最长边：更大的扫描件按 1/2、1/4、1/8 直接降采样解码
+DECODE_MAX_SIDE = 2560
+_DECODE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+# 读文件头时临时关闭 PIL 的像素上限（超大扫描件正是要降采样解码的对象）
+_PIL_LIMIT_LOCK = threading.Lock()
+
+
+def image_dims(source: Union[str, bytes]) -> Optional[Tuple[int, int]]:
+    """只读文件头得到 (W, H)，不解码像素；读不出时返回 None（回退整图解码）"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with _PIL_LIMIT_LOCK:
+        limit, Image.MAX_IMAGE_PIXELS = Image.MAX_IMAGE_PIXELS, None
+        try:
+            with Image.open(source) as im:
+                return im.size
+        except (OSError, ValueError, Image.DecompressionBombError):
+            return None
+        finally:
+            Image.MAX_IMAGE_PIXELS = limit
+
+
+def reduce_factor(W: int, H: int, max_side: Optional[int]) -> int:
+    """降采样倍数（1/2/4/8）：缩小后最长边仍不小于 max_side"""
+    n = 1
+    while max_side and n < 8 and max(W, H) / (n * 2) >= max_side:
+        n *= 2
+    return n
+
+
+def load_gray(
+    source: Union[str, bytes, np.ndarray], max_side: Optional[int] = DECODE_MAX_SIDE
+) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    直接解码为灰度图（不生成整幅 BGR 缓冲），超大图按比例降采样解码
+    （JPEG 在 DCT 阶段缩放）。返回 (灰度图, 原图 (W, H))。
+
+    Decode straight to grayscale, at reduced resolution for oversized scans.
+    Returns (gray, original (W, H)); OCR coordinates must be scaled by
+    original / decoded size.
+    """
+    if isinstance(source, np.ndarray):
+        gray = source if source.ndim == 2 else cv2.cvtColor(source, cv2.COLOR_BGR2GRAY)
+        return gray, (gray.shape[1], gray.shape[0])
+
+    dims = image_dims(source) if max_side else None
+    flag = _DECODE_FLAGS[reduce_factor(*dims, max_side) if dims else 1]
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        img = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), flag)
+        if img is None:
+            raise ValueError("cannot decode image bytes")
+    else:
+        img = cv2.imread(source, flag)
+        if img is None:
+            raise FileNotFoundError(source)
+
+    h, w = img.shape[:2]
+    if dims is None:
+        return img, (w, h)
+    W, H = dims
+    if W != H and (w > h) != (W > H):  # 解码时按 EXIF 旋转过
+        W, H = H, W
+    return img, (W, H)
+
+
+def scale_lines(
+    lines: List[Dict], sx: float, sy: float, dx: float = 0, dy: float = 0
+) -> List[Dict]:
+    """把裁剪/降采样图上的 OCR 坐标映射回原图：先平移 (dx, dy)，再放大"""
+    if sx == 1 and sy == 1 and dx == 0 and dy == 0:
+        return lines
+    out = []
+    for ln in lines:
+        x0, y0, x1, y1 = ln["bbox"]
+        out.append(
+            {
+                **ln,
+                "bbox": [
+                    int(round((x0 + dx) * sx)),
+                    int(round((y0 + dy) * sy)),
+                    int(round((x1 + dx) * sx)),
+                    int(round((y1 + dy) * sy)),
+                ],
+            }
+        )
+    return out
+
+
+# 平面外框检测：墙体是长的水平/竖直线段，标题、图例、logo、尺寸标注大多不是
+FOOTPRINT_PROBE_SIDE = 800
+FOOTPRINT_MIN_AREA = 0.15  # 外框小于整图该比例时视为检测失败
+FOOTPRINT_PAD = 0.03  # OCR 裁剪时外扩，保留贴着外墙的 porch/alfresco 标签
+
+
+def detect_footprint(gray: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """
+    在缩小的灰度图上提取长直线（墙体），取外接框最大的连通区域，返回其墙线的
+    紧致外接框 (l, t, w, h)（gray 像素坐标）；找不到可信外框时返回 None。
+
+    Footprint = tight bounding box of the walls in the largest connected blob
+    of long horizontal/vertical strokes, found on a downscaled copy.
+    """
+    H, W = gray.shape[:2]
+    s = min(1.0, FOOTPRINT_PROBE_SIDE / float(max(H, W)))
+    small = (
+        cv2.resize(gray, None, fx=s, fy=s, interpolation=cv2.INTER_AREA)
+        if s < 1.0
+        else gray
+    )
+    _, bw = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    h, w = bw.shape
+    k = max(15, max(h, w) // 25)
+    horiz = cv2.morphologyEx(
+        bw, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (k, 1))
+    )
+    vert = cv2.morphologyEx(
+        bw, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, k))
+    )
+    walls = cv2.bitwise_or(horiz, vert)
+    # 相邻墙线（门洞两侧）连成一片后再找连通区域
+    c = max(3, max(h, w) // 50)
+    blobs = cv2.dilate(walls, cv2.getStructuringElement(cv2.MORPH_RECT, (c, c)))
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(blobs, connectivity=8)
+    if n <= 1:
+        return None
+    areas = stats[1:, cv2.CC_STAT_WIDTH] * stats[1:, cv2.CC_STAT_HEIGHT]
+    best = 1 + int(np.argmax(areas))
+    if areas[best - 1] < FOOTPRINT_MIN_AREA * h * w:
+        return None
+    bx, by, bw_, bh_ = stats[best, :4]
+    sl = (slice(by, by + bh_), slice(bx, bx + bw_))
+    ys, xs = np.nonzero((labels[sl] == best) & (walls[sl] > 0))
+    l, t = int((bx + xs.min()) / s), int((by + ys.min()) / s)
+    r = min(W, int(np.ceil((bx + xs.max() + 1) / s)))
+    b = min(H, int(np.ceil((by + ys.max() + 1) / s)))
+    return l, t, r - l, b - t
+
+
+def pad_box(
+    box: Tuple[int, int, int, int], pad: float, W: int, H: int
+) -> Tuple[int, int, int, int]:
+    """按较长边的比例外扩并裁到图内"""
+    l, t, w, h = box
+    p = int(round(pad * max(w, h)))
+    x0, y0 = max(0, l - p), max(0, t - p)
+    x1, y1 = min(W, l + w + p), min(H, t + h + p)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def crop_to_footprint(
+    img: np.ndarray, sx: float = 1.0, sy: float = 1.0
+) -> Tuple[np.ndarray, Tuple[int, int], Optional[List[int]]]:
+    """
+    裁剪到平面外框（外扩 FOOTPRINT_PAD）。返回 (裁剪图, 裁剪偏移 (x, y),
+    原图坐标下的外框 [l, t, w, h] 或 None)；sx/sy 为原图 / img 的比例。
+    """
+    fp = detect_footprint(img)
+    if not fp:
+        return img, (0, 0), None
+    fl, ft, fw, fh = fp
+    frame = [round(fl * sx), round(ft * sy), round(fw * sx), round(fh * sy)]
+    x, y, w, h = pad_box(fp, FOOTPRINT_PAD, img.shape[1], img.shape[0])
+    return img[y : y + h, x : x + w], (x, y), frame
+
+
+def detect_layout(
+    image_path: Union[str, bytes, np.ndarray],
+    north_deg: float,
+    house_facing: Optional[str] = None,
+    metrics: bool = False,
+    on_metrics: Optional[MetricsCallback] = None,
+    max_side: Optional[int] = DECODE_MAX_SIDE,
+    profile: str = "auto",
+    detect_scale: Optional[float] = None,
+    escalate: bool = True,
+    footprint: bool = True,
+    segment: bool = True,
+    templates: Optional[LabelTemplates] = None,
+    orientation: str = "auto",
+) -> Dict:
+    """
+    平面图 -> 结构化 layout。
+    metrics=True 时在结果中附加 "metrics"（各阶段墙钟/CPU 时间、图像尺寸、
+    OCR 行数、匹配房间数）；on_metrics 回调同样会收到这份数据。
+
+    image_path 也可以是图像字节或已解码的 BGR 数组。图像直接解码为灰度，
+    最长边超过 2 * max_side 时降采样解码（坐标仍按原图输出）；max_side=None
+    关闭降采样。profile 选择预处理配置（见 PREPROCESS_PROFILES），默认 "auto"
+    按图像噪声与对比度自动选择。detect_scale 见 ocr_lines。escalate=True 时
+    首轮缺少入口/厨房/主卧会用更强的配置补识别（见 escalate_ocr）。
+    footprint=True 时先检测平面外框，只在框内 OCR，九宫按外框划分，
+    外框记录在结果的 "footprint"（l, t, w, h）中。segment=True 时按墙体分割
+    房间区域，标签所在区域在各宫的面积占比写入房间的 "palace_area"
+    （见 room_regions）。templates 为该图来源的标签模板库（见 label_templates）：
+    模板匹配找齐关键标签时跳过整页 OCR（没有模板的文字块仍拼成小图 OCR），
+    否则回退到 OCR 并从其结果继续学习。
+    orientation 为整页方向估计模式（见 ORIENTATION_MODES / estimate_orientation）：
+    整页旋转导出时先转正再 OCR 一次，坐标映射回原图后再按 north_deg 计算方位。
+    SVG / DXF 矢量平面图（路径后缀或文件字节）直接读取文本实体，不解码、
+    不 OCR、不做房间分割，输出同一格式的 layout（conf=1.0，见 vector_plans）。
+
+    Floorplan -> structured layout. With metrics=True the result carries a
+    "metrics" entry (per-stage wall/CPU time, image size, OCR line count and
+    matched room count); on_metrics receives the same dict.
+    """
+    timer = make_timer("detect_layout", metrics, on_metrics, always=True)
+    ANALYSES_STARTED.inc()
+    try:
+        result = _detect_layout(
+            image_path,
+            north_deg,
+            house_facing,
+            timer,
+            max_side,
+            profile,
+            detect_scale,
+            escalate,
+            footprint,
+            segment,
+            templates,
+            orientation,
+        )
+    except Exception as e:
+        ANALYSES_FAILED.labels(reason=type(e).__name__).inc()
+        raise
+    ANALYSES_COMPLETED.inc()
+    observe_stages(timer.stages)
+    return finish(timer, result, metrics, on_metrics)
+
+
+def _detect_layout(
+    image_path: Union[str, bytes, np.ndarray],
+    north_deg: float,
+    house_facing: Optional[str],
+    timer,
+    max_side: Optional[int] = DECODE_MAX_SIDE,
+    profile: str = "auto",
+    detect_scale: Optional[float] = None,
+    escalate: bool = True,
+    footprint: bool = True,
+    segment: bool = True,
+    templates: Optional[LabelTemplates] = None,
+    orientation: str = "auto",
+) -> Dict:
+    if vector_kind(image_path):
+        plan = read_vector_plan(image_path)
+        timer.lap("vector")
+        timer.set(recognizer="vector", vector_format=plan.kind)
+        W, H = plan.size
+        return assemble_layout(
+            plan.lines, W, H, north_deg, house_facing, timer, plan.frame
+        )
+
+    img, (W, H) = load_gray(image_path, max_side)
+    timer.lap("imread")
+    sx, sy = W / img.shape[1], H / img.shape[0]
+    timer.set(decode_size={"width": img.shape[1], "height": img.shape[0]})
+
+    (x, y), frame = (0, 0), None
+    if footprint:
+        img, (x, y), frame = crop_to_footprint(img, sx, sy)
+        timer.set(footprint=frame)
+        timer.lap("footprint")
+
+    lines = None
+    if templates is not None and len(templates):
+        found, unmatched = templates.match_blocks(img)
+        timer.lap("templates")
+        hit = not missing_key_labels(found, not house_facing)
+        TEMPLATE_MATCHES.labels(result="hit" if hit else "fallback").inc()
+        timer.set(
+            template_labels=len(found),
+            template_unmatched=len(unmatched),
+            recognizer="templates" if hit else "ocr",
+        )
+        if hit and unmatched:
+            # 没有模板的文字块（新的房间名、尺寸标注）拼成小图 OCR，不漏房间
+            if profile == "auto":
+                profile = choose_profile(probe_quality(img))
+            extra = ocr_blocks(img, unmatched, profile)
+            learned = templates.learn(img, confirmed_lines(extra))
+            timer.set(templates_learned=learned)
+            timer.lap("ocr")
+            found = found + extra
+        if hit:
+            lines = found
+    if lines is None:
+        if profile == "auto":
+            quality = probe_quality(img)
+            profile = choose_profile(quality)
+            timer.set(image_quality=quality)
+        timer.set(preprocess_profile=profile)
+        prep = preprocess_for_ocr(img, profile)
+        timer.lap("preprocess")
+        lines = recognize_lines(
+            img,
+            prep,
+            profile,
+            not house_facing,
+            timer,
+            detect_scale,
+            escalate,
+            orientation,
+            templates,
+        )
+    lines = scale_lines(lines, sx, sy, x, y)
+    layout = assemble_layout(lines, W, H, north_deg, house_facing, timer, frame)
+    if segment:
+        raster = segment_rooms(img, frame or (0, 0, W, H), (x, y), sx, sy)
+        n = annotate_palace_area(layout["rooms"], raster, north_deg)
+        timer.set(room_regions=len(raster.region_ids), rooms_with_area=n)
+        timer.lap("segment")
+    return layout
+
+
+def assemble_layout(
+    lines: List[Dict],
+    W: int,
+    H: int,
+    north_deg: float,
+    house_facing: Optional[str] = None,
+    timer=NULL_TIMER,
+    frame: Optional[List[int]] = None,
+) -> Dict:
+    """
+    OCR 行（整图像素坐标）-> layout：标签归一化、方位计算、朝向推断。
+    frame 为平面外框 (l, t, w, h)，九宫以其为准并写入结果的 "footprint"。
+    """
+    normed = normalize_lines(lines)
+    timer.lap("normalize")
+
+    rooms = [place_label(ln, norm, W, H, north_deg, frame) for ln, norm in normed]
 
     if not house_facing:
         guessed = infer_house_facing(rooms)
         house_facing = guessed if guessed in ALLOWED_FACING else None
+    timer.lap("geometry")
 
-    result = {
+    timer.set(
+        image_size={"width": W, "height": H},
+        ocr_line_count=len(lines),
+        room_count=len(rooms),
+    )
+    layout = {
         "image_size": {"width": W, "height": H},
         "north_deg": north_deg,
         "house_facing": house_facing,
         "rooms": [asdict(r) for r in rooms],
         "schema_version": "v1",
     }
-    return result
+    if frame:
+        layout["footprint"] = list(frame)
+    return layout
+
+
+def clamp_roi(
+    roi: Tuple[int, int, int, int], W: int, H: int
+) -> Tuple[int, int, int, int]:
+    """把 (left, top, width, height) 裁剪到图像范围内"""
+    x, y, w, h = (int(round(v)) for v in roi)
+    x0, y0 = max(0, min(x, W)), max(0, min(y, H))
+    x1, y1 = max(x0, min(x + w, W)), max(y0, min(y + h, H))
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        raise ValueError(f"region of interest is empty: {roi}")
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def ocr_region(
+    img: np.ndarray, roi: Tuple[int, int, int, int], north_deg: float, frame=None
+) -> List[DetectedLabel]:
+    """
+    只对框选区域做预处理 + OCR，坐标映射回整图。
+    Run preprocessing + OCR on the selected crop only; coordinates are mapped
+    back to the full image.
+    """
+    H, W = img.shape[:2]
+    x, y, w, h = clamp_roi(roi, W, H)
+    prep = preprocess_for_ocr(img[y : y + h, x : x + w])
+    lines = []
+    for ln in ocr_lines(prep):
+        l, t, r, b = ln["bbox"]
+        lines.append({**ln, "bbox": [l + x, t + y, r + x, b + y]})
+    return build_rooms(lines, W, H, north_deg, frame)
+
+
+def reocr_region(
+    img: np.ndarray,
+    roi: Tuple[int, int, int, int],
+    layout: Dict,
+    house_facing: Optional[str] = None,
+) -> Dict:
+    """
+    用户修正：重新识别框选区域，并合并进已有 layout。
+    框内原有的房间（以 bbox 中心判断）被新结果替换，框外保持不变；
+    未指定朝向时重新推断。
+
+    User correction: re-OCR the selected region and merge it into an existing
+    layout. Rooms whose bbox center falls inside the region are replaced by
+    the new result, rooms outside are kept; facing is re-inferred when not
+    given explicitly.
+    """
+    H, W = img.shape[:2]
+    x, y, w, h = clamp_roi(roi, W, H)
+    new_rooms = ocr_region(
+        img, (x, y, w, h), layout["north_deg"], layout.get("footprint")
+    )
+
+    def inside(room: Dict) -> bool:
+        l, t, bw, bh = room["bbox"]
+        cx, cy = l + bw / 2.0, t + bh / 2.0
+        return x <= cx <= x + w and y <= cy <= y + h
+
+    rooms = [r for r in layout["rooms"] if not inside(r)]
+    added = [asdict(r) for r in new_rooms]
+    # 原 layout 做过房间分割时，新房间同样写入 palace_area，避免评分时混用
+    if added and any("palace_area" in r for r in layout["rooms"]):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        raster = segment_rooms(gray, layout.get("footprint") or (0, 0, W, H))
+        annotate_palace_area(added, raster, layout["north_deg"])
+    rooms += added
+
+    if not house_facing:
+        fields = DetectedLabel.__dataclass_fields__
+        guessed = infer_house_facing(
+            [DetectedLabel(**{k: r[k] for k in fields}) for r in rooms]
+        )
+        house_facing = guessed if guessed in ALLOWED_FACING else None
+
+    return {**layout, "house_facing": house_facing, "rooms": rooms}
+
+
+# 修订版平面图：与上一版配准后只重新识别变化区域
+REVISE_SIDE = 1024  # 配准用缩小图的最长边
+REVISE_MIN_INLIERS = 20  # 配准可信所需的 RANSAC 内点数
+REVISE_DIFF_THRESHOLD = 48  # 对齐后灰度差阈值
+REVISE_MAX_CHANGE = 0.35  # 变化区域超过图像该比例时整图重跑
+REVISE_PAD = 0.015  # 变化区域外扩（× 较长边），保证标签完整
+
+
+def _aligned_fraction(a: np.ndarray, b: np.ndarray, M: np.ndarray) -> float:
+    """把 a 按 M 变换到 b 上后，灰度差超过阈值的像素比例"""
+    warped = cv2.warpAffine(a, M, (b.shape[1], b.shape[0]), borderValue=255)
+    return (
+        float(np.count_nonzero(cv2.absdiff(warped, b) > REVISE_DIFF_THRESHOLD)) / b.size
+    )
+
+
+def register_images(prev: np.ndarray, new: np.ndarray) -> Optional[np.ndarray]:
+    """
+    估计把上一版灰度图映射到新图的相似变换（2x3，像素坐标）。宽高比一致时
+    先试纯缩放（同一版式重新导出最常见），差异足够小就直接采用；否则在缩小图
+    上做 ORB 特征匹配 + RANSAC。都不可信时返回 None。
+    """
+
+    def small(img):
+        s = min(1.0, REVISE_SIDE / float(max(img.shape[:2])))
+        out = cv2.resize(img, None, fx=s, fy=s, interpolation=cv2.INTER_AREA)
+        return out, s
+
+    a, sa = small(prev)
+    b, sb = small(new)
+    (h0, w0), (h1, w1) = prev.shape[:2], new.shape[:2]
+    if abs((w1 / h1) / (w0 / h0) - 1.0) < 0.01:
+        M = np.float64([[w1 / w0, 0, 0], [0, h1 / h0, 0]])
+        Ms = M.copy()
+        Ms[:, :2] *= sb / sa
+        if _aligned_fraction(a, b, Ms) < REVISE_MAX_CHANGE * 0.1:
+            return M
+
+    orb = cv2.ORB_create(1500)
+    ka, da = orb.detectAndCompute(a, None)
+    kb, db = orb.detectAndCompute(b, None)
+    if da is None or db is None:
+        return None
+    matches = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True).match(da, db)
+    if len(matches) < REVISE_MIN_INLIERS:
+        return None
+    src = np.float32([ka[m.queryIdx].pt for m in matches])
+    dst = np.float32([kb[m.trainIdx].pt for m in matches])
+    M, inliers = cv2.estimateAffinePartial2D(
+        src, dst, method=cv2.RANSAC, ransacReprojThreshold=2.0
+    )
+    if M is None or int(inliers.sum()) < REVISE_MIN_INLIERS:
+        return None
+    # 缩小图坐标 -> 原分辨率：new = M_small(prev * sa) / sb
+    M = M.astype(np.float64)
+    M[:, :2] *= sa / sb
+    M[:, 2] /= sb
+    return M
+
+
+def changed_regions(
+    prev: np.ndarray, new: np.ndarray, M: np.ndarray
+) -> List[Tuple[int, int, int, int]]:
+    """对齐后的像素差 -> 变化区域 (l, t, w, h)，相互重叠的区域合并"""
+    H, W = new.shape[:2]
+    warped = cv2.warpAffine(prev, M, (W, H), flags=cv2.INTER_AREA, borderValue=255)
+    diff = cv2.absdiff(cv2.blur(new, (3, 3)), cv2.blur(warped, (3, 3)))
+    mask = (diff > REVISE_DIFF_THRESHOLD).astype(np.uint8)
+    # 去掉配准残差造成的细边
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+    p = max(3, int(REVISE_PAD * max(W, H)))
+    mask = cv2.dilate(mask, cv2.getStructuringElement(cv2.MORPH_RECT, (2 * p, 2 * p)))
+    n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    boxes = [tuple(int(v) for v in stats[i, :4]) for i in range(1, n)]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                if _intersects(_ltrb(boxes[i]), _ltrb(boxes[j])):
+                    a, b = _ltrb(boxes[i]), _ltrb(boxes[j])
+                    l, t = min(a[0], b[0]), min(a[1], b[1])
+                    r, bt = max(a[2], b[2]), max(a[3], b[3])
+                    boxes[i] = (l, t, r - l, bt - t)
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+
+def _ltrb(box: Tuple[int, int, int, int]) -> List[int]:
+    l, t, w, h = box
+    return [l, t, l + w, t + h]
+
+
+def _intersects(a: List[float], b: List[float]) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def revise_layout(
+    image: Union[str, bytes, np.ndarray],
+    previous_image: Union[str, bytes, np.ndarray],
+    previous_layout: Dict,
+    north_deg: Optional[float] = None,
+    house_facing: Optional[str] = None,
+    metrics: bool = False,
+    on_metrics: Optional[MetricsCallback] = None,
+    max_side: Optional[int] = DECODE_MAX_SIDE,
+    escalate: bool = True,
+    orientation: str = "auto",
+) -> Dict:
+    """
+    修订版平面图 -> layout：与上一版配准，按对齐后的像素差找出变化区域，
+    只对这些区域 OCR；变化区域外的房间沿用 previous_layout（坐标映射到新图）。
+    配准失败或变化超过 REVISE_MAX_CHANGE 时退回整图 detect_layout。
+    变化区域与 detect_layout 走同一识别流程（recognize_lines：方向估计、
+    缺关键标签时升级补识别），是否缺关键标签连同沿用的房间一起判断。
+    结果的 "revision" 记录模式、变化区域（原图坐标）与沿用/新识别的房间数。
+
+    Revised floorplan -> layout. OCR runs only on regions that differ from
+    the registered previous version; rooms outside them are carried over.
+    """
+    if north_deg is None:
+        north_deg = previous_layout["north_deg"]
+    timer = make_timer("revise_layout", metrics, on_metrics, always=True)
+    ANALYSES_STARTED.inc()
+    try:
+        result = _revise_layout(
+            image,
+            previous_image,
+            previous_layout,
+            north_deg,
+            house_facing,
+            timer,
+            max_side,
+            escalate,
+            orientation,
+        )
+    except Exception as e:
+        ANALYSES_FAILED.labels(reason=type(e).__name__).inc()
+        raise
+    ANALYSES_COMPLETED.inc()
+    observe_stages(timer.stages)
+    return finish(timer, result, metrics, on_metrics)
+
+
+def _revise_layout(
+    image,
+    previous_image,
+    previous_layout,
+    north_deg,
+    house_facing,
+    timer,
+    max_side,
+    escalate,
+    orientation,
+) -> Dict:
+    new, (W, H) = load_gray(image, max_side)
+    prev, (W0, H0) = load_gray(previous_image, max_side)
+    timer.lap("imread")
+    sx, sy = W / new.shape[1], H / new.shape[0]
+    psx, psy = W0 / prev.shape[1], H0 / prev.shape[0]
+
+    M = register_images(prev, new)
+    timer.lap("register")
+    regions = changed_regions(prev, new, M) if M is not None else None
+    timer.lap("diff")
+    changed = sum(w * h for _, _, w, h in regions or ())
+    if regions is None or changed > REVISE_MAX_CHANGE * new.size:
+        REVISIONS.labels(mode="full").inc()
+        layout = _detect_layout(
+            image,
+            north_deg,
+            house_facing,
+            timer,
+            max_side,
+            escalate=escalate,
+            orientation=orientation,
+        )
+        layout["revision"] = {"mode": "full"}
+        return layout
+    REVISIONS.labels(mode="diff").inc()
+
+    # 上一版房间：原图 -> 上一版解码图 -> 新解码图
+    kept, dropped = [], 0
+    for room in previous_layout["rooms"]:
+        l, t, w, h = room["bbox"]
+        pts = np.float64([[l, t], [l + w, t + h]]) / [psx, psy]
+        (x0, y0), (x1, y1) = pts @ M[:, :2].T + M[:, 2]
+        box = [
+            int(round(v)) for v in (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        ]
+        if any(_intersects(box, _ltrb(r)) for r in regions):
+            dropped += 1
+            continue
+        kept.append({"text": room["raw_text"], "bbox": box, "conf": room["conf"]})
+
+    profile = choose_profile(probe_quality(new))
+    lines = []
+    for x, y, w, h in regions:
+        crop = new[y : y + h, x : x + w]
+        found = recognize_lines(
+            crop,
+            preprocess_for_ocr(crop, profile),
+            profile,
+            house_facing is None,
+            timer,
+            escalate=escalate,
+            orientation=orientation,
+            known=kept + lines,
+        )
+        lines += scale_lines(found, 1.0, 1.0, x, y)
+
+    fp = detect_footprint(new)
+    frame = None
+    if fp:
+        fl, ft, fw, fh = fp
+        frame = [round(fl * sx), round(ft * sy), round(fw * sx), round(fh * sy)]
+    layout = assemble_layout(
+        scale_lines(kept + lines, sx, sy), W, H, north_deg, house_facing, timer, frame
+    )
+    raster = segment_rooms(new, frame or (0, 0, W, H), (0, 0), sx, sy)
+    annotate_palace_area(layout["rooms"], raster, north_deg)
+    timer.lap("segment")
+    layout["revision"] = {
+        "mode": "diff",
+        "changed_regions": [
+            [round(x * sx), round(y * sy), round(w * sx), round(h * sy)]
+            for x, y, w, h in regions
+        ],
+        "kept_rooms": len(kept),
+        "dropped_rooms": dropped,
+        "ocr_lines": len(lines),
+    }
+    timer.set(changed_fraction=round(changed / new.size, 4), regions=len(regions))
+    return layout
 
 
 def main():
@@ -338,8 +2005,8 @@ def main():
     ap.add_argument(
         "--north-deg",
         type=float,
-        default=0.0,
-        help="true north relative to image up, clockwise degrees",
+        help="true north relative to image up, clockwise degrees (default: 0, "
+        "or the previous layout's value with --revise-from)",
     )
     ap.add_argument(
         "--house-facing",
@@ -348,12 +2015,108 @@ def main():
         help="house facing direction: N/NE/E/SE/S/SW/W/NW; if omitted, try to infer from entry/alfresco",
     )
     ap.add_argument("--out", default="layout.json", help="output JSON path")
+    ap.add_argument(
+        "--profile",
+        choices=sorted(PREPROCESS_PROFILES) + ["auto"],
+        default="auto",
+        help="preprocessing profile; auto picks one from image noise/contrast",
+    )
+    ap.add_argument(
+        "--detect-scale",
+        type=float,
+        help="EasyOCR text detection scale (default: auto from image size, 1 = off)",
+    )
+    ap.add_argument(
+        "--metrics",
+        action="store_true",
+        help="attach per-stage timing under the 'metrics' key",
+    )
+    ap.add_argument(
+        "--metrics-textfile",
+        help="also dump pipeline counters/histograms (Prometheus text format)",
+    )
+    ap.add_argument(
+        "--revise-from",
+        metavar="IMAGE",
+        help="previous version of this plan; only changed regions are re-OCRed",
+    )
+    ap.add_argument(
+        "--previous-layout",
+        metavar="JSON",
+        help="layout.json produced for --revise-from",
+    )
+    ap.add_argument(
+        "--vocabulary",
+        choices=OCR_VOCABULARY_MODES,
+        default="off",
+        help="constrain recognition to the room vocabulary "
+        "(allowlist = character set, lexicon = also snap/reject words)",
+    )
+    ap.add_argument(
+        "--templates",
+        metavar="NPZ",
+        help="label templates for this plan's source: matched first (OCR is "
+        "skipped when key labels are found), updated from OCR otherwise",
+    )
+    ap.add_argument(
+        "--orientation",
+        choices=ORIENTATION_MODES,
+        default="auto",
+        help="page orientation check before OCR (auto = 90/270 degree pages, "
+        "full = also upside-down pages, off = never rotate)",
+    )
+    ap.add_argument(
+        "--model-dir",
+        default=OCR_MODEL_DIR,
+        help="offline OCR model bundle (see ocr_models.py; "
+        f"default: ${MODEL_DIR_ENV}, else the engine's own location)",
+    )
     args = ap.parse_args()
+    try:
+        set_ocr_model_dir(args.model_dir)
+    except ModelBundleError as e:
+        ap.exit(2, f"[error] {e}\n")
+    if bool(args.revise_from) != bool(args.previous_layout):
+        ap.error("--revise-from and --previous-layout must be given together")
+    set_ocr_vocabulary(args.vocabulary)
 
-    data = detect_layout(args.image, args.north_deg, args.house_facing)
+    if args.revise_from:
+        with open(args.previous_layout, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        data = revise_layout(
+            args.image,
+            args.revise_from,
+            previous,
+            args.north_deg,
+            args.house_facing,
+            metrics=args.metrics,
+            orientation=args.orientation,
+        )
+    else:
+        templates = None
+        if args.templates:
+            templates = (
+                LabelTemplates.load(args.templates)
+                if os.path.exists(args.templates)
+                else LabelTemplates()
+            )
+        data = detect_layout(
+            args.image,
+            0.0 if args.north_deg is None else args.north_deg,
+            args.house_facing,
+            metrics=args.metrics,
+            profile=args.profile,
+            detect_scale=args.detect_scale,
+            templates=templates,
+            orientation=args.orientation,
+        )
+        if templates is not None and len(templates):
+            templates.save(args.templates)
     with open(args.out, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
     print(f"[ok] saved: {args.out}  rooms={len(data['rooms'])}")
+    if args.metrics_textfile:
+        write_textfile(args.metrics_textfile)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分阶段计时（可选开启）
+Opt-in per-stage timing for the analysis pipeline.
+
+detect_layout / score_layout 在开启 metrics 或设置了回调时，记录每个阶段的
+墙钟时间与 CPU 时间，并附加到结果的 "metrics" 键、同时发送给回调。
+
+    timer = StageTimer()
+    img = load(...)
+    timer.lap("imread")          # 上一次 lap 到现在的耗时记为 imread
+    with timer.stage("ocr"):     # 或者用上下文管理器
+        ...
+    timer.as_dict()
+
+CPU 时间取 time.process_time()，即整个进程（含 OCR 引擎内部线程）的 CPU 时间。
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MetricsCallback = Callable[[Dict], None]
+
+# 全局默认回调（例如接入生产日志）
+_default_callback: Optional[MetricsCallback] = None
+
+
+def set_metrics_callback(callback: Optional[MetricsCallback]) -> None:
+    """设置全局默认的 metrics 回调；传 None 取消"""
+    global _default_callback
+    _default_callback = callback
+
+
+def get_metrics_callback() -> Optional[MetricsCallback]:
+    return _default_callback
+
+
+class StageTimer:
+    """记录各阶段墙钟/CPU 时间以及附加信息"""
+
+    enabled = True
+
+    def __init__(self, kind: str = ""):
+        self.kind = kind
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.info: Dict = {}
+        self._wall0 = self._wall_last = time.perf_counter()
+        self._cpu0 = self._cpu_last = time.process_time()
+
+    def _add(self, name: str, wall: float, cpu: float) -> None:
+        st = self.stages.setdefault(name, {"wall_ms": 0.0, "cpu_ms": 0.0})
+        st["wall_ms"] += wall * 1000.0
+        st["cpu_ms"] += cpu * 1000.0
+
+    def lap(self, name: str) -> None:
+        """把上一次 lap（或创建时刻）到现在的耗时记入 name 阶段"""
+        wall, cpu = time.perf_counter(), time.process_time()
+        self._add(name, wall - self._wall_last, cpu - self._cpu_last)
+        self._wall_last, self._cpu_last = wall, cpu
+
+    @contextmanager
+    def stage(self, name: str):
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter(), time.process_time()
+            self._add(name, wall - wall0, cpu - cpu0)
+            self._wall_last, self._cpu_last = wall, cpu
+
+    def set(self, **info) -> None:
+        self.info.update(info)
+
+    def as_dict(self) -> Dict:
+        wall = time.perf_counter() - self._wall0
+        cpu = time.process_time() - self._cpu0
+        out = {
+            "kind": self.kind,
+            "stages": {
+                k: {"wall_ms": round(v["wall_ms"], 3), "cpu_ms": round(v["cpu_ms"], 3)}
+                for k, v in self.stages.items()
+            },
+            "total_wall_ms": round(wall * 1000.0, 3),
+            "total_cpu_ms": round(cpu * 1000.0, 3),
+        }
+        out.update(self.info)
+        return out
+
+
+class NullTimer:
+    """关闭计时时使用的空实现，开销可以忽略"""
+
+    enabled = False
+    kind = ""
+
+    def lap(self, name: str) -> None:
+        pass
+
+    @contextmanager
+    def stage(self, name: str):
+        yield
+
+    def set(self, **info) -> None:
+        pass
+
+    def as_dict(self) -> Dict:
+        return {}
+
+
+NULL_TIMER = NullTimer()
+
+
+def make_timer(
+    kind: str,
+    metrics: bool,
+    on_metrics: Optional[MetricsCallback],
+    always: bool = False,
+):
+    """只有在需要输出（结果里附加、有回调或 always）时才真正计时"""
+    if always or metrics or on_metrics or _default_callback:
+        return StageTimer(kind)
+    return NULL_TIMER
+
+
+def finish(
+    timer, result: Dict, metrics: bool, on_metrics: Optional[MetricsCallback]
+) -> Dict:
+    """把计时结果附加到 result["metrics"]（如开启）并发送给回调"""
+    if not (timer.enabled and (metrics or on_metrics or _default_callback)):
+        return result
+    data = timer.as_dict()
+    if metrics:
+        result["metrics"] = data
+    for cb in (on_metrics, _default_callback):
+        if cb is None:
+            continue
+        try:
+            cb(data)
+        except Exception:  # 回调失败不影响分析结果
+            logger.exception("metrics callback failed")
+    return result
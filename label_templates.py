@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+标签模板快速识别（同一 CAD 来源的平面图跳过神经网络 OCR）
+Template-matching fast path for room labels rendered in a known font.
+
+同一来源（同一套 CAD 软件/出图模板）的平面图用同样的字体写房间名。对这类
+来源，先用几次 OCR 确认过的结果学习每个标签的灰度模板（"KITCHEN"、"MASTER
+BED"……；带编号的卧室拆成前缀模板 + 数字字形模板），之后的平面图不再跑 OCR：
+先把字符大小的连通域连成文字块，只取尺寸与块相符的模板，按块的大小把块和
+模板缩放到同一字高（多尺度由块本身决定），在块附近的小窗口里
+cv2.matchTemplate。是否可信（关键标签是否齐全）由调用方判断，不可信时回退到
+完整 OCR 并继续学习；可信时没有模板的文字块（新的房间名、尺寸标注）仍须
+由调用方单独 OCR，否则这些房间会被漏掉。
+
+    templates = LabelTemplates.load("templates/acme_cad.npz")
+    lines = templates.match(gray)          # [{"text", "bbox", "conf"}]
+    lines, unmatched = templates.match_blocks(gray)  # 另返回未匹配的文字块
+    templates.learn(gray, confirmed_lines) # OCR 确认过的行
+    templates.save("templates/acme_cad.npz")
+
+非线程安全；每个来源一个实例。
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from spatial_index import GridIndex
+
+TEMPLATES_PER_LABEL = 3  # 每个标签最多保留的样本数
+MIN_SCORE = 0.8  # 接受阈值（归一化相关系数）
+MIN_GLYPH_HEIGHT = 6  # 字符连通域的高度范围（像素）
+MAX_GLYPH_HEIGHT = 120
+GLYPH_ASPECT = 4  # 字符连通域宽高比上限（相连的字母会连成一个连通域）
+BLOCK_GAP = 0.9  # 同一文字块内字符/单词间距上限（× 字高）
+HEIGHT_TOLERANCE = 0.2  # 模板按块宽缩放后与块高的偏差上限
+WINDOW_PAD = 0.15  # 比对窗口外扩（× 字高）
+CANON_HEIGHT = 24  # 比对时块与模板统一缩放到的字高（像素）
+BLUR = 1.5  # 统一字高后的高斯模糊 sigma（像素）
+PREFIX_SCALES = (0.94, 1.0, 1.06)  # 前缀只能按字高估计缩放，在附近再试两档
+NUMBER_WIDTH = 1.6  # 前缀右侧编号（空格 + 一位数字）的最大宽度（× 字高）
+DIGIT_GAP = 0.25  # 前缀与编号之间的最小空白（× 字高）
+INK_LEVEL = 128  # 灰度低于此值视为笔画
+
+_NUMBERED = re.compile(r"^(.*\S)\s+([1-9])$")
+
+
+def split_number(crop: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """ "BED 2" 的紧致裁剪 -> (前缀, 数字)：按列投影找最后一段足够宽的空白"""
+    h = crop.shape[0]
+    ink = (crop < INK_LEVEL).any(axis=0)
+    cols = np.flatnonzero(ink)
+    gaps = np.flatnonzero(np.diff(cols) > max(2, DIGIT_GAP * h))
+    if gaps.size == 0:
+        return None
+    cut = gaps[-1]
+    prefix, digit = crop[:, : cols[cut] + 1], crop[:, cols[cut + 1] :]
+    if digit.shape[1] > h:  # 不是单个字符
+        return None
+    return prefix, digit
+
+
+def _resize(t: np.ndarray, s: float) -> Optional[np.ndarray]:
+    """缩放并模糊：细笔画在不同分辨率下有亚像素错位，模糊后相关系数才稳定"""
+    h, w = max(1, round(t.shape[0] * s)), max(1, round(t.shape[1] * s))
+    if h < 4 or w < 4:
+        return None
+    interp = cv2.INTER_AREA if s < 1 else cv2.INTER_LINEAR
+    return cv2.GaussianBlur(cv2.resize(t, (w, h), interpolation=interp), (0, 0), BLUR)
+
+
+def _horizontal(box) -> bool:
+    l, t, r, b = box
+    return r - l > b - t >= MIN_GLYPH_HEIGHT
+
+
+def _inside(a, b) -> float:
+    """a 落在 b 内的面积比例"""
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    return w * h / float((a[2] - a[0]) * (a[3] - a[1]))
+
+
+def text_blocks(gray: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """
+    文字块候选 (l, t, r, b)：取字符大小的笔画连通域（排除墙线等长条），
+    把同一行、字高相近且间距不超过 BLOCK_GAP 个字高的字符连成块。
+    """
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    x, y, w, h = (stats[1:, k] for k in range(4))
+    glyph = (h >= MIN_GLYPH_HEIGHT) & (h <= MAX_GLYPH_HEIGHT) & (w <= GLYPH_ASPECT * h)
+    boxes = np.stack([x, y, x + w, y + h], axis=1)[glyph].tolist()
+    if not boxes:
+        return []
+    heights = sorted(b - t for _, t, _, b in boxes)
+    index = GridIndex(2.0 * heights[len(heights) // 2])
+    for i, box in enumerate(boxes):
+        index.insert(i, box)
+    parent = list(range(len(boxes)))
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, (l, t, r, b) in enumerate(boxes):
+        h = b - t
+        for j in index.query((r, t, r + BLOCK_GAP * h, b)):
+            _, tj, _, bj = boxes[j]
+            hj = bj - tj
+            if (
+                j != i
+                and 0.5 <= hj / h <= 2.0
+                and min(b, bj) - max(t, tj) >= 0.5 * min(h, hj)
+            ):
+                parent[root(j)] = root(i)
+
+    blocks: Dict[int, List[int]] = {}
+    for i, (l, t, r, b) in enumerate(boxes):
+        k = root(i)
+        if k in blocks:
+            bl, bt, br, bb = blocks[k]
+            blocks[k] = [min(bl, l), min(bt, t), max(br, r), max(bb, b)]
+        else:
+            blocks[k] = [l, t, r, b]
+    return [tuple(bx) for bx in blocks.values() if bx[2] - bx[0] > bx[3] - bx[1]]
+
+
+class LabelTemplates:
+    """
+    一个来源的标签模板库：labels 为 {标签文字: [灰度模板]}，digits 为
+    {数字: [灰度字形]}，numbered 记录哪些前缀后面跟过编号。
+    """
+
+    def __init__(self):
+        self.labels: Dict[str, List[np.ndarray]] = defaultdict(list)
+        self.digits: Dict[str, List[np.ndarray]] = defaultdict(list)
+        self.numbered: set = set()
+        self._canon: Dict[int, Optional[np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self.labels.values())
+
+    # ---- 学习 ----
+
+    def _add(self, bank: Dict[str, List[np.ndarray]], key: str, crop: np.ndarray):
+        samples = bank[key]
+        if len(samples) < TEMPLATES_PER_LABEL:
+            samples.append(np.ascontiguousarray(crop))
+
+    def learn(self, gray: np.ndarray, lines: List[Dict]) -> int:
+        """
+        从 OCR 确认过的水平标签行学习模板（lines 的 bbox 为 gray 上的
+        [l, t, r, b]），返回新增的模板数。
+        """
+        before = len(self) + sum(len(v) for v in self.digits.values())
+        lines = [ln for ln in lines if _horizontal(ln["bbox"])]
+        if not lines:
+            return 0
+        # 与识别时一致：模板取 OCR 框内最宽的文字块（不含贴着标签的墙线）
+        blocks = text_blocks(gray)
+        index = GridIndex(4.0 * CANON_HEIGHT)
+        for i, bx in enumerate(blocks):
+            index.insert(i, bx)
+        for ln in lines:
+            inside = [
+                blocks[i]
+                for i in index.query(ln["bbox"])
+                if _inside(blocks[i], ln["bbox"]) >= 0.6
+            ]
+            if not inside:
+                continue
+            bl, bt, br, bb = max(inside, key=lambda bx: bx[2] - bx[0])
+            crop = gray[bt:bb, bl:br]
+            text = " ".join(ln["text"].upper().split())
+            m = _NUMBERED.match(text)
+            if m:
+                parts = split_number(crop)
+                if parts is None:
+                    continue
+                text = m.group(1)
+                self.numbered.add(text)
+                self._add(self.digits, m.group(2), parts[1])
+                crop = parts[0]
+            self._add(self.labels, text, crop)
+        return len(self) + sum(len(v) for v in self.digits.values()) - before
+
+    # ---- 识别 ----
+
+    def _canonical(self, t: np.ndarray) -> Optional[np.ndarray]:
+        """模板缩放到 CANON_HEIGHT 字高（按样本缓存）"""
+        key = id(t)
+        if key not in self._canon:
+            self._canon[key] = _resize(t, CANON_HEIGHT / float(t.shape[0]))
+        return self._canon[key]
+
+    def match(self, gray: np.ndarray, min_score: float = MIN_SCORE) -> List[Dict]:
+        """
+        在整图上找已学习的标签，返回与 ocr_lines 相同格式的行，conf 为
+        归一化相关系数。每个文字块与模板都缩放到同一字高后比对，只比宽度
+        相符的模板。
+        """
+        return self.match_blocks(gray, min_score)[0]
+
+    def match_blocks(
+        self, gray: np.ndarray, min_score: float = MIN_SCORE
+    ) -> Tuple[List[Dict], List[Tuple[int, int, int, int]]]:
+        """同 match，另返回没有任何模板匹配上的文字块 (l, t, r, b)"""
+        blocks = text_blocks(gray)
+        if not self.labels:
+            return [], blocks
+        out, unmatched = [], []
+        for box in blocks:
+            m = self._match_block(gray, box, min_score)
+            if m is None:
+                unmatched.append(box)
+            else:
+                out.append(m)
+        return out, unmatched
+
+    def _window(self, gray, box, px, py, f):
+        """块外扩 (px, py) 后的窗口按 f 缩放：(窗口, 左上角)"""
+        l, t, r, b = box
+        H, W = gray.shape[:2]
+        x0, y0 = max(0, l - px), max(0, t - py)
+        return _resize(gray[y0 : min(H, b + py), x0 : min(W, r + px)], f), (x0, y0)
+
+    def _best(self, window, templates):
+        """[(键, 模板)] 中与窗口相关系数最高者：(得分, 键, x, y, 模板)"""
+        best = (-1.0, None, 0, 0, None)
+        for key, g in templates:
+            if (
+                g is None
+                or g.shape[0] > window.shape[0]
+                or g.shape[1] > window.shape[1]
+            ):
+                continue
+            res = cv2.matchTemplate(window, g, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (bx, by) = cv2.minMaxLoc(res)
+            if score > best[0]:
+                best = (score, key, bx, by, g)
+        return best
+
+    def _candidates(self, bw: int, bh: int):
+        """
+        与块尺寸相符的模板及其缩放 [(标签, 模板, 块 -> 统一字高的缩放)]。
+        缩放按宽度估计（块高只有十几个像素，±1 像素就是几个百分点的误差）；
+        带编号的前缀比块窄，只能按字高估计，所以多试几档。
+        """
+        out = []
+        for text, samples in self.labels.items():
+            for sample in samples:
+                th, tw = sample.shape
+                s = bw / float(tw)
+                if abs(th * s - bh) <= HEIGHT_TOLERANCE * bh:
+                    out.append((text, sample, CANON_HEIGHT / (th * s)))
+                if text in self.numbered:
+                    # 右侧只留一个编号（空格 + 一位数字）的宽度
+                    s = bh / float(th)
+                    if 0 < bw - tw * s <= NUMBER_WIDTH * bh:
+                        out += [
+                            (text, sample, k * CANON_HEIGHT / float(bh))
+                            for k in PREFIX_SCALES
+                        ]
+        return out
+
+    def _match_block(self, gray, box, min_score) -> Optional[Dict]:
+        l, t, r, b = box
+        bh, bw = b - t, r - l
+        pad = max(2, int(round(WINDOW_PAD * bh)))
+        windows: Dict[float, tuple] = {}
+        best = None
+        for text, sample, f in self._candidates(bw, bh):
+            key = round(f, 3)
+            if key not in windows:
+                windows[key] = self._window(gray, box, pad, pad, f)
+            window, (x0, y0) = windows[key]
+            if window is None:
+                continue
+            score, _, bx, by, g = self._best(window, [(text, self._canonical(sample))])
+            # 须与块左对齐（前缀不能匹配到 "MASTER BEDROOM" 右半边）
+            if score < min_score or abs(bx / f + x0 - l) > pad + 1:
+                continue
+            if best is None or score > best[0]:
+                best = (score, text, bx, by, g, window, (x0, y0), f)
+        if best is None:
+            return None
+        score, text, bx, by, g, window, (x0, y0), f = best
+        gl, gt = x0 + bx / f, y0 + by / f
+        m = {
+            "text": text,
+            "bbox": [gl, gt, gl + g.shape[1] / f, gt + g.shape[0] / f],
+            "conf": round(float(score), 4),
+        }
+        if text in self.numbered and self.digits:
+            self._attach_digit(window, m, (x0, y0), f, bx + g.shape[1], min_score)
+        m["bbox"] = [int(round(v)) for v in m["bbox"]]
+        return m
+
+    def _attach_digit(self, window, m, origin, f, start, min_score) -> None:
+        """前缀右侧（窗口内）找编号字形，找到则并入文字与框"""
+        right = window[:, start:]
+        cands = [
+            (d, self._canonical(g))
+            for d, samples in self.digits.items()
+            for g in samples
+        ]
+        score, digit, bx, by, g = self._best(right, cands)
+        if score >= min_score:
+            x0, y0 = origin
+            l, t, _, b = m["bbox"]
+            gr, gt = x0 + (start + bx + g.shape[1]) / f, y0 + by / f
+            m["text"] = f"{m['text']} {digit}"
+            m["bbox"] = [l, min(t, gt), gr, max(b, gt + g.shape[0] / f)]
+            m["conf"] = round(min(m["conf"], float(score)), 4)
+
+    # ---- 持久化 ----
+
+    def save(self, path: str) -> None:
+        arrays = {}
+        for kind, bank in (("label", self.labels), ("digit", self.digits)):
+            for key, samples in bank.items():
+                for i, t in enumerate(samples):
+                    arrays[f"{kind}|{key}|{i}"] = t
+        arrays["numbered"] = np.array(sorted(self.numbered), dtype=str)
+        with open(path, "wb") as f:  # 传文件对象，np.savez 不会再追加 .npz
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "LabelTemplates":
+        self = cls()
+        with np.load(path) as data:
+            for name in data.files:
+                if name == "numbered":
+                    self.numbered = set(data[name].tolist())
+                    continue
+                kind, key, _ = name.split("|")
+                bank = self.labels if kind == "label" else self.digits
+                bank[key].append(data[name])
+        return self
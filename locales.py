@@ -94,6 +94,17 @@ ZH_TEXTS = {
     "optimization_advice": "💡 优化建议",
     "no_advice": "暂无特殊建议",
     "advice_prefix": "建议",
+    # 区域修正
+    "region_correction": "✏️ 修正识别区域",
+    "region_correction_help": "框选漏识别或识别错误的标签区域，仅对该区域重新识别并重新评分",
+    "region_draw_help": "在平面图上拖动、缩放红框，框住要重新识别的标签",
+    "region_x": "左边界 (px)",
+    "region_y": "上边界 (px)",
+    "region_width": "宽度 (px)",
+    "region_height": "高度 (px)",
+    "region_preview_caption": "框选区域预览",
+    "region_reocr_button": "🔁 重新识别该区域",
+    "region_reocr_success": "区域重新识别完成：当前共 {count} 个房间，用时 {seconds:.2f} 秒",
 }
 
 # 英文文本
@@ -184,6 +195,17 @@ EN_TEXTS = {
     "optimization_advice": "💡 Optimization Advice",
     "no_advice": "No special advice available",
     "advice_prefix": "Advice",
+    # Region correction
+    "region_correction": "✏️ Correct a Region",
+    "region_correction_help": "Select the area of a missed or misread label; only that area is re-recognized and rescored",
+    "region_draw_help": "Drag and resize the red box on the plan to cover the label to re-recognize",
+    "region_x": "Left (px)",
+    "region_y": "Top (px)",
+    "region_width": "Width (px)",
+    "region_height": "Height (px)",
+    "region_preview_caption": "Selected region preview",
+    "region_reocr_button": "🔁 Re-recognize Region",
+    "region_reocr_success": "Region re-recognized: {count} rooms in total, took {seconds:.2f}s",
 }
 
 # 语言映射
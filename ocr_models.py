@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+离线 OCR 模型包：校验和清单 + 离线加载
+Offline OCR model bundle: checksum manifest, offline verification and
+download-free engine loading.
+
+easyocr.Reader(["en"]) 首次使用时联网下载模型，之后从 ~/.EasyOCR 读取，
+在隔离网络的节点上无法启动；Tesseract 同样依赖系统 tessdata。模型包是
+一个普通目录：引擎原样的模型文件 + manifest.json（每个文件的 sha256 与
+字节数）。在能联网的机器上打包，拷到节点后用 --model-dir 或环境变量
+FENGSHUI_OCR_MODELS 指定：
+
+    python ocr_models.py pack --out /opt/fengshui/ocr-models \\
+        --easyocr ~/.EasyOCR/model --tessdata /usr/share/tesseract-ocr/5/tessdata
+    python ocr_models.py verify /opt/fengshui/ocr-models
+    python fp2layout.py --model-dir /opt/fengshui/ocr-models --image plan.png ...
+
+- 模型文件保持原样（EasyOCR 自己还会按 MD5 检查），禁止下载；缺文件或
+  校验失败时抛 ModelBundleError，消息里列出全部问题和打包命令。
+- 完整 sha256 校验只需在主进程启动时做一次，工作进程只比对字节数。
+- 每个工作进程仍各自持有一份权重：EasyOCR 把 torch.load 的结果拷进
+  新分配的参数（CPU 上还会做动态量化），模型包只解决离线与校验问题。
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from typing import Dict, Optional, Sequence
+
+MANIFEST = "manifest.json"
+MODEL_DIR_ENV = "FENGSHUI_OCR_MODELS"
+# 各引擎需要的文件（EasyOCR: CRAFT 检测 + 英文识别；Tesseract: 英文 tessdata）
+ENGINE_FILES = {
+    "easyocr": ("craft_mlt_25k.pth", "english_g2.pth"),
+    "tesseract": ("eng.traineddata",),
+}
+HASH_CHUNK = 1 << 20
+
+
+class ModelBundleError(RuntimeError):
+    """模型包缺失、不完整或校验失败"""
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_manifest(model_dir: str) -> Dict:
+    """为目录中的全部模型文件写 manifest.json，返回清单"""
+    files = {}
+    for name in sorted(os.listdir(model_dir)):
+        path = os.path.join(model_dir, name)
+        if name == MANIFEST or not os.path.isfile(path):
+            continue
+        files[name] = {"sha256": sha256_file(path), "size": os.path.getsize(path)}
+    manifest = {"version": 1, "files": files}
+    with open(os.path.join(model_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def pack(
+    out_dir: str,
+    easyocr_dir: Optional[str] = None,
+    tessdata_dir: Optional[str] = None,
+) -> Dict:
+    """把已下载的模型文件拷进 out_dir 并生成清单（需在能联网的机器上先下载）"""
+    sources = (
+        (easyocr_dir, ENGINE_FILES["easyocr"]),
+        (tessdata_dir, ENGINE_FILES["tesseract"]),
+    )
+    os.makedirs(out_dir, exist_ok=True)
+    missing = []
+    for src, names in sources:
+        if not src:
+            continue
+        for name in names:
+            path = os.path.join(os.path.expanduser(src), name)
+            if os.path.isfile(path):
+                shutil.copy2(path, os.path.join(out_dir, name))
+            else:
+                missing.append(path)
+    if missing:
+        raise ModelBundleError("cannot pack, missing: " + ", ".join(missing))
+    return write_manifest(out_dir)
+
+
+def read_manifest(model_dir: str) -> Dict:
+    path = os.path.join(model_dir, MANIFEST)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise ModelBundleError(f"{path} not found; {_hint(model_dir)}") from None
+    except ValueError as e:
+        raise ModelBundleError(f"{path} is not valid JSON ({e})") from None
+    if not isinstance(manifest.get("files"), dict):
+        raise ModelBundleError(f"{path} has no 'files' table")
+    return manifest
+
+
+def _hint(model_dir: str) -> str:
+    return (
+        "build the bundle on a machine with network access: "
+        f"python ocr_models.py pack --out {model_dir} "
+        "--easyocr ~/.EasyOCR/model --tessdata <tessdata dir>, then copy it here"
+    )
+
+
+def verify_bundle(
+    model_dir: str, engine: str, checksums: bool = True
+) -> Dict[str, str]:
+    """
+    按清单检查 engine 需要的文件（存在、字节数一致，checksums=True 时再比
+    sha256），不联网。返回 {文件名: 路径}；有问题时一次列出全部并抛
+    ModelBundleError。
+    """
+    if not os.path.isdir(model_dir):
+        raise ModelBundleError(f"OCR model directory {model_dir} does not exist")
+    files = read_manifest(model_dir)["files"]
+    problems, paths = [], {}
+    for name in ENGINE_FILES.get(engine, ()):
+        path = os.path.join(model_dir, name)
+        entry = files.get(name)
+        if entry is None:
+            problems.append(f"{name} is not listed in {MANIFEST}")
+        elif not os.path.isfile(path):
+            problems.append(f"{name} is missing")
+        elif os.path.getsize(path) != entry["size"]:
+            problems.append(
+                f"{name} is {os.path.getsize(path)} bytes, expected {entry['size']}"
+            )
+        elif checksums and sha256_file(path) != entry["sha256"]:
+            problems.append(f"{name} sha256 mismatch (corrupt or replaced)")
+        else:
+            paths[name] = path
+    if problems:
+        raise ModelBundleError(
+            f"OCR model bundle {model_dir} is not usable for {engine}: "
+            + "; ".join(problems)
+            + f". {_hint(model_dir)}"
+        )
+    return paths
+
+
+def load_easyocr_reader(model_dir: str, lang: Sequence[str] = ("en",)):
+    """从模型包构造 EasyOCR Reader：禁止下载"""
+    import easyocr
+
+    try:
+        return easyocr.Reader(
+            list(lang),
+            model_storage_directory=model_dir,
+            user_network_directory=model_dir,
+            download_enabled=False,
+            verbose=False,
+        )
+    except FileNotFoundError as e:
+        # EasyOCR 在文件缺失或 MD5 不符且不允许下载时抛 FileNotFoundError
+        raise ModelBundleError(f"EasyOCR cannot load from {model_dir}: {e}") from e
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Offline OCR model bundle")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("pack", help="copy downloaded models into a bundle")
+    p.add_argument("--out", required=True, help="bundle directory to create")
+    p.add_argument("--easyocr", help="EasyOCR model dir (e.g. ~/.EasyOCR/model)")
+    p.add_argument("--tessdata", help="Tesseract tessdata dir")
+    v = sub.add_parser("verify", help="check a bundle against its manifest")
+    v.add_argument("model_dir")
+    v.add_argument(
+        "--engine",
+        choices=sorted(ENGINE_FILES),
+        action="append",
+        help="engine(s) to check (default: all listed in the manifest)",
+    )
+    args = ap.parse_args()
+
+    try:
+        if args.cmd == "pack":
+            if not (args.easyocr or args.tessdata):
+                ap.error("pack needs --easyocr and/or --tessdata")
+            manifest = pack(args.out, args.easyocr, args.tessdata)
+            for name, entry in manifest["files"].items():
+                print(f"{entry['sha256'][:12]}  {entry['size']:>10}  {name}")
+            print(f"[ok] bundle written: {args.out}")
+        else:
+            files = read_manifest(args.model_dir)["files"]
+            engines = args.engine or [
+                e for e, names in ENGINE_FILES.items() if set(names) & set(files)
+            ]
+            for engine in engines:
+                verify_bundle(args.model_dir, engine)
+                print(f"[ok] {engine}: {', '.join(ENGINE_FILES[engine])}")
+    except ModelBundleError as e:
+        print(f"[error] {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prometheus 文本格式的指标注册表
+Prometheus-style metrics registry for the analysis pipeline.
+
+只依赖标准库：计数器 / 仪表 / 直方图，可以通过本地 HTTP 端点抓取，
+也可以写成文本文件（node_exporter textfile collector 格式）。
+热路径上每次记录只是一次加锁的加法（直方图多一次二分查找）。
+
+    from pipeline_metrics import REGISTRY, start_http_server, write_textfile
+    start_http_server(9464)            # http://127.0.0.1:9464/metrics
+    write_textfile("/var/lib/node_exporter/fengshui.prom")
+"""
+
+import bisect
+import math
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if v == -math.inf:
+        return "-Inf"
+    if v == int(v) and abs(v) < 1e15:
+        return f"{int(v)}"
+    return repr(float(v))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+        self._names = set()
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric") -> None:
+        with self._lock:
+            if metric.name in self._names:
+                raise ValueError(f"duplicate metric: {metric.name}")
+            self._names.add(metric.name)
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        """导出 Prometheus 文本格式 (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {_escape(m.documentation)}")
+            lines.append(f"# TYPE {m.name} {m.typ}")
+            for suffix, labels, value in m.samples():
+                lines.append(
+                    f"{m.name}{suffix}{_format_labels(labels)} {_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def get_sample_value(
+        self, name: str, labels: Optional[Dict[str, str]] = None
+    ) -> Optional[float]:
+        """按样本名（含 _bucket/_sum/_count 后缀）查询当前值，主要用于测试"""
+        labels = labels or {}
+        with self._lock:
+            metrics = list(self._metrics)
+        for m in metrics:
+            if not name.startswith(m.name):
+                continue
+            for suffix, lbl, value in m.samples():
+                if m.name + suffix == name and lbl == labels:
+                    return value
+        return None
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    typ = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labelvalues):
+        key = tuple(str(labelvalues[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _items(self) -> Iterable[Tuple[Dict[str, str], object]]:
+        with self._lock:
+            items = list(self._children.items())
+        for key, child in items:
+            yield dict(zip(self.labelnames, key)), child
+
+    def samples(self):
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("counters can only increase")
+        with self._lock:
+            self._value += amount
+
+    def get(self) -> float:
+        return self._value
+
+
+class Counter(_Metric):
+    typ = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def samples(self):
+        for labels, child in self._items():
+            yield "", labels, child.get()
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def get(self) -> float:
+        return self._value
+
+
+class Gauge(_Metric):
+    typ = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def samples(self):
+        for labels, child in self._items():
+            yield "", labels, child.get()
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class Histogram(_Metric):
+    typ = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self._bounds = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self._bounds)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def samples(self):
+        for labels, child in self._items():
+            counts, total = child.snapshot()
+            acc = 0
+            for bound, n in zip(self._bounds + (math.inf,), counts):
+                acc += n
+                yield "_bucket", {**labels, "le": _format_value(bound)}, acc
+            yield "_sum", labels, total
+            yield "_count", labels, acc
+
+
+# --------- 流水线指标 ----------
+# --------- Pipeline metrics ----------
+ANALYSES_STARTED = Counter(
+    "fengshui_analyses_started_total", "Floorplan analyses started"
+)
+ANALYSES_COMPLETED = Counter(
+    "fengshui_analyses_completed_total", "Floorplan analyses completed"
+)
+ANALYSES_FAILED = Counter(
+    "fengshui_analyses_failed_total", "Floorplan analyses failed", ["reason"]
+)
+STAGE_SECONDS = Histogram(
+    "fengshui_stage_seconds", "Wall time per pipeline stage", ["stage"]
+)
+OCR_ENGINE = Gauge("fengshui_ocr_engine", "OCR engine in use (1 = active)", ["engine"])
+OCR_REQUESTS = Counter(
+    "fengshui_ocr_requests_total", "OCR engine invocations", ["engine"]
+)
+OCR_ESCALATIONS = Counter(
+    "fengshui_ocr_escalations_total",
+    "Extra OCR passes run because key labels were missing",
+    ["step"],
+)
+ORIENTATION_CORRECTIONS = Counter(
+    "fengshui_orientation_corrections_total",
+    "Plans OCRed after rotating the page upright, by rotation",
+    ["degrees"],
+)
+OCR_LINES_REJECTED = Counter(
+    "fengshui_ocr_lines_rejected_total",
+    "OCR lines dropped by room-vocabulary lexicon decoding",
+)
+TEMPLATE_MATCHES = Counter(
+    "fengshui_template_matches_total",
+    "Label template fast-path attempts (hit = OCR skipped, fallback = full OCR)",
+    ["result"],
+)
+REVISIONS = Counter(
+    "fengshui_revisions_total",
+    "Revised plans processed, by mode (diff = changed regions only, full)",
+    ["mode"],
+)
+OCR_QUEUE_DEPTH = Gauge(
+    "fengshui_ocr_queue_depth", "OCR jobs waiting for or running on a worker"
+)
+CACHE_REQUESTS = Counter(
+    "fengshui_cache_requests_total", "Result cache lookups", ["cache", "result"]
+)
+SCORES = Counter("fengshui_scores_total", "Layouts scored")
+SCORE_SECONDS = Histogram(
+    "fengshui_score_seconds",
+    "Wall time of score_layout",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01),
+)
+
+
+# 在 OCR 工作进程里记录的计数器：进程池模式下子进程的注册表主进程看不到，
+# 由工作进程返回本次增量、主进程补记（见 service.OcrPool）
+WORKER_COUNTERS = (
+    OCR_REQUESTS,
+    OCR_ESCALATIONS,
+    ORIENTATION_CORRECTIONS,
+    OCR_LINES_REJECTED,
+    TEMPLATE_MATCHES,
+)
+
+
+def counter_values(
+    counters: Sequence[Counter] = WORKER_COUNTERS,
+) -> Dict[Tuple[str, Tuple[str, ...]], float]:
+    """计数器当前值 {(指标名, 标签值): 值}"""
+    return {
+        (m.name, tuple(labels.values())): child.get()
+        for m in counters
+        for labels, child in m._items()
+    }
+
+
+def counter_deltas(
+    before: Dict[Tuple[str, Tuple[str, ...]], float],
+    counters: Sequence[Counter] = WORKER_COUNTERS,
+) -> List[Tuple[str, Tuple[str, ...], float]]:
+    """相对 before 有变化的样本 [(指标名, 标签值, 增量)]，可 pickle"""
+    out = []
+    for key, value in counter_values(counters).items():
+        delta = value - before.get(key, 0.0)
+        if delta > 0:
+            out.append((key[0], key[1], delta))
+    return out
+
+
+def apply_counter_deltas(
+    deltas: Iterable[Tuple[str, Tuple[str, ...], float]],
+    counters: Sequence[Counter] = WORKER_COUNTERS,
+) -> None:
+    """把 counter_deltas 的结果加到本进程的计数器上"""
+    by_name = {m.name: m for m in counters}
+    for name, values, delta in deltas:
+        m = by_name[name]
+        m.labels(**dict(zip(m.labelnames, values))).inc(delta)
+
+
+def observe_stages(stages: Dict[str, Dict[str, float]]) -> None:
+    """把 StageTimer 的分阶段耗时（毫秒）记入 fengshui_stage_seconds"""
+    for name, st in stages.items():
+        STAGE_SECONDS.labels(stage=name).observe(st["wall_ms"] / 1000.0)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def write_textfile(path: str, registry: Registry = REGISTRY) -> None:
+    """原子写入文本格式（先写临时文件再 rename）"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(registry.render())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _make_handler(registry: Registry):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # 不打印访问日志
+            pass
+
+    return MetricsHandler
+
+
+def start_http_server(
+    port: int = 9464, addr: str = "127.0.0.1", registry: Registry = REGISTRY
+) -> ThreadingHTTPServer:
+    """在后台线程启动 /metrics 端点，返回 server（调用 shutdown() 停止）"""
+    server = ThreadingHTTPServer((addr, port), _make_handler(registry))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
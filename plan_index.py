@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+近似重复平面图索引（感知哈希 + BK 树）
+Perceptual-hash index to reuse results for near-duplicate floorplans.
+
+同一户型常被几百个房源重复使用，只是加了水印、换了导出尺寸或重新压缩，
+内容哈希（singleflight.request_key）认不出来。这里对每张处理过的平面图
+计算 64 位 pHash（32x32 灰度缩略图的 DCT 低频 8x8 与中位数比较），放进
+按汉明距离组织的 BK 树；新图在阈值内命中已知平面时，直接复用其 OCR 结果
+（房间标签）按新图尺寸、新的 north_deg 重新组装 layout，不再跑 OCR。
+可选用 64x64 缩略图的归一化相关系数再校验一次，防止哈希碰撞。
+
+整图缩略图分辨不出只改了几个房间名的修订版（换掉两个标签后汉明距离
+和缩略图相关系数都仍在阈值内），所以命中还要在标签分辨率上确认：入库
+时按缓存的房间框从中等分辨率灰度图裁下标签小图，查询时在新图的对应
+位置（按尺寸比例对齐，允许少量平移）做归一化模板匹配，任一标签不符
+即视为未命中。
+
+房间按面积分宫（palace_area）依赖分割栅格，索引里不保存栅格，换了
+north_deg 就算不出来；带 palace_area 的缓存只在 north_deg 相同时命中，
+否则重新分析（与新鲜分析的得分一致）。
+
+    index = PlanIndex(max_distance=12)
+    fp = plan_fingerprint(image_bytes)
+    layout = index.reuse(fp, north_deg, house_facing)   # 未命中返回 None
+    if layout is None:
+        layout = fp2layout.detect_layout(image_bytes, north_deg, house_facing)
+        index.add(fp, layout)
+
+非线程安全：服务中只在事件循环上调用。
+"""
+
+import itertools
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+import fp2layout
+from pipeline_metrics import CACHE_REQUESTS
+
+HASH_SIDE = 32  # pHash 的 DCT 输入边长
+THUMB_SIDE = 64  # 校验用缩略图边长
+VERIFY_DECODE_SIDE = 1280  # 指纹解码图最长边（标签校验需要看清文字）
+MAX_DISTANCE = 12  # 64 位中允许不同的位数
+MIN_SIMILARITY = 0.95  # 缩略图归一化相关系数下限
+MAX_ASPECT_CHANGE = 0.02  # 宽高比相对变化上限
+LABEL_PATCH_HEIGHT = 16  # 标签小图统一缩放到的文字高度（像素）
+LABEL_PATCH_PAD = 0.15  # 标签小图外扩（× 文字高度）
+LABEL_SEARCH = 0.3  # 查询时额外的平移搜索范围（× 文字高度）
+MIN_LABEL_SIMILARITY = 0.7  # 每个标签的模板匹配相关系数下限
+FLAT_STD = 2.0  # 小图灰度标准差低于此值视为空白
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def phash(gray: np.ndarray) -> int:
+    """64 位感知哈希：DCT 低频 8x8（不含直流分量）与其中位数比较"""
+    small = cv2.resize(
+        gray, (HASH_SIDE, HASH_SIDE), interpolation=cv2.INTER_AREA
+    ).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].ravel()
+    bits = low > np.median(low[1:])
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+@dataclass(frozen=True)
+class PlanFingerprint:
+    hash: int
+    thumb: np.ndarray  # THUMB_SIDE x THUMB_SIDE，零均值单位方差
+    size: Tuple[int, int]  # 原图 (W, H)
+    view: Optional[np.ndarray] = None  # 标签校验用的灰度图，不存进索引
+
+
+def plan_fingerprint(source: Union[str, bytes, np.ndarray]) -> PlanFingerprint:
+    """降采样灰度解码 -> pHash + 校验缩略图 + 标签校验用灰度图"""
+    gray, size = fp2layout.load_gray(source, VERIFY_DECODE_SIDE)
+    r = VERIFY_DECODE_SIDE / float(max(gray.shape))
+    if r < 1.0:
+        gray = cv2.resize(gray, None, fx=r, fy=r, interpolation=cv2.INTER_AREA)
+    thumb = cv2.resize(
+        gray, (THUMB_SIDE, THUMB_SIDE), interpolation=cv2.INTER_AREA
+    ).astype(np.float32)
+    thumb = (thumb - thumb.mean()) / (thumb.std() + 1e-6)
+    return PlanFingerprint(phash(thumb), thumb, size, gray)
+
+
+def similarity(a: PlanFingerprint, b: PlanFingerprint) -> float:
+    """缩略图归一化相关系数（1 = 相同）"""
+    return float((a.thumb * b.thumb).mean())
+
+
+def _crop(gray: np.ndarray, l: float, t: float, r: float, b: float) -> np.ndarray:
+    """裁剪 [l, r) x [t, b)，超出图像的部分按边缘像素补齐"""
+    l, t, r, b = (int(round(v)) for v in (l, t, r, b))
+    H, W = gray.shape
+    inner = gray[max(0, t) : max(0, min(H, b)), max(0, l) : max(0, min(W, r))]
+    if inner.size == 0:
+        return np.full((max(1, b - t), max(1, r - l)), 255, np.uint8)
+    return cv2.copyMakeBorder(
+        inner,
+        max(0, -t),
+        max(0, b - H),
+        max(0, -l),
+        max(0, r - W),
+        cv2.BORDER_REPLICATE,
+    )
+
+
+def label_patch(
+    fp: PlanFingerprint, bbox: Tuple[float, float, float, float], margin: float = 0.0
+) -> np.ndarray:
+    """
+    原图坐标的标签框 (l, t, w, h) -> 文字高度缩放到 LABEL_PATCH_HEIGHT 的
+    小图；margin 为额外外扩（× 文字高度），用于查询时的平移搜索
+    """
+    s = fp.view.shape[1] / float(fp.size[0])
+    l, t, w, h = (v * s for v in bbox)
+    side = max(1.0, min(w, h))  # 竖排标签的文字高度是框宽
+    pad = (LABEL_PATCH_PAD + margin) * side
+    crop = _crop(fp.view, l - pad, t - pad, l + w + pad, t + h + pad)
+    f = LABEL_PATCH_HEIGHT / side
+    return cv2.resize(crop, None, fx=f, fy=f, interpolation=cv2.INTER_AREA)
+
+
+def label_similarity(fp: PlanFingerprint, patch: np.ndarray, bbox) -> float:
+    """入库时的标签小图与新图对应位置的最大归一化相关系数"""
+    region = label_patch(fp, bbox, LABEL_SEARCH)
+    if patch.std() < FLAT_STD:
+        # 空白模板相关系数无定义：新图对应位置也空白才算一致
+        return 1.0 if label_patch(fp, bbox).std() < 4 * FLAT_STD else 0.0
+    h, w = patch.shape
+    if region.shape[0] < h or region.shape[1] < w:
+        region = cv2.resize(region, (max(w, region.shape[1]), max(h, region.shape[0])))
+    return float(cv2.matchTemplate(region, patch, cv2.TM_CCOEFF_NORMED).max())
+
+
+class BKTree:
+    """汉明距离 BK 树：查询只进入 |d - dist| <= radius 的子树"""
+
+    def __init__(self):
+        self._root: Optional[list] = None  # [hash, keys, {distance: child}]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, h: int, key) -> None:
+        self._size += 1
+        if self._root is None:
+            self._root = [h, [key], {}]
+            return
+        node = self._root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[1].append(key)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, [key], {}]
+                return
+            node = child
+
+    def search(self, h: int, radius: int) -> List[Tuple[int, object]]:
+        """[(距离, 键)]，按距离升序"""
+        out = []
+        stack = [self._root] if self._root else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= radius:
+                out.extend((d, k) for k in node[1])
+            for dist, child in node[2].items():
+                if d - radius <= dist <= d + radius:
+                    stack.append(child)
+        out.sort(key=lambda x: x[0])
+        return out
+
+
+@dataclass
+class _Entry:
+    fingerprint: PlanFingerprint
+    layout: Dict
+    patches: List[np.ndarray]  # 与 layout["rooms"] 一一对应的标签小图
+
+
+class PlanIndex:
+    """
+    已处理平面图的感知哈希索引。超过 max_entries 时丢弃最旧的四分之一并
+    重建 BK 树（BK 树不支持删除）。每个平面连同标签小图约占 10-20 KB。
+    """
+
+    def __init__(
+        self,
+        max_distance: int = MAX_DISTANCE,
+        verify: bool = True,
+        min_similarity: float = MIN_SIMILARITY,
+        max_entries: int = 2000,
+        min_label_similarity: float = MIN_LABEL_SIMILARITY,
+        name: str = "plan_index",
+    ):
+        self.max_distance = max_distance
+        self.verify = verify
+        self.min_similarity = min_similarity
+        self.min_label_similarity = min_label_similarity
+        self.max_entries = max_entries
+        self.name = name
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._tree = BKTree()
+        self._ids: Iterator[int] = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, fp: PlanFingerprint, layout: Dict) -> None:
+        if self.max_entries <= 0 or not layout.get("rooms"):
+            return
+        if fp.view is None:
+            return
+        key = next(self._ids)
+        patches = [label_patch(fp, r["bbox"]) for r in layout["rooms"]]
+        self._entries[key] = _Entry(replace(fp, view=None), layout, patches)
+        self._tree.add(fp.hash, key)
+        if len(self._entries) > self.max_entries:
+            for _ in range(max(1, self.max_entries // 4)):
+                self._entries.popitem(last=False)
+            self._tree = BKTree()
+            for k, e in self._entries.items():
+                self._tree.add(e.fingerprint.hash, k)
+
+    def labels_match(self, fp: PlanFingerprint, entry: _Entry) -> bool:
+        """
+        缓存的每个标签在新图对应位置都能找到（相关系数不低于阈值）。
+        房间框按原图尺寸比例换算到新图（同一平面的缩放导出）。
+        """
+        W, H = fp.size
+        W0, H0 = entry.fingerprint.size
+        sx, sy = W / W0, H / H0
+        return all(
+            label_similarity(fp, patch, (l * sx, t * sy, w * sx, h * sy))
+            >= self.min_label_similarity
+            for (l, t, w, h), patch in zip(
+                (r["bbox"] for r in entry.layout["rooms"]), entry.patches
+            )
+        )
+
+    def lookup(
+        self, fp: PlanFingerprint, north_deg: Optional[float] = None
+    ) -> Optional[Tuple[Dict, int, float]]:
+        """
+        最近的已知平面 (layout, 汉明距离, 相似度)；没有可信匹配时返回 None。
+        给出 north_deg 时跳过带 palace_area 且 north_deg 不同的缓存。
+        """
+        W, H = fp.size
+        for d, key in self._tree.search(fp.hash, self.max_distance):
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            if north_deg is not None and not reusable_for(entry.layout, north_deg):
+                continue
+            W0, H0 = entry.fingerprint.size
+            if abs((W / H) / (W0 / H0) - 1.0) > MAX_ASPECT_CHANGE:
+                continue
+            sim = similarity(fp, entry.fingerprint)
+            if self.verify and sim < self.min_similarity:
+                continue
+            if self.verify and (fp.view is None or not self.labels_match(fp, entry)):
+                continue
+            self._entries.move_to_end(key)
+            return entry.layout, d, round(sim, 4)
+        return None
+
+    def reuse(
+        self,
+        fp: PlanFingerprint,
+        north_deg: float,
+        house_facing: Optional[str] = None,
+    ) -> Optional[Dict]:
+        """命中时用缓存的房间标签为新图组装 layout，否则返回 None"""
+        match = self.lookup(fp, north_deg)
+        CACHE_REQUESTS.labels(cache=self.name, result="hit" if match else "miss").inc()
+        if match is None:
+            return None
+        cached, distance, sim = match
+        layout = relayout(cached, fp.size, north_deg, house_facing)
+        layout["plan_match"] = {"distance": distance, "similarity": sim}
+        return layout
+
+
+def reusable_for(layout: Dict, north_deg: float) -> bool:
+    """palace_area 只对缓存时的 north_deg 有效；没有 palace_area 时任意 north_deg 都可复用"""
+    if layout["north_deg"] == north_deg:
+        return True
+    return not any("palace_area" in r for r in layout["rooms"])
+
+
+def relayout(
+    cached: Dict,
+    size: Tuple[int, int],
+    north_deg: float,
+    house_facing: Optional[str] = None,
+) -> Dict:
+    """
+    把缓存 layout 的房间标签按新图尺寸缩放后重新组装（方位、九宫、朝向推断
+    都按新的 north_deg 计算）。north_deg 不变时沿用缓存的 palace_area；
+    north_deg 变了则没有 palace_area（PlanIndex 不会这样复用，见 reusable_for）。
+    """
+    W, H = size
+    W0, H0 = cached["image_size"]["width"], cached["image_size"]["height"]
+    sx, sy = W / W0, H / H0
+    boxes = [
+        (l, t, l + w, t + h) for l, t, w, h in (r["bbox"] for r in cached["rooms"])
+    ]
+    lines = fp2layout.scale_lines(
+        [
+            {"text": r["raw_text"], "bbox": list(box), "conf": r["conf"]}
+            for r, box in zip(cached["rooms"], boxes)
+        ],
+        sx,
+        sy,
+    )
+    frame = None
+    if cached.get("footprint"):
+        l, t, w, h = cached["footprint"]
+        frame = [round(l * sx), round(t * sy), round(w * sx), round(h * sy)]
+    layout = fp2layout.assemble_layout(
+        lines, W, H, north_deg, house_facing, frame=frame
+    )
+    if north_deg == cached["north_deg"]:
+        area = {
+            (ln["text"], tuple(ln["bbox"])): r["palace_area"]
+            for ln, r in zip(lines, cached["rooms"])
+            if "palace_area" in r
+        }
+        for r in layout["rooms"]:
+            l, t, w, h = r["bbox"]
+            key = (r["raw_text"], (l, t, l + w, t + h))
+            if key in area:
+                r["palace_area"] = area[key]
+    return layout
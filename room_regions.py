@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+房间区域分割 + 积分图九宫面积占比
+Room segmentation and summed-area-table palace occupancy.
+
+以标签中心点定宫时，一个横跨三宫的大厨房只算一宫。这里从墙体结构分割出
+带编号的房间栅格，把每个区域分给落在其中的 OCR 标签，再按 north_deg 把
+栅格重采样到九宫坐标系，为每个房间建一张积分图（summed-area table）。
+之后任意房间在任意宫（或九宫坐标系下任意轴对齐矩形）内的面积占比都是
+4 次查表的 O(1) 查询；换一个 north_deg 只需重建一次（按角度缓存）。
+
+    raster = segment_rooms(gray, frame, offset=(x, y), sx=sx, sy=sy)
+    occ = raster.occupancy(north_deg)
+    occ.fraction(region_id, "C")      # 该房间落在中宫的面积比例
+    annotate_palace_area(layout["rooms"], raster, north_deg)
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+ROOM_RASTER_SIDE = 640  # 分割栅格最长边（像素）
+MIN_ROOM_AREA = 0.003  # 小于栅格面积该比例的区域（墙角、文字孔洞）丢弃
+OCCUPANCY_GRID = 384  # 九宫坐标系采样分辨率
+OCCUPANCY_SPAN = (-0.5, 1.5)  # 旋转后外框角点仍在采样范围内
+MIN_PALACE_SHARE = 0.01  # 低于该占比的宫位不写入 palace_area
+
+PALACE_ROWS = (("NW", "N", "NE"), ("W", "C", "E"), ("SW", "S", "SE"))
+
+
+def wall_mask(gray: np.ndarray) -> np.ndarray:
+    """
+    长水平/竖直笔画即墙体；沿墙方向闭运算补上门洞，让房间成为封闭区域。
+    文字、尺寸标注的笔画短，不会进入墙体掩码。
+    """
+    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    side = max(bw.shape)
+    k = max(9, side // 40)
+    g = max(5, side // 8)
+    horiz = cv2.morphologyEx(
+        bw, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (k, 1))
+    )
+    vert = cv2.morphologyEx(
+        bw, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, k))
+    )
+    horiz = cv2.morphologyEx(
+        horiz, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (g, 1))
+    )
+    vert = cv2.morphologyEx(
+        vert, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (1, g))
+    )
+    return cv2.bitwise_or(horiz, vert)
+
+
+def label_regions(walls: np.ndarray) -> np.ndarray:
+    """
+    非墙区域的 4 连通分量（uint16 编号）；接触栅格边界的（平面外）与过小的
+    区域置 0
+    """
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(
+        (walls == 0).astype(np.uint8), connectivity=4
+    )
+    h, w = labels.shape
+    x, y = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+    bw, bh = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+    keep = (
+        (x > 0)
+        & (y > 0)
+        & (x + bw < w)
+        & (y + bh < h)
+        & (stats[:, cv2.CC_STAT_AREA] >= MIN_ROOM_AREA * h * w)
+    )
+    keep[0] = False
+    return np.where(keep[labels], labels, 0).astype(np.uint16)
+
+
+class PalaceOccupancy:
+    """
+    某个 north_deg 下的九宫坐标系栅格 + 每个房间的积分图。
+    fraction / rect_sum 均为 O(1)（4 次查表）。
+    """
+
+    def __init__(self, grid: np.ndarray, region_ids: Sequence[int]):
+        lo, hi = OCCUPANCY_SPAN
+        n = grid.shape[0]
+        centers = lo + (np.arange(n) + 0.5) * (hi - lo) / n
+        # 与 to_palace9 一致：< 1/3 为第 0 列，> 2/3 为第 2 列
+        c1 = int(np.count_nonzero(centers < 1 / 3))
+        c2 = int(np.count_nonzero(centers <= 2 / 3))
+        self.cuts = (0, c1, c2, n)
+        self._sat: Dict[int, np.ndarray] = {}
+        for rid in region_ids:
+            sat = cv2.integral((grid == rid).astype(np.uint8), sdepth=cv2.CV_32S)
+            if sat[-1, -1] > 0:
+                self._sat[rid] = sat
+
+    def __contains__(self, rid: int) -> bool:
+        return rid in self._sat
+
+    def rect_sum(self, rid: int, r0: int, c0: int, r1: int, c1: int) -> int:
+        """区域 rid 在栅格 [r0, r1) x [c0, c1) 内的像素数"""
+        s = self._sat[rid]
+        return int(s[r1, c1] - s[r0, c1] - s[r1, c0] + s[r0, c0])
+
+    def area(self, rid: int) -> int:
+        return int(self._sat[rid][-1, -1])
+
+    def fraction(self, rid: int, palace: str) -> float:
+        for row, names in enumerate(PALACE_ROWS):
+            if palace in names:
+                col = names.index(palace)
+                break
+        else:
+            raise ValueError(f"unknown palace: {palace}")
+        r0, r1 = self.cuts[row], self.cuts[row + 1]
+        c0, c1 = self.cuts[col], self.cuts[col + 1]
+        return self.rect_sum(rid, r0, c0, r1, c1) / self.area(rid)
+
+    def fractions(
+        self, rid: int, min_share: float = MIN_PALACE_SHARE
+    ) -> Dict[str, float]:
+        """{宫位: 面积占比}，丢弃小于 min_share 的宫位后重新归一"""
+        shares = {p: self.fraction(rid, p) for names in PALACE_ROWS for p in names}
+        kept = {p: f for p, f in shares.items() if f >= min_share}
+        total = sum(kept.values()) or 1.0
+        return {p: round(f / total, 4) for p, f in kept.items()}
+
+
+class RoomRaster:
+    """
+    带编号的房间栅格（0 = 墙体 / 平面外）以及它到原图像素、到外框归一化
+    坐标的映射。frame 为原图坐标下的平面外框 (l, t, w, h)。
+    """
+
+    def __init__(
+        self,
+        labels: np.ndarray,
+        frame: Sequence[float],
+        scale: float = 1.0,
+        offset: Tuple[int, int] = (0, 0),
+        sx: float = 1.0,
+        sy: float = 1.0,
+    ):
+        self.labels = labels
+        self.frame = tuple(float(v) for v in frame)
+        self.scale = scale  # 栅格 / 输入灰度图
+        self.offset = offset  # 输入灰度图在解码图中的偏移
+        self.sx, self.sy = sx, sy  # 原图 / 解码图
+        self._occupancy: Dict[float, PalaceOccupancy] = {}
+        self._ids: Optional[List[int]] = None
+
+    @property
+    def region_ids(self) -> List[int]:
+        if self._ids is None:
+            self._ids = [int(v) for v in np.unique(self.labels) if v]
+        return self._ids
+
+    def to_pixel(self, X: float, Y: float) -> Tuple[float, float]:
+        """原图像素 -> 栅格像素（像素中心为整数）"""
+        ox, oy = self.offset
+        return (
+            (X / self.sx - ox) * self.scale - 0.5,
+            (Y / self.sy - oy) * self.scale - 0.5,
+        )
+
+    def _to_norm(self) -> Tuple[float, float, float, float]:
+        """栅格像素 x -> 外框归一化 u = ax * x + bx（y 同理）"""
+        fx, fy, fw, fh = self.frame
+        ox, oy = self.offset
+        ax = self.sx / (self.scale * fw)
+        ay = self.sy / (self.scale * fh)
+        bx = ((0.5 / self.scale + ox) * self.sx - fx) / fw
+        by = ((0.5 / self.scale + oy) * self.sy - fy) / fh
+        return ax, bx, ay, by
+
+    def region_at(self, X: float, Y: float, radius: int = 3) -> int:
+        """原图像素点所在的房间编号；落在墙上/文字上时取邻域内最多的编号"""
+        h, w = self.labels.shape
+        x, y = (int(round(v)) for v in self.to_pixel(X, Y))
+        if not (0 <= x < w and 0 <= y < h):
+            return 0
+        rid = int(self.labels[y, x])
+        if rid:
+            return rid
+        win = self.labels[
+            max(0, y - radius) : y + radius + 1, max(0, x - radius) : x + radius + 1
+        ]
+        ids, counts = np.unique(win[win > 0], return_counts=True)
+        return int(ids[np.argmax(counts)]) if len(ids) else 0
+
+    def occupancy(self, north_deg: float) -> PalaceOccupancy:
+        """把栅格重采样到旋转后的九宫坐标系并为每个房间建积分图（按角度缓存）"""
+        key = round(float(north_deg) % 360.0, 6)
+        occ = self._occupancy.get(key)
+        if occ is not None:
+            return occ
+        lo, hi = OCCUPANCY_SPAN
+        n = OCCUPANCY_GRID
+        step = (hi - lo) / n
+        # 与 rotate_point 相反：九宫坐标 (U, V) -> 外框坐标 (u, v) -> 栅格像素
+        t = np.deg2rad(north_deg)
+        c, s = np.cos(t), np.sin(t)
+        o = lo + 0.5 * step - 0.5
+        ax, bx, ay, by = self._to_norm()
+        M = np.array(
+            [
+                [c * step / ax, -s * step / ax, (0.5 + (c - s) * o - bx) / ax],
+                [s * step / ay, c * step / ay, (0.5 + (s + c) * o - by) / ay],
+            ],
+            dtype=np.float64,
+        )
+        grid = cv2.warpAffine(
+            self.labels,
+            M,
+            (n, n),
+            flags=cv2.INTER_NEAREST | cv2.WARP_INVERSE_MAP,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=0,
+        )
+        occ = PalaceOccupancy(grid, self.region_ids)
+        self._occupancy[key] = occ
+        return occ
+
+
+def segment_rooms(
+    gray: np.ndarray,
+    frame: Sequence[float],
+    offset: Tuple[int, int] = (0, 0),
+    sx: float = 1.0,
+    sy: float = 1.0,
+    max_side: int = ROOM_RASTER_SIDE,
+) -> RoomRaster:
+    """
+    灰度图（可以是外框裁剪后的解码图）-> RoomRaster。
+    offset 为 gray 在解码图中的偏移，sx/sy 为原图 / 解码图的比例。
+    """
+    r = min(1.0, max_side / float(max(gray.shape[:2])))
+    small = (
+        cv2.resize(gray, None, fx=r, fy=r, interpolation=cv2.INTER_AREA)
+        if r < 1.0
+        else gray
+    )
+    labels = label_regions(wall_mask(small))
+    # resize 取整后的真实比例
+    r = small.shape[1] / float(gray.shape[1])
+    return RoomRaster(labels, frame, r, offset, sx, sy)
+
+
+def annotate_palace_area(
+    rooms: List[Dict], raster: RoomRaster, north_deg: float
+) -> int:
+    """
+    给 layout 的房间（dict，bbox 为原图 (l, t, w, h)）写入 "palace_area"：
+    标签中心所在区域在各宫的面积占比。返回写入的房间数。
+    """
+    occ: Optional[PalaceOccupancy] = None
+    n = 0
+    for room in rooms:
+        l, t, w, h = room["bbox"]
+        rid = raster.region_at(l + w / 2.0, t + h / 2.0)
+        if not rid:
+            continue
+        occ = occ or raster.occupancy(north_deg)
+        if rid not in occ:
+            continue
+        room["palace_area"] = occ.fractions(rid)
+        n += 1
+    return n
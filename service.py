@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+常驻评分服务（Tornado）
+Long-running local HTTP scoring service.
+
+OCR 在有界的进程池（或线程池）里运行，每个工作进程只加载一次模型；
+评分直接在事件循环上运行。排队已满时返回 429，并提供健康检查与就绪检查。
+
+    python service.py --port 8600 --workers 2 --max-queue 8
+
+    POST /v1/analyze?north_deg=0&house_facing=S&hemisphere=northern&language=zh
+         body: PNG/JPEG 字节 -> {"layout": {...}, "score": {...} | null}
+    POST /v1/score?hemisphere=northern&language=en
+         body: layout JSON -> score
+    GET  /healthz   进程存活
+    GET  /readyz    OCR 工作进程已加载模型
+    GET  /metrics   Prometheus 文本格式指标
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import tornado.web
+
+import fp2layout
+from pipeline_metrics import (
+    ANALYSES_COMPLETED,
+    ANALYSES_FAILED,
+    ANALYSES_STARTED,
+    CONTENT_TYPE,
+    OCR_QUEUE_DEPTH,
+    REGISTRY,
+    apply_counter_deltas,
+    counter_deltas,
+    counter_values,
+    observe_stages,
+)
+from ocr_models import MODEL_DIR_ENV, ModelBundleError
+from plan_index import PlanIndex, plan_fingerprint
+from singleflight import AsyncSingleFlight, request_key
+from vector_plans import is_vector_plan
+from zhongxuan_scorer import score_layout, validate_layout
+
+logger = logging.getLogger(__name__)
+
+HEMISPHERES = ("northern", "southern")
+LANGUAGES = ("zh", "en")
+
+
+class QueueFull(Exception):
+    """OCR 队列已满"""
+
+
+def analyze_image(data: bytes, north_deg: float, house_facing: Optional[str]) -> dict:
+    """在工作进程/线程中运行：解码 + 预处理 + OCR + 解析"""
+    return fp2layout.detect_layout(data, north_deg, house_facing, metrics=True)
+
+
+def analyze_counted(
+    data: bytes, north_deg: float, house_facing: Optional[str]
+) -> Tuple[dict, list]:
+    """
+    在工作进程中运行：返回 (layout, 本次的计数器增量)。子进程的计数器主进程
+    看不到，由主进程补记；失败时增量挂在异常的 counter_deltas 属性上。
+    进程池的每个工作进程一次只跑一个任务，前后快照之差就是本次的增量。
+    """
+    before = counter_values()
+    try:
+        layout = analyze_image(data, north_deg, house_facing)
+    except Exception as e:
+        e.counter_deltas = counter_deltas(before)
+        raise
+    return layout, counter_deltas(before)
+
+
+class OcrPool:
+    """
+    有界 OCR 工作池：最多 workers 个任务在运行，另外最多 max_queue 个排队，
+    超出时 submit 直接抛 QueueFull（由调用方返回 429）。
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queue: int = 8,
+        executor: str = "process",
+        vocabulary: str = "off",
+        model_dir: Optional[str] = None,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        # vocabulary：工作进程的受限识别模式（见 fp2layout.set_ocr_vocabulary）；
+        # model_dir：离线模型包，主进程应先用 fp2layout.set_ocr_model_dir 完整校验
+        init = functools.partial(fp2layout.warm_up, vocabulary, model_dir)
+        if executor == "process":
+            # spawn：避免在已导入 torch 的进程里 fork
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init,
+            )
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=workers, initializer=init)
+        # 进程池里的计数记在子进程的注册表中，需要在主进程补记（含 OCR 计数器增量）
+        self.remote = executor == "process"
+        self.inflight = 0
+        self.ready = False
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    async def start(self) -> None:
+        """让每个工作进程都先加载模型，然后标记就绪"""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *[
+                loop.run_in_executor(self.executor, fp2layout.warm_up)
+                for _ in range(self.workers)
+            ]
+        )
+        self.ready = True
+
+    async def submit(self, fn, *args):
+        if self.inflight >= self.capacity:
+            raise QueueFull()
+        self.inflight += 1
+        OCR_QUEUE_DEPTH.set(self.inflight)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self.inflight -= 1
+            OCR_QUEUE_DEPTH.set(self.inflight)
+
+    async def analyze(
+        self, data: bytes, north_deg: float, house_facing: Optional[str]
+    ) -> dict:
+        """提交一次平面图解析，返回 layout（不含 metrics）"""
+        if self.inflight >= self.capacity:
+            raise QueueFull()
+        if self.remote:
+            ANALYSES_STARTED.inc()
+        try:
+            if self.remote:
+                layout, deltas = await self.submit(
+                    analyze_counted, data, north_deg, house_facing
+                )
+            else:
+                layout = await self.submit(analyze_image, data, north_deg, house_facing)
+        except Exception as e:
+            if self.remote:
+                apply_counter_deltas(getattr(e, "counter_deltas", ()))
+                ANALYSES_FAILED.labels(reason=type(e).__name__).inc()
+            raise
+        metrics = layout.pop("metrics", None) or {}
+        if self.remote:
+            apply_counter_deltas(deltas)
+            ANALYSES_COMPLETED.inc()
+            observe_stages(metrics.get("stages", {}))
+        return layout
+
+    def shutdown(self) -> None:
+        self.ready = False
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def analyze_or_reuse(
+    pool: OcrPool,
+    plans: Optional[PlanIndex],
+    data: bytes,
+    north_deg: float,
+    house_facing: Optional[str],
+) -> dict:
+    """
+    近似重复的平面图（水印、缩放、重新压缩）直接复用已知结果，否则跑 OCR。
+    矢量平面图（SVG / DXF）本身就不走 OCR，也没有栅格可算指纹，不进索引。
+    """
+    if plans is None or is_vector_plan(data):
+        return await pool.analyze(data, north_deg, house_facing)
+    loop = asyncio.get_running_loop()
+    fp = await loop.run_in_executor(None, plan_fingerprint, data)
+    layout = plans.reuse(fp, north_deg, house_facing)
+    if layout is None:
+        layout = await pool.analyze(data, north_deg, house_facing)
+        plans.add(fp, layout)
+    return layout
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    @property
+    def pool(self) -> OcrPool:
+        return self.application.settings["pool"]
+
+    @property
+    def flight(self) -> AsyncSingleFlight:
+        return self.application.settings["flight"]
+
+    @property
+    def plans(self) -> Optional[PlanIndex]:
+        return self.application.settings.get("plans")
+
+    def write_json(self, obj, status: int = 200) -> None:
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.finish(json.dumps(obj, ensure_ascii=False))
+
+    def write_error(self, status_code: int, **kwargs) -> None:
+        # 错误信息放在 JSON 里（HTTP reason 只能是 ASCII）
+        message = self._reason
+        exc = kwargs.get("exc_info", (None, None, None))[1]
+        if isinstance(exc, tornado.web.HTTPError) and exc.log_message:
+            message = exc.log_message % exc.args if exc.args else exc.log_message
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.finish(json.dumps({"error": message}, ensure_ascii=False))
+
+    def get_choice(self, name: str, choices, default: Optional[str]) -> Optional[str]:
+        value = self.get_query_argument(name, default)
+        if value is not None and value not in choices:
+            raise tornado.web.HTTPError(
+                400, "%s must be one of %s", name, ",".join(sorted(choices))
+            )
+        return value
+
+
+class AnalyzeHandler(BaseHandler):
+    async def post(self):
+        body = self.request.body
+        if not body:
+            raise tornado.web.HTTPError(400, "empty request body")
+        try:
+            north_deg = float(self.get_query_argument("north_deg", "0"))
+        except ValueError:
+            raise tornado.web.HTTPError(400, "north_deg must be a number")
+        house_facing = self.get_choice("house_facing", fp2layout.ALLOWED_FACING, None)
+        hemisphere = self.get_choice("hemisphere", HEMISPHERES, "northern")
+        language = self.get_choice("language", LANGUAGES, "zh")
+
+        data = bytes(body)
+        key = request_key(data, north_deg=north_deg, house_facing=house_facing)
+        try:
+            layout = await self.flight.do(
+                key,
+                analyze_or_reuse,
+                self.pool,
+                self.plans,
+                data,
+                north_deg,
+                house_facing,
+            )
+        except QueueFull:
+            self.set_header("Retry-After", "1")
+            self.write_json({"error": "OCR queue is full, retry later"}, 429)
+            return
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, "%s", e)
+
+        score = (
+            score_layout(layout, hemisphere, language)
+            if layout["house_facing"]
+            else None
+        )
+        self.write_json({"layout": layout, "score": score})
+
+
+class ScoreHandler(BaseHandler):
+    def post(self):
+        hemisphere = self.get_choice("hemisphere", HEMISPHERES, "northern")
+        language = self.get_choice("language", LANGUAGES, "zh")
+        try:
+            data = validate_layout(json.loads(self.request.body or b"null"))
+        except (ValueError, TypeError, AttributeError) as e:
+            raise tornado.web.HTTPError(400, "invalid layout: %s", e)
+        self.write_json(score_layout(data, hemisphere, language))
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.write_json({"status": "ok"})
+
+
+class ReadyHandler(BaseHandler):
+    def get(self):
+        pool = self.pool
+        self.write_json(
+            {
+                "status": "ready" if pool.ready else "starting",
+                "engine": fp2layout.OCR_ENGINE_NAME,
+                "workers": pool.workers,
+                "inflight": pool.inflight,
+                "capacity": pool.capacity,
+            },
+            200 if pool.ready else 503,
+        )
+
+
+class MetricsHandler(BaseHandler):
+    def get(self):
+        self.set_header("Content-Type", CONTENT_TYPE)
+        self.finish(REGISTRY.render())
+
+
+def make_app(
+    pool: OcrPool,
+    flight: Optional[AsyncSingleFlight] = None,
+    plans: Optional[PlanIndex] = None,
+) -> tornado.web.Application:
+    """
+    flight：相同图片 + 参数的并发请求只跑一次 OCR，完成后短期缓存；
+    plans：近似重复平面图索引（None 关闭）
+    """
+    return tornado.web.Application(
+        [
+            (r"/v1/analyze", AnalyzeHandler),
+            (r"/v1/score", ScoreHandler),
+            (r"/healthz", HealthHandler),
+            (r"/readyz", ReadyHandler),
+            (r"/metrics", MetricsHandler),
+        ],
+        pool=pool,
+        flight=flight or AsyncSingleFlight(),
+        plans=plans,
+    )
+
+
+async def serve(args) -> None:
+    pool = OcrPool(
+        args.workers,
+        args.max_queue,
+        args.executor,
+        args.ocr_vocabulary,
+        fp2layout.OCR_MODEL_DIR,
+    )
+    plans = (
+        PlanIndex(args.phash_distance, max_entries=args.plan_index_size)
+        if args.plan_index_size > 0
+        else None
+    )
+    app = make_app(pool, AsyncSingleFlight(ttl=args.coalesce_ttl), plans)
+    # 先监听（/healthz 可用），模型加载完成后 /readyz 才返回 200
+    app.listen(args.port, args.host, max_body_size=int(args.max_body_mb * 2**20))
+    logger.info("listening on http://%s:%d", args.host, args.port)
+    try:
+        await pool.start()
+        logger.info("OCR workers ready (%s)", fp2layout.OCR_ENGINE_NAME)
+        await asyncio.Event().wait()
+    finally:
+        pool.shutdown()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Floorplan scoring service")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8600)
+    ap.add_argument("--workers", type=int, default=2, help="OCR worker count")
+    ap.add_argument("--max-queue", type=int, default=8, help="OCR jobs allowed to wait")
+    ap.add_argument("--executor", choices=["process", "thread"], default="process")
+    ap.add_argument("--max-body-mb", type=float, default=25.0)
+    ap.add_argument(
+        "--coalesce-ttl",
+        type=float,
+        default=30.0,
+        help="seconds to serve identical analyses from cache (0 disables)",
+    )
+    ap.add_argument(
+        "--plan-index-size",
+        type=int,
+        default=2000,
+        help="near-duplicate plans remembered for OCR reuse, about 10-20 KB "
+        "each (0 disables)",
+    )
+    ap.add_argument(
+        "--phash-distance",
+        type=int,
+        default=12,
+        help="max perceptual-hash Hamming distance for a near-duplicate plan",
+    )
+    ap.add_argument(
+        "--ocr-vocabulary",
+        choices=fp2layout.OCR_VOCABULARY_MODES,
+        default="off",
+        help="constrain recognition to the room vocabulary (see fp2layout --vocabulary)",
+    )
+    ap.add_argument(
+        "--model-dir",
+        default=fp2layout.OCR_MODEL_DIR,
+        help="offline OCR model bundle, verified before workers start "
+        f"(default: ${MODEL_DIR_ENV})",
+    )
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    # 模型包在启动工作进程前完整校验一次，缺失或损坏时直接退出
+    try:
+        fp2layout.set_ocr_model_dir(args.model_dir)
+    except ModelBundleError as e:
+        logger.error("%s", e)
+        raise SystemExit(2)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+共享内存传图（零拷贝传给 OCR 工作进程）
+Shared-memory image transfer to OCR worker processes.
+
+把解码后的图像或预处理后的二值图放进 multiprocessing.shared_memory，
+只把很小的 ShmHandle（块名 + shape + dtype）传给工作进程，工作进程直接在
+共享内存上构造 ndarray 视图，不再 pickle 几 MB 到几十 MB 的数组。
+
+生命周期：
+- ShmRing 持有固定数量的块（循环复用），只有父进程 unlink；
+- 工作进程只 attach / close，出错时也会在 finally 中关闭；
+- 调用方在 finally 中 release，出错的任务也会归还块；
+- 父进程崩溃时由 multiprocessing 的 resource_tracker 回收残留的块。
+
+    with ShmRing(slots=2) as ring:
+        handle = ring.put_stack((gray, prep))
+        try:
+            lines = pool.submit(ocr_from_shm, handle, profile).result()
+        finally:
+            ring.release(handle)
+"""
+
+import threading
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class ShmHandle:
+    """传给工作进程的句柄（可 pickle，几十字节）"""
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+    slot: int = -1
+
+
+def attach(handle: ShmHandle) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """在工作进程中打开共享块并返回 ndarray 视图（用完先 del 视图再 close）"""
+    shm = shared_memory.SharedMemory(name=handle.name)
+    arr = np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=shm.buf)
+    return shm, arr
+
+
+def call_with_shm(fn: Callable[[np.ndarray], object], handle: ShmHandle):
+    """工作进程入口：attach -> fn(只读视图) -> close"""
+    shm, arr = attach(handle)
+    try:
+        arr.flags.writeable = False
+        return fn(arr)
+    finally:
+        del arr
+        shm.close()
+
+
+def ocr_from_shm(
+    handle: ShmHandle, profile: str = "balanced", need_facing: bool = True
+) -> List[Dict]:
+    """共享块中是叠在一起的 (灰度图, 二值图)，见 fp2layout.recognize_lines"""
+    import fp2layout
+
+    def recognize(pair: np.ndarray) -> List[Dict]:
+        return fp2layout.recognize_lines(pair[0], pair[1], profile, need_facing)
+
+    return call_with_shm(recognize, handle)
+
+
+class ShmRing:
+    """
+    固定 slots 个共享内存块的环形缓冲。put 在没有空闲块时阻塞（天然背压），
+    图像比当前块大时重新分配该块。
+    """
+
+    def __init__(self, slots: int = 2, slot_bytes: int = 0):
+        self.slots = slots
+        self._blocks: List[Optional[shared_memory.SharedMemory]] = [None] * slots
+        self._free: List[int] = list(range(slots))
+        self._cond = threading.Condition()
+        self._closed = False
+        if slot_bytes:
+            for i in range(slots):
+                self._blocks[i] = shared_memory.SharedMemory(
+                    create=True, size=slot_bytes
+                )
+
+    def __enter__(self) -> "ShmRing":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _acquire(self, timeout: Optional[float]) -> int:
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._free or self._closed, timeout=timeout
+            ):
+                raise TimeoutError("no free shared-memory slot")
+            if self._closed:
+                raise RuntimeError("ShmRing is closed")
+            return self._free.pop()
+
+    def _fill(
+        self, slot: int, layers: Sequence[np.ndarray], stacked: bool
+    ) -> ShmHandle:
+        """layers 逐层直接写进块（各一次拷贝，不先拼成中间数组）"""
+        layers = [np.asarray(a) for a in layers]
+        first = layers[0]
+        if first.dtype.hasobject:
+            raise TypeError("object arrays cannot be placed in shared memory")
+        if any(a.shape != first.shape or a.dtype != first.dtype for a in layers):
+            raise ValueError("stacked arrays must share shape and dtype")
+        shape = (len(layers),) + first.shape if stacked else first.shape
+        nbytes = first.nbytes * len(layers)
+        block = self._blocks[slot]
+        if block is None or block.size < nbytes:
+            if block is not None:
+                block.close()
+                block.unlink()
+            block = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+            self._blocks[slot] = block
+        dst = np.ndarray(shape, dtype=first.dtype, buffer=block.buf)
+        if stacked:
+            for i, a in enumerate(layers):
+                dst[i] = a
+        else:
+            dst[...] = first
+        del dst
+        return ShmHandle(block.name, shape, first.dtype.str, slot)
+
+    def _put(
+        self, layers: Sequence[np.ndarray], stacked: bool, timeout: Optional[float]
+    ) -> ShmHandle:
+        slot = self._acquire(timeout)
+        try:
+            return self._fill(slot, layers, stacked)
+        except BaseException:
+            self._release_slot(slot)
+            raise
+
+    def put(self, arr: np.ndarray, timeout: Optional[float] = None) -> ShmHandle:
+        """把数组拷进一个空闲块，返回句柄"""
+        return self._put([arr], False, timeout)
+
+    def put_stack(
+        self, arrays: Sequence[np.ndarray], timeout: Optional[float] = None
+    ) -> ShmHandle:
+        """
+        同形状、同 dtype 的几幅图逐层写进一个块，句柄 shape 为 (n, *shape)；
+        与 put(np.stack(arrays)) 结果相同，但少一次整块的中间拷贝。
+        """
+        if not arrays:
+            raise ValueError("put_stack needs at least one array")
+        return self._put(arrays, True, timeout)
+
+    def release(self, handle: ShmHandle) -> None:
+        self._release_slot(handle.slot)
+
+    def _release_slot(self, slot: int) -> None:
+        with self._cond:
+            if slot not in self._free:
+                self._free.append(slot)
+            self._cond.notify()
+
+    @property
+    def free(self) -> int:
+        return len(self._free)
+
+    def close(self) -> None:
+        """关闭并 unlink 所有块（可重复调用）"""
+        with self._cond:
+            self._closed = True
+            blocks, self._blocks = self._blocks, [None] * self.slots
+            self._cond.notify_all()
+        for block in blocks:
+            if block is None:
+                continue
+            block.close()
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+相同请求合并（single-flight）+ 短期结果缓存
+Single-flight coalescing of identical concurrent analyses.
+
+同一张图（按内容哈希）+ 相同参数的并发请求只跑一次分析，结果分发给所有
+等待者；失败同样传给所有等待者且不缓存。完成后的短时间内（ttl 秒）再来的
+相同请求直接从缓存返回。每个调用方拿到的是结果的独立副本。
+
+    flight = AsyncSingleFlight(ttl=30)
+    key = request_key(image_bytes, north_deg=0.0, house_facing=None)
+    layout = await flight.do(key, pool.analyze, image_bytes, 0.0, None)
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from pipeline_metrics import CACHE_REQUESTS
+
+
+def request_key(data: bytes, **params) -> str:
+    """图像内容 + 参数 -> 请求键"""
+    h = hashlib.sha256(data)
+    h.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class TTLCache:
+    """带过期时间的 LRU 缓存（线程安全）"""
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _record(cache: str, result: str) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result=result).inc()
+
+
+class AsyncSingleFlight:
+    """
+    真正的工作放在独立 Task 里，单个等待者取消（例如客户端断开）
+    不会取消其他等待者共享的分析。
+    """
+
+    def __init__(
+        self, ttl: float = 30.0, max_entries: int = 256, name: str = "analysis"
+    ):
+        self.name = name
+        self.cache = TTLCache(ttl, max_entries)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable, *args):
+        cached = self.cache.get(key)
+        if cached is not None:
+            _record(self.name, "hit")
+            return copy.deepcopy(cached)
+
+        task = self._inflight.get(key)
+        if task is None:
+            _record(self.name, "miss")
+            task = asyncio.ensure_future(fn(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            _record(self.name, "coalesced")
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result)
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is None:  # 同时取走异常，避免 "never retrieved"
+            self.cache.put(key, task.result())
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
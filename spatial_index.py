@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+均匀网格空间索引（仅标准库，OCR 与评分共用）
+Uniform-grid spatial index over boxes and points.
+
+框（l, t, r, b）按 cell 大小分桶，查询只检查覆盖到的格子，邻域/对齐查询
+不再需要两两比较。点按退化框（l == r, t == b）插入。
+
+    index = GridIndex(cell=40)
+    index.insert("a", (10, 10, 60, 30))
+    index.query((50, 0, 120, 40))     # -> ["a"]
+    index.near(35, 20, radius=30)     # 框到点的距离 <= radius
+"""
+
+import math
+from collections import defaultdict
+from typing import Dict, Hashable, Iterator, List, Sequence, Tuple
+
+Box = Tuple[float, float, float, float]  # left, top, right, bottom
+
+
+def box_distance(box: Box, x: float, y: float) -> float:
+    """点到框的欧氏距离（点在框内为 0）"""
+    l, t, r, b = box
+    dx = max(l - x, 0.0, x - r)
+    dy = max(t - y, 0.0, y - b)
+    return math.hypot(dx, dy)
+
+
+class GridIndex:
+    def __init__(self, cell: float):
+        if cell <= 0:
+            raise ValueError("cell size must be positive")
+        self.cell = float(cell)
+        self._cells: Dict[Tuple[int, int], set] = defaultdict(set)
+        self._boxes: Dict[Hashable, Box] = {}
+        self._order: Dict[Hashable, int] = {}
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._boxes
+
+    def _span(self, box: Box) -> Iterator[Tuple[int, int]]:
+        l, t, r, b = box
+        c = self.cell
+        for gx in range(math.floor(l / c), math.floor(r / c) + 1):
+            for gy in range(math.floor(t / c), math.floor(b / c) + 1):
+                yield gx, gy
+
+    def insert(self, key: Hashable, box: Sequence[float]) -> None:
+        box = tuple(float(v) for v in box)
+        if key in self._boxes:
+            self.remove(key)
+        self._boxes[key] = box
+        self._order[key] = self._seq
+        self._seq += 1
+        for g in self._span(box):
+            self._cells[g].add(key)
+
+    def remove(self, key: Hashable) -> None:
+        box = self._boxes.pop(key)
+        del self._order[key]
+        for g in self._span(box):
+            bucket = self._cells[g]
+            bucket.discard(key)
+            if not bucket:
+                del self._cells[g]
+
+    def box(self, key: Hashable) -> Box:
+        return self._boxes[key]
+
+    def query(self, box: Sequence[float]) -> List[Hashable]:
+        """与 box 相交（含边界接触）的键，按插入顺序返回"""
+        l, t, r, b = box
+        seen = set()
+        for g in self._span((l, t, r, b)):
+            seen.update(self._cells.get(g, ()))
+        hits = []
+        for k in seen:
+            bl, bt, br, bb = self._boxes[k]
+            if bl <= r and br >= l and bt <= b and bb >= t:
+                hits.append(k)
+        hits.sort(key=self._order.__getitem__)
+        return hits
+
+    def near(self, x: float, y: float, radius: float) -> List[Hashable]:
+        """到点 (x, y) 距离不超过 radius 的键"""
+        cand = self.query((x - radius, y - radius, x + radius, y + radius))
+        return [k for k in cand if box_distance(self._boxes[k], x, y) <= radius]
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量流水线测试（线程版 OCR，替换 ocr_lines）
+Async batch pipeline test with a fake OCR engine
+"""
+
+import asyncio
+
+import cv2
+import numpy as np
+
+import fp2layout
+from async_pipeline import analyze_batch
+
+
+def fake_ocr_lines(prep, detect_scale=None):
+    h, w = prep.shape[:2]
+    return [
+        {
+            "text": "ENTRY",
+            "bbox": [w // 2 - 20, h - 40, w // 2 + 20, h - 20],
+            "conf": 0.9,
+        },
+        {
+            "text": "KITCHEN",
+            "bbox": [w - 80, h // 2 - 10, w - 20, h // 2 + 10],
+            "conf": 0.8,
+        },
+    ]
+
+
+def test_batch_keeps_order_and_isolates_failures(monkeypatch, tmp_path):
+    monkeypatch.setattr(fp2layout, "ocr_lines", fake_ocr_lines)
+    ok, buf = cv2.imencode(".png", np.full((300, 400, 3), 255, np.uint8))
+    sources = []
+    for i in range(5):
+        p = tmp_path / f"plan{i}.png"
+        p.write_bytes(buf.tobytes())
+        sources.append(str(p))
+    sources.insert(2, str(tmp_path / "missing.png"))
+    sources.append(b"not an image")
+
+    results = asyncio.run(
+        analyze_batch(sources, executor="thread", ocr_workers=2, queue_size=1)
+    )
+
+    assert [r.index for r in results] == list(range(len(sources)))
+    assert "FileNotFoundError" in results[2].error
+    assert "ValueError" in results[-1].error
+    good = [r for r in results if r.error is None]
+    assert len(good) == 5
+    for r in good:
+        assert r.layout["image_size"] == {"width": 400, "height": 300}
+        assert r.layout["house_facing"] == "S"
+        assert r.score["total"] >= 0
+        assert set(r.stages) == {"imread", "preprocess", "ocr", "layout"}
+
+
+def test_batch_matches_detect_layout(monkeypatch):
+    """批处理与 detect_layout 的识别流程相同：升级补识别后结果一致"""
+    from benchmarks.synth_floorplan import render_floorplan
+    from shm_transfer import ShmRing, ocr_from_shm
+
+    calls = []
+
+    def fake(prep, detect_scale=None):
+        calls.append(detect_scale)
+        if detect_scale is None:  # 首轮只找到入口
+            return fake_ocr_lines(prep)[:1]
+        return fake_ocr_lines(prep)[1:]  # 升级后补上厨房
+
+    monkeypatch.setattr(fp2layout, "ocr_lines", fake)
+    img, _ = render_floorplan(800, 600, seed=1)
+    data = cv2.imencode(".png", img)[1].tobytes()
+
+    want = fp2layout.detect_layout(data, 0.0)
+    (got,) = asyncio.run(analyze_batch([data], executor="thread", ocr_workers=1))
+    assert got.error is None
+    assert got.layout == want
+    assert {r["norm_label"] for r in want["rooms"]} == {"entry", "kitchen"}
+
+    # 进程池模式经共享内存传 (灰度图, 二值图)
+    from async_pipeline import decode_and_preprocess
+
+    gray, prep, profile, *_ = decode_and_preprocess(data)
+    with ShmRing(slots=1) as ring:
+        handle = ring.put(np.stack((gray, prep)))
+        lines = ocr_from_shm(handle, profile, True)
+        ring.release(handle)
+    assert lines == fp2layout.recognize_lines(gray, prep, profile, True)
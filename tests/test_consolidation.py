@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+重复标签合并（NMS）测试
+Duplicate label consolidation (NMS) tests
+"""
+
+import numpy as np
+
+import fp2layout
+from zhongxuan_scorer import score_layout
+
+
+def line(text, l, t, r, b, conf):
+    return {"text": text, "bbox": [l, t, r, b], "conf": conf}
+
+
+def brute_force_nms(boxes, scores, groups, overlap):
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep, dropped = [], set()
+    for i in np.argsort(-scores, kind="stable"):
+        if i in dropped:
+            continue
+        keep.append(i)
+        for j in range(len(boxes)):
+            if j == i or groups[j] != groups[i]:
+                continue
+            w = min(boxes[i, 2], boxes[j, 2]) - max(boxes[i, 0], boxes[j, 0])
+            h = min(boxes[i, 3], boxes[j, 3]) - max(boxes[i, 1], boxes[j, 1])
+            if max(w, 0) * max(h, 0) / min(area[i], area[j]) >= overlap:
+                dropped.add(j)
+    return sorted(keep)
+
+
+def test_nms_matches_brute_force():
+    rng = np.random.default_rng(0)
+    base = rng.uniform(0, 2000, (80, 2))
+    idx = rng.integers(0, 80, 400)
+    xy = base[idx] + rng.normal(0, 8, (400, 2))
+    boxes = np.c_[xy, xy + [80, 20]]
+    scores = rng.random(400)
+    groups = rng.integers(0, 5, 80)[idx]
+    got = fp2layout.nms_boxes(boxes, scores, groups)
+    assert list(got) == brute_force_nms(boxes, scores, groups, fp2layout.NMS_OVERLAP)
+
+
+def test_duplicate_labels_keep_best_confidence():
+    lines = [
+        line("BATH", 100, 100, 160, 120, 0.6),
+        line("BATH", 102, 101, 161, 121, 0.9),  # 第二轮识别的同一个框
+        line("BATH", 500, 100, 560, 120, 0.5),  # 另一间浴室
+        line("BED 2", 100, 300, 170, 320, 0.8),
+        line("BED 3", 105, 302, 172, 321, 0.7),  # 编号不同，不算重复
+        line("BED", 300, 300, 340, 320, 0.4),
+        line("BEDROOM", 300, 298, 400, 322, 0.8),  # 包含同类短框
+    ]
+    normed = fp2layout.normalize_lines(lines)
+    got = [(ln["text"], ln["conf"]) for ln, _ in normed]
+    assert got == [
+        ("BATH", 0.9),
+        ("BATH", 0.5),
+        ("BED 2", 0.8),
+        ("BED 3", 0.7),
+        ("BEDROOM", 0.8),
+    ]
+
+
+def test_duplicates_are_not_scored_twice():
+    lines = [
+        line("BATH", 700, 100, 760, 120, 0.6),
+        line("BATH", 702, 101, 761, 121, 0.9),
+    ]
+    layout = fp2layout.assemble_layout(lines, 800, 600, 0.0, "S")
+    assert len(layout["rooms"]) == 1
+    result = score_layout(layout)
+    assert result["breakdown"]["bath_laundry"]["score"] in (-2, 2)
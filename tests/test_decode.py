@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+灰度 / 降采样解码测试
+Grayscale and reduced-resolution decode test
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+import fp2layout
+
+
+def test_reduced_decode_keeps_original_coordinates(monkeypatch, tmp_path):
+    """大图降采样解码后，image_size / bbox / center_xy 仍以原图为准"""
+    seen = {}
+
+    def fake_ocr_lines(prep, detect_scale=None):
+        seen["shape"] = prep.shape
+        h, w = prep.shape[:2]
+        # 降采样图上位于右侧中部的厨房
+        return [
+            {
+                "text": "KITCHEN",
+                "bbox": [w - 100, h // 2 - 10, w - 20, h // 2 + 10],
+                "conf": 0.9,
+            }
+        ]
+
+    monkeypatch.setattr(fp2layout, "ocr_lines", fake_ocr_lines)
+    img = np.full((1200, 1600, 3), 255, np.uint8)
+    path = str(tmp_path / "plan.png")
+    cv2.imwrite(path, img)
+
+    gray, size = fp2layout.load_gray(path, max_side=400)
+    assert gray.ndim == 2 and gray.shape == (300, 400) and size == (1600, 1200)
+
+    layout = fp2layout.detect_layout(
+        path, 0.0, "S", max_side=400, metrics=True, escalate=False
+    )
+    assert seen["shape"] == (300, 400)
+    assert layout["image_size"] == {"width": 1600, "height": 1200}
+    (room,) = layout["rooms"]
+    assert list(room["bbox"]) == [1200, 560, 320, 80]
+    assert tuple(room["center_xy"]) == (0.85, 0.5) and room["palace9"] == "E"
+    assert layout["metrics"]["decode_size"] == {"width": 400, "height": 300}
+
+    # 不降采样时与之前一致：整图灰度
+    with open(path, "rb") as f:
+        gray, size = fp2layout.load_gray(f.read(), max_side=None)
+    assert gray.shape == (1200, 1600) and size == (1600, 1200)
+
+
+def test_oversized_header_still_reduces(monkeypatch, tmp_path):
+    """超过 PIL 像素上限（DecompressionBombError）的大图仍读文件头并降采样解码"""
+    from PIL import Image
+
+    path = str(tmp_path / "huge.png")
+    cv2.imwrite(path, np.full((1200, 1600), 255, np.uint8))
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100_000)
+    with pytest.raises(Image.DecompressionBombError):
+        Image.open(path)
+
+    assert fp2layout.image_dims(path) == (1600, 1200)
+    gray, size = fp2layout.load_gray(path, max_side=400)
+    assert gray.shape == (300, 400) and size == (1600, 1200)
+    assert Image.MAX_IMAGE_PIXELS == 100_000
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OCR 升级策略测试
+OCR escalation test
+"""
+
+import numpy as np
+
+import fp2layout
+
+
+def test_unrotate_lines_maps_boxes_back():
+    img = np.zeros((300, 400), np.uint8)
+    img[50:70, 100:180] = 255  # 原图中的 "文字块"
+    for k in (1, 3):
+        rot = np.rot90(img, k)
+        ys, xs = np.nonzero(rot)
+        box = [xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]
+        (ln,) = fp2layout.unrotate_lines(
+            [{"text": "", "bbox": box, "conf": 1}], k, 400, 300
+        )
+        assert ln["bbox"] == [100, 50, 180, 70]
+
+
+def test_escalates_only_when_key_labels_missing(monkeypatch):
+    calls = []
+
+    def fake_ocr_lines(prep, detect_scale=None):
+        calls.append((prep.shape, detect_scale))
+        h, w = prep.shape
+        if detect_scale is None:  # 首轮：只找到入口和一块无关文字
+            return [
+                {"text": "ENTRY", "bbox": [180, 260, 220, 280], "conf": 0.9},
+                {"text": "K1TCHEN", "bbox": [320, 140, 380, 160], "conf": 0.4},
+            ]
+        if (h, w) == (300, 400):  # 更强的预处理：厨房识别正确
+            return [{"text": "KITCHEN", "bbox": [320, 140, 380, 160], "conf": 0.8}]
+        if (h, w) == (400, 300) and len(calls) == 3:  # 旋转 90°：竖排的主卧
+            return [{"text": "MASTER BED", "bbox": [20, 300, 40, 380], "conf": 0.7}]
+        return []
+
+    monkeypatch.setattr(fp2layout, "ocr_lines", fake_ocr_lines)
+    img = np.full((300, 400, 3), 255, np.uint8)
+
+    layout = fp2layout.detect_layout(img, 0.0, metrics=True, profile="fast")
+    labels = sorted(r["norm_label"] for r in layout["rooms"])
+    assert labels == ["entry", "kitchen", "master_bedroom"]
+    assert layout["house_facing"] == "S"
+    assert layout["metrics"]["escalation"] == ["profile:balanced", "rotate"]
+    assert layout["metrics"]["missing_labels"] == []
+    master = next(r for r in layout["rooms"] if r["norm_label"] == "master_bedroom")
+    assert list(master["bbox"]) == [20, 20, 80, 20]
+
+    # 首轮已齐全：不再升级
+    calls.clear()
+    monkeypatch.setattr(
+        fp2layout,
+        "ocr_lines",
+        lambda prep, detect_scale=None: calls.append(1)
+        or [
+            {"text": "ENTRY", "bbox": [180, 260, 220, 280], "conf": 0.9},
+            {"text": "KITCHEN", "bbox": [320, 140, 380, 160], "conf": 0.9},
+            {"text": "MASTER BED", "bbox": [20, 20, 100, 40], "conf": 0.9},
+        ],
+    )
+    layout = fp2layout.detect_layout(img, 0.0, metrics=True)
+    assert len(calls) == 1 and layout["metrics"]["escalation"] == []
+
+
+def test_scan_profile_skips_identical_pass(monkeypatch):
+    """已是最强预处理且首轮已全分辨率检测：直接进入旋转一步"""
+    calls = []
+
+    def fake_ocr_lines(prep, detect_scale=None):
+        calls.append((prep.shape, detect_scale))
+        return [{"text": "ENTRY", "bbox": [180, 260, 220, 280], "conf": 0.9}]
+
+    monkeypatch.setattr(fp2layout, "ocr_lines", fake_ocr_lines)
+    monkeypatch.setattr(fp2layout, "EASYOCR_AVAILABLE", True)
+    img = np.full((300, 400, 3), 255, np.uint8)
+    layout = fp2layout.detect_layout(img, 0.0, metrics=True, profile="scan")
+    assert layout["metrics"]["escalation"] == ["rotate"]
+    assert [shape for shape, _ in calls] == [(300, 400), (400, 300), (400, 300)]
+
+    # 首轮在缩小图上检测时，全分辨率重跑仍有意义
+    calls.clear()
+    layout = fp2layout.detect_layout(
+        img, 0.0, metrics=True, profile="scan", detect_scale=0.5
+    )
+    assert layout["metrics"]["escalation"] == ["profile:scan", "rotate"]
+    assert len(calls) == 4
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+平面外框检测测试
+Footprint detection test
+"""
+
+import cv2
+import numpy as np
+
+import fp2layout
+from benchmarks.synth_floorplan import render_floorplan
+
+
+def test_footprint_matches_plan_outline():
+    for seed in range(3):
+        img, truth = render_floorplan(1600, 1200, seed=seed)
+        fp = fp2layout.detect_footprint(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+        px, py, pw, ph = truth["plan_bbox"]
+        x, y, w, h = fp
+        # 允许外墙线宽的误差
+        assert abs(x - px) <= 12 and abs(y - py) <= 12
+        assert abs(x + w - px - pw) <= 12 and abs(y + h - py - ph) <= 12
+
+
+def test_detect_layout_crops_to_footprint(monkeypatch):
+    img, truth = render_floorplan(800, 600, seed=2)
+    px, py, pw, ph = truth["plan_bbox"]
+    seen = {}
+
+    def fake_ocr_lines(prep, detect_scale=None):
+        seen["shape"] = prep.shape
+        # 裁剪图坐标：外框左上角附近的厨房
+        return [{"text": "KITCHEN", "bbox": [30, 30, 90, 50], "conf": 0.9}]
+
+    monkeypatch.setattr(fp2layout, "ocr_lines", fake_ocr_lines)
+    layout = fp2layout.detect_layout(img, 0.0, "S", escalate=False, metrics=True)
+
+    fx, fy, fw, fh = layout["footprint"]
+    assert abs(fx - px) <= 6 and abs(fw - pw) <= 12
+    # OCR 只看外框（含少量外扩），不看整张图
+    assert seen["shape"][0] < 600 and seen["shape"][1] < 800
+    (room,) = layout["rooms"]
+    assert room["palace9"] == "NW"
+    cx = (room["bbox"][0] + room["bbox"][2] / 2.0 - fx) / fw
+    assert abs(room["center_xy"][0] - round(cx, 4)) < 1e-6
+
+
+def test_blank_image_has_no_footprint():
+    assert fp2layout.detect_footprint(np.full((300, 400), 255, np.uint8)) is None
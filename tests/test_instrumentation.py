@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分阶段计时测试
+Per-stage timing instrumentation test
+"""
+
+import instrumentation
+from zhongxuan_scorer import score_layout
+
+TEST_DATA = {
+    "house_facing": "S",
+    "rooms": [
+        {"norm_label": "entry", "palace9": "S", "center_xy": [0.5, 0.1]},
+        {"norm_label": "kitchen", "palace9": "E", "center_xy": [0.8, 0.5]},
+    ],
+}
+
+
+def test_metrics_opt_in():
+    """默认不附加 metrics，开启后附加并回调"""
+    assert "metrics" not in score_layout(TEST_DATA, "northern", "en")
+
+    seen = []
+    result = score_layout(
+        TEST_DATA, "northern", "en", metrics=True, on_metrics=seen.append
+    )
+    m = result["metrics"]
+    assert m["kind"] == "score_layout"
+    assert set(m["stages"]) == {"rules", "advice"}
+    assert m["room_count"] == 2
+    assert seen == [m]
+
+
+def test_default_callback_and_failing_callback():
+    """全局回调能收到数据；回调抛异常不影响结果"""
+    seen = []
+    instrumentation.set_metrics_callback(seen.append)
+    try:
+        result = score_layout(TEST_DATA, on_metrics=lambda m: 1 / 0)
+    finally:
+        instrumentation.set_metrics_callback(None)
+    assert "metrics" not in result
+    assert len(seen) == 1 and seen[0]["stages"]["rules"]["wall_ms"] >= 0
+
+
+def test_stage_timer_lap_and_stage():
+    timer = instrumentation.StageTimer("x")
+    timer.lap("a")
+    with timer.stage("b"):
+        pass
+    timer.lap("a")
+    d = timer.as_dict()
+    assert set(d["stages"]) == {"a", "b"}
+    assert d["total_wall_ms"] >= d["stages"]["a"]["wall_ms"]
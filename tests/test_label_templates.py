@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+标签模板快速识别测试
+Label template fast-path tests
+"""
+
+import cv2
+import pytest
+
+import fp2layout
+from benchmarks.synth_floorplan import render_floorplan
+from label_templates import LabelTemplates
+
+
+def truth_lines(truth):
+    return [
+        {
+            "text": lb["text"],
+            "bbox": [
+                lb["bbox"][0],
+                lb["bbox"][1],
+                lb["bbox"][0] + lb["bbox"][2],
+                lb["bbox"][1] + lb["bbox"][3],
+            ],
+            "conf": 0.95,
+        }
+        for lb in truth["labels"]
+        if lb["angle"] == 0
+    ]
+
+
+@pytest.fixture(scope="module")
+def source():
+    img, truth = render_floorplan(1600, 1200, seed=7, rotate_labels=False)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    templates = LabelTemplates()
+    assert templates.learn(gray, truth_lines(truth)) > 0
+    return img, truth, templates
+
+
+def test_learned_labels_are_found_at_another_scale(source):
+    img, truth, templates = source
+    small = cv2.resize(img, (1200, 900), interpolation=cv2.INTER_AREA)
+    got = templates.match(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+    assert sorted(m["text"] for m in got) == sorted(
+        ln["text"] for ln in truth_lines(truth)
+    )
+    by_text = {m["text"]: m for m in got}
+    for ln in truth_lines(truth):
+        # 匹配框是笔画的紧致框，应落在（缩放后的）真值框内
+        l, t, r, b = by_text[ln["text"]]["bbox"]
+        L, T, R, B = (v * 0.75 for v in ln["bbox"])
+        assert L - 2 <= l < r <= R + 2 and T - 2 <= t < b <= B + 2
+
+
+def test_bedroom_numbers_use_digit_glyphs():
+    img, truth = render_floorplan(1600, 1200, seed=4, rotate_labels=False)
+    templates = LabelTemplates()
+    templates.learn(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), truth_lines(truth))
+    assert templates.numbered == {"BED"} and sorted(templates.digits) == ["2", "3"]
+    small = cv2.resize(img, (800, 600), interpolation=cv2.INTER_AREA)
+    got = [m["text"] for m in templates.match(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))]
+    assert "BED 2" in got and "BED 3" in got
+
+
+def test_templates_round_trip(source, tmp_path):
+    _, _, templates = source
+    path = str(tmp_path / "source")
+    templates.save(path)
+    loaded = LabelTemplates.load(path)
+    assert len(loaded) == len(templates)
+    assert loaded.numbered == templates.numbered
+    assert sorted(loaded.digits) == sorted(templates.digits)
+
+
+def test_detect_layout_skips_ocr_for_known_source(monkeypatch):
+    img, truth = render_floorplan(1600, 1200, seed=7, rotate_labels=False)
+    calls = []
+
+    def fake_ocr_lines(prep, detect_scale=None):
+        calls.append(prep.shape)
+        # 整页返回真值；未匹配块（尺寸标注、标题）拼成的小图里没有房间
+        return truth_lines(truth) if prep.shape == img.shape[:2] else []
+
+    monkeypatch.setattr(fp2layout, "ocr_lines", fake_ocr_lines)
+    opts = dict(footprint=False, segment=False, escalate=False, metrics=True)
+    templates = LabelTemplates()
+    first = fp2layout.detect_layout(img, 0.0, templates=templates, **opts)
+    assert len(calls) == 1 and len(templates) > 0
+
+    again = fp2layout.detect_layout(img, 0.0, templates=templates, **opts)
+    assert again["metrics"]["recognizer"] == "templates"
+    # 不再整页 OCR，只识别未匹配块拼成的小图
+    assert len(calls) == 2 and again["metrics"]["template_unmatched"] > 0
+    h, w = calls[1]
+    assert h * w < 0.25 * img.shape[0] * img.shape[1]
+    assert sorted(r["norm_label"] for r in again["rooms"]) == sorted(
+        r["norm_label"] for r in first["rooms"]
+    )
+    assert all(r["conf"] >= 0.8 for r in again["rooms"])
+
+    # 来源不同（字体对不上）时回退到 OCR
+    other = cv2.resize(img, (1600, 1200))
+    other[:] = 255
+    fp2layout.detect_layout(other, 0.0, templates=templates, **opts)
+    assert len(calls) == 3 and calls[2] == img.shape[:2]
+
+
+def test_labels_without_template_are_ocr_read(monkeypatch):
+    """关键标签齐全但有房间名没有模板：该文字块单独 OCR 并学习，不会丢房间"""
+    img, truth = render_floorplan(1600, 1200, seed=7, rotate_labels=False)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    lines = truth_lines(truth)
+    keys = {"kitchen", "master_bedroom", "entry", "alfresco"}
+    new = next(
+        ln for ln in lines if fp2layout.normalize_label(ln["text"])[0] not in keys
+    )
+    templates = LabelTemplates()
+    templates.learn(gray, [ln for ln in lines if ln is not new])
+    assert new["text"] not in templates.labels
+
+    l, t, r, b = new["bbox"]
+    crop = fp2layout.preprocess_for_ocr(gray, "fast")[t:b, l:r]
+    calls = []
+
+    def fake_ocr_lines(prep, detect_scale=None):
+        # 只在拼图里"认出"这个新标签（与整页预处理后的裁剪做模板匹配）
+        calls.append(prep.shape)
+        res = cv2.matchTemplate(prep, crop, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (x, y) = cv2.minMaxLoc(res)
+        if score < 0.8:
+            return []
+        return [
+            {"text": new["text"], "bbox": [x, y, x + r - l, y + b - t], "conf": 0.9}
+        ]
+
+    monkeypatch.setattr(fp2layout, "ocr_lines", fake_ocr_lines)
+    opts = dict(footprint=False, segment=False, escalate=False, metrics=True)
+    layout = fp2layout.detect_layout(img, 0.0, templates=templates, **opts)
+    assert layout["metrics"]["recognizer"] == "templates"
+    assert len(calls) == 1 and calls[0] != gray.shape
+    got = {r["raw_text"]: r["bbox"] for r in layout["rooms"]}
+    assert new["text"] in got
+    gl, gt, gw, gh = got[new["text"]]
+    assert abs(gl - l) <= 2 and abs(gt - t) <= 2
+    assert sorted(got) == sorted(ln["text"] for ln in lines)
+    # 下次直接用模板匹配
+    assert new["text"] in templates.labels
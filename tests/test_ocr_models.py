@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+离线 OCR 模型包测试（伪造 easyocr / torch 模块）
+Offline OCR model bundle tests with fake easyocr / torch modules
+"""
+
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import fp2layout
+import ocr_models
+from ocr_models import ModelBundleError, pack, verify_bundle
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    src = tmp_path / "downloaded"
+    src.mkdir()
+    (src / "craft_mlt_25k.pth").write_bytes(b"detector" * 1000)
+    (src / "english_g2.pth").write_bytes(b"recognizer" * 500)
+    (src / "eng.traineddata").write_bytes(b"tessdata" * 300)
+    out = tmp_path / "bundle"
+    pack(str(out), easyocr_dir=str(src), tessdata_dir=str(src))
+    return out
+
+
+def test_pack_and_verify(bundle):
+    paths = verify_bundle(str(bundle), "easyocr")
+    assert sorted(paths) == ["craft_mlt_25k.pth", "english_g2.pth"]
+    assert verify_bundle(str(bundle), "tesseract")
+
+    # 同样大小的损坏只有完整校验才能发现
+    data = bytearray((bundle / "english_g2.pth").read_bytes())
+    data[10] ^= 0xFF
+    (bundle / "english_g2.pth").write_bytes(bytes(data))
+    verify_bundle(str(bundle), "easyocr", checksums=False)
+    with pytest.raises(ModelBundleError, match="english_g2.pth sha256 mismatch"):
+        verify_bundle(str(bundle), "easyocr")
+
+
+def test_errors_list_every_problem(bundle, tmp_path):
+    (bundle / "craft_mlt_25k.pth").unlink()
+    (bundle / "english_g2.pth").write_bytes(b"short")
+    with pytest.raises(ModelBundleError) as e:
+        verify_bundle(str(bundle), "easyocr")
+    msg = str(e.value)
+    assert "craft_mlt_25k.pth is missing" in msg
+    assert "english_g2.pth is 5 bytes" in msg
+    assert "ocr_models.py pack" in msg
+
+    with pytest.raises(ModelBundleError, match="manifest.json not found"):
+        verify_bundle(str(tmp_path), "easyocr")
+    with pytest.raises(ModelBundleError, match="does not exist"):
+        verify_bundle(str(tmp_path / "nope"), "tesseract")
+
+
+def test_easyocr_reader_loads_from_bundle(bundle, monkeypatch):
+    loads = []
+
+    def fake_load(model_dir):
+        loads.append(model_dir)
+        return SimpleNamespace(model_dir=model_dir)
+
+    monkeypatch.setattr(fp2layout, "OCR_ENGINE_NAME", "easyocr")
+    monkeypatch.setattr(fp2layout, "OCR_MODEL_DIR", None)
+    monkeypatch.setattr(fp2layout, "load_easyocr_reader", fake_load)
+    monkeypatch.delattr(fp2layout.ocr_with_easyocr, "reader", raising=False)
+    monkeypatch.delattr(fp2layout.ocr_with_easyocr, "model_dir", raising=False)
+
+    fp2layout.warm_up(model_dir=str(bundle))
+    assert fp2layout.get_easyocr_reader().model_dir == str(bundle)
+    assert loads == [str(bundle)]
+
+    (bundle / "craft_mlt_25k.pth").unlink()
+    with pytest.raises(ModelBundleError):
+        fp2layout.set_ocr_model_dir(str(bundle))
+    assert fp2layout.OCR_MODEL_DIR == str(bundle)  # 校验失败不改变当前设置
+
+
+def test_pytesseract_uses_bundle_tessdata(bundle, monkeypatch):
+    seen = []
+
+    def image_to_data(img, lang, config, output_type):
+        seen.append(config)
+        return {k: [] for k in fp2layout._TSV_COLUMNS}
+
+    fake = SimpleNamespace(image_to_data=image_to_data, Output=SimpleNamespace(DICT=1))
+    monkeypatch.setattr(fp2layout, "pytesseract", fake, raising=False)
+    monkeypatch.setattr(fp2layout, "TESSERACT_BACKEND", "pytesseract")
+    monkeypatch.setattr(fp2layout, "OCR_ENGINE_NAME", "tesseract")
+    monkeypatch.setattr(fp2layout, "OCR_MODEL_DIR", None)
+
+    fp2layout.set_ocr_model_dir(str(bundle))
+    fp2layout.ocr_with_tesseract(np.zeros((20, 20), np.uint8))
+    assert f'--tessdata-dir "{bundle}"' in seen[0]
+
+
+def test_easyocr_never_downloads(tmp_path, monkeypatch):
+    kwargs = {}
+
+    class Reader:
+        def __init__(self, lang, **kw):
+            kwargs.update(kw)
+            raise FileNotFoundError("Missing craft_mlt_25k.pth and downloads disabled")
+
+    monkeypatch.setitem(sys.modules, "easyocr", SimpleNamespace(Reader=Reader))
+    with pytest.raises(ModelBundleError, match="downloads disabled"):
+        ocr_models.load_easyocr_reader(str(tmp_path))
+    assert kwargs["download_enabled"] is False
+    assert kwargs["model_storage_directory"] == str(tmp_path)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+整页方向估计测试（替换 ocr_lines：只有正向文字才能"识别"）
+Page orientation estimation tests with a fake OCR engine
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+import fp2layout
+from benchmarks.synth_floorplan import render_floorplan
+
+
+def page(seed=2, rotate_labels=False):
+    img, truth = render_floorplan(1200, 900, seed=seed, rotate_labels=rotate_labels)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), truth
+
+
+def upright_reader(gray, truth, calls):
+    """
+    假 OCR：图中能找到正向标签（与正向整图的标签区域模板匹配）才返回房间行；
+    整张正向图返回真值行（正向图坐标）。
+    """
+    prep = fp2layout.preprocess_for_ocr(gray, "fast")
+    crops, lines = [], []
+    for lb in truth["labels"]:
+        l, t, w, h = lb["bbox"]
+        crops.append(prep[t : t + h, l : l + w])
+        lines.append({"text": lb["text"], "bbox": [l, t, l + w, t + h], "conf": 0.9})
+
+    def fake_ocr_lines(img, detect_scale=None):
+        calls.append(img.shape)
+        upright = any(
+            c.shape[0] <= img.shape[0]
+            and c.shape[1] <= img.shape[1]
+            and cv2.matchTemplate(img, c, cv2.TM_CCOEFF_NORMED).max() > 0.8
+            for c in crops
+        )
+        if not upright:
+            return [{"text": "WOOHDEB", "bbox": [0, 0, 40, 10], "conf": 0.2}]
+        if img.shape == prep.shape:
+            return lines
+        return [{"text": "KITCHEN", "bbox": [0, 0, 40, 10], "conf": 0.9}]
+
+    return fake_ocr_lines
+
+
+@pytest.mark.parametrize("seed", [0, 5])
+def test_text_axis_from_glyph_pairs(seed):
+    gray, _ = page(seed, rotate_labels=True)
+    for k in range(4):
+        prep = fp2layout.preprocess_for_ocr(np.ascontiguousarray(np.rot90(gray, k)))
+        horizontal, vertical = fp2layout.glyph_pairs(fp2layout.glyph_boxes(prep))
+        if k % 2:
+            assert len(vertical) > fp2layout.ORIENT_MARGIN * len(horizontal)
+        else:
+            assert len(horizontal) > fp2layout.ORIENT_MARGIN * len(vertical)
+
+
+@pytest.mark.parametrize("k", [1, 2, 3])
+def test_unrotate_lines_inverts_rot90(k):
+    img = np.zeros((300, 400), np.uint8)
+    img[40:70, 250:390] = 255
+    rotated = np.rot90(img, k)
+    ys, xs = np.nonzero(rotated)
+    line = {"text": "X", "bbox": [xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]}
+    (back,) = fp2layout.unrotate_lines([line], k, 400, 300)
+    assert back["bbox"] == [250, 40, 390, 70]
+
+
+def test_probe_picks_upright_side(monkeypatch):
+    gray, truth = page()
+    calls = []
+    monkeypatch.setattr(fp2layout, "ocr_lines", upright_reader(gray, truth, calls))
+    for k, want in ((1, 3), (3, 1)):
+        prep = fp2layout.preprocess_for_ocr(
+            np.ascontiguousarray(np.rot90(gray, k)), "fast"
+        )
+        got, info = fp2layout.estimate_orientation(prep)
+        assert got == want, info
+    # 每次只 OCR 两张小拼图
+    assert len(calls) == 4
+    assert all(h * w < 0.1 * gray.size for h, w in calls)
+
+    flipped = fp2layout.preprocess_for_ocr(
+        np.ascontiguousarray(np.rot90(gray, 2)), "fast"
+    )
+    assert fp2layout.estimate_orientation(flipped)[0] == 0  # auto 不检查倒置
+    assert fp2layout.estimate_orientation(flipped, "full")[0] == 2
+    upright = fp2layout.preprocess_for_ocr(gray, "fast")
+    assert fp2layout.estimate_orientation(upright, "full")[0] == 0
+    with pytest.raises(ValueError):
+        fp2layout.estimate_orientation(upright, "sideways")
+
+
+def test_detect_layout_on_rotated_page(monkeypatch):
+    gray, truth = page()
+    calls = []
+    monkeypatch.setattr(fp2layout, "ocr_lines", upright_reader(gray, truth, calls))
+    rotated = np.ascontiguousarray(np.rot90(gray, 1))  # 导出时逆时针转了 90°
+    layout = fp2layout.detect_layout(
+        rotated,
+        0.0,
+        "S",
+        metrics=True,
+        profile="fast",
+        escalate=False,
+        footprint=False,
+        segment=False,
+    )
+    assert layout["metrics"]["page_rotation"] == 270
+    # 整页只 OCR 一次（另两次是小拼图）
+    assert sum(shape == gray.shape for shape in calls) == 1
+
+    # 正向图 (l, t, w, h) 在逆时针转 90° 的图上为 (t, W - l - w, h, w)
+    W = gray.shape[1]
+    want = []
+    for lb in truth["labels"]:
+        l, t, w, h = lb["bbox"]
+        want.append((lb["text"], (t, W - l - w, h, w)))
+    want.sort()
+    got = sorted((r["raw_text"], tuple(r["bbox"])) for r in layout["rooms"])
+    assert [g[0] for g in got] == [w[0] for w in want]
+    for (_, a), (_, b) in zip(got, want):
+        assert np.abs(np.subtract(a, b)).max() <= 1
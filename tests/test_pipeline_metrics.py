@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+指标注册表测试
+Pipeline metrics registry test
+"""
+
+import urllib.request
+
+from pipeline_metrics import (
+    REGISTRY,
+    Counter,
+    Histogram,
+    Registry,
+    start_http_server,
+    write_textfile,
+)
+from zhongxuan_scorer import score_layout
+
+
+def test_text_format():
+    """计数器与直方图按 Prometheus 文本格式输出"""
+    reg = Registry()
+    c = Counter("demo_total", "Demo counter", ["engine"], registry=reg)
+    h = Histogram("demo_seconds", "Demo latency", buckets=(0.1, 1.0), registry=reg)
+    c.labels(engine="easyocr").inc()
+    c.labels(engine="easyocr").inc(2)
+    h.observe(0.05)
+    h.observe(0.5)
+    h.observe(5)
+
+    text = reg.render()
+    assert "# TYPE demo_total counter" in text
+    assert 'demo_total{engine="easyocr"} 3' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="1"} 2' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in text
+    assert "demo_seconds_count 3" in text
+
+
+def test_scorer_feeds_registry():
+    """score_layout 会更新全局计数器"""
+    before = REGISTRY.get_sample_value("fengshui_scores_total")
+    score_layout({"house_facing": "S", "rooms": []})
+    assert REGISTRY.get_sample_value("fengshui_scores_total") == before + 1
+
+
+def test_http_endpoint_and_textfile(tmp_path):
+    """本地 HTTP 端点和文本文件导出"""
+    server = start_http_server(0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+            body = resp.read().decode("utf-8")
+        assert "fengshui_analyses_started_total" in body
+    finally:
+        server.shutdown()
+
+    path = tmp_path / "fengshui.prom"
+    write_textfile(str(path))
+    assert "fengshui_scores_total" in path.read_text(encoding="utf-8")
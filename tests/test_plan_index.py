@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+近似重复平面图索引测试
+Near-duplicate plan index tests
+"""
+
+import random
+
+import cv2
+import pytest
+
+import fp2layout
+from benchmarks.synth_floorplan import FONT, render_floorplan
+from plan_index import BKTree, PlanIndex, hamming, plan_fingerprint
+
+LINES = [
+    {"text": "KITCHEN", "bbox": [1100, 300, 1250, 340], "conf": 0.9},
+    {"text": "MASTER BED", "bbox": [300, 300, 480, 340], "conf": 0.8},
+    {"text": "ENTRY", "bbox": [700, 950, 800, 990], "conf": 0.9},
+]
+
+
+def png(img) -> bytes:
+    return cv2.imencode(".png", img)[1].tobytes()
+
+
+def test_bk_tree_matches_brute_force():
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(500)]
+    hashes += [h ^ (1 << rng.randrange(64)) for h in hashes[:100]]
+    tree = BKTree()
+    for i, h in enumerate(hashes):
+        tree.add(h, i)
+    for q in hashes[:50]:
+        want = sorted(i for i, h in enumerate(hashes) if hamming(q, h) <= 10)
+        assert sorted(k for _, k in tree.search(q, 10)) == want
+
+
+def test_near_duplicate_reuses_layout():
+    img, _ = render_floorplan(1600, 1200, seed=3)
+    layout = fp2layout.assemble_layout(LINES, 1600, 1200, 0.0)
+    index = PlanIndex()
+    index.add(plan_fingerprint(png(img)), layout)
+
+    # 缩小导出 + 水印 + 重新压缩
+    small = cv2.resize(img, (800, 600), interpolation=cv2.INTER_AREA)
+    cv2.putText(small, "SAMPLE", (250, 330), cv2.FONT_HERSHEY_SIMPLEX, 2, (180,) * 3, 4)
+    jpg = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, 70])[1].tobytes()
+    reused = index.reuse(plan_fingerprint(jpg), 90.0)
+    assert reused is not None
+    assert reused["image_size"] == {"width": 800, "height": 600}
+    assert reused["north_deg"] == 90.0
+    by_label = {r["norm_label"]: r for r in reused["rooms"]}
+    assert by_label["kitchen"]["bbox"] == (550, 150, 75, 20)
+    # 九宫按新的 north_deg 重新计算
+    expected = fp2layout.assemble_layout(LINES, 1600, 1200, 90.0)
+    assert [r["palace9"] for r in reused["rooms"]] == [
+        r["palace9"] for r in expected["rooms"]
+    ]
+
+    other, _ = render_floorplan(1600, 1200, seed=40)
+    assert index.reuse(plan_fingerprint(png(other)), 0.0) is None
+
+
+def test_palace_area_needs_same_north_deg():
+    """带 palace_area 的缓存换了 north_deg 不复用，避免与新鲜分析的得分不同"""
+    img, _ = render_floorplan(1600, 1200, seed=3)
+    layout = fp2layout.assemble_layout(LINES, 1600, 1200, 0.0)
+    for r in layout["rooms"]:
+        r["palace_area"] = {r["palace9"]: 1.0}
+    index = PlanIndex()
+    fp = plan_fingerprint(png(img))
+    index.add(fp, layout)
+
+    assert index.reuse(fp, 90.0) is None
+    reused = index.reuse(fp, 0.0)
+    assert reused is not None
+    assert [r["palace_area"] for r in reused["rooms"]] == [
+        r["palace_area"] for r in layout["rooms"]
+    ]
+
+    # 重新分析后的新 north_deg 结果入库，之后两个方向都能命中
+    turned = fp2layout.assemble_layout(LINES, 1600, 1200, 90.0)
+    for r in turned["rooms"]:
+        r["palace_area"] = {r["palace9"]: 1.0}
+    index.add(fp, turned)
+    assert index.reuse(fp, 90.0)["rooms"][0]["palace_area"]
+    assert index.reuse(fp, 0.0) is not None
+
+
+def test_relabelled_plan_is_not_reused():
+    """只改了两个房间名的修订版：整图指纹仍很接近，但标签校验不通过"""
+    img, truth = render_floorplan(1600, 1200, seed=4)
+    lines = [
+        {"text": lb["text"], "bbox": [l, t, l + w, t + h], "conf": 0.9}
+        for lb in truth["labels"]
+        for l, t, w, h in [lb["bbox"]]
+    ]
+    layout = fp2layout.assemble_layout(lines, 1600, 1200, 0.0)
+    index = PlanIndex()
+    original = plan_fingerprint(png(img))
+    index.add(original, layout)
+
+    revised = img.copy()
+    for lb in truth["labels"][:2]:
+        l, t, w, h = lb["bbox"]
+        revised[t : t + h, l : l + w] = 255
+        cv2.putText(revised, "STUDY", (l, t + h - 4), FONT, lb["font_scale"], 0, 2)
+    fp = plan_fingerprint(png(revised))
+    assert hamming(fp.hash, original.hash) <= index.max_distance
+    assert index.reuse(fp, 0.0) is None
+
+    # 同一平面缩小导出仍然命中
+    small = cv2.resize(img, (1200, 900), interpolation=cv2.INTER_AREA)
+    jpg = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, 70])[1].tobytes()
+    reused = index.reuse(plan_fingerprint(jpg), 0.0)
+    assert reused is not None and len(reused["rooms"]) == len(layout["rooms"])
+
+
+def test_index_is_bounded():
+    index = PlanIndex(max_entries=4)
+    layout = fp2layout.assemble_layout(LINES, 1600, 1200, 0.0)
+    for seed in range(6):
+        img, _ = render_floorplan(400, 300, seed=seed)
+        index.add(plan_fingerprint(png(img)), layout)
+    assert len(index) <= 4
+
+
+def test_service_skips_ocr_for_near_duplicates():
+    pytest.importorskip("tornado")
+    import asyncio
+
+    import service
+
+    calls = []
+
+    class FakePool:
+        async def analyze(self, data, north_deg, house_facing):
+            calls.append(len(data))
+            return fp2layout.assemble_layout(LINES, 1600, 1200, north_deg, "S")
+
+    img, _ = render_floorplan(1600, 1200, seed=5)
+    small = cv2.resize(img, (1200, 900), interpolation=cv2.INTER_AREA)
+    plans = PlanIndex()
+
+    async def run():
+        a = await service.analyze_or_reuse(FakePool(), plans, png(img), 0.0, "S")
+        b = await service.analyze_or_reuse(FakePool(), plans, png(small), 0.0, "S")
+        return a, b
+
+    a, b = asyncio.run(run())
+    assert len(calls) == 1
+    assert "plan_match" in b and len(b["rooms"]) == len(a["rooms"])
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+预处理配置与质量探测测试
+Preprocessing profiles and quality probe test
+"""
+
+import cv2
+
+from benchmarks.synth_floorplan import degrade_scan, render_floorplan
+from fp2layout import (
+    PREPROCESS_PROFILES,
+    choose_profile,
+    preprocess_for_ocr,
+    probe_quality,
+)
+
+
+def test_probe_picks_fast_for_clean_and_scan_for_degraded():
+    img, _ = render_floorplan(800, 600, seed=3)
+    clean = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    scan = cv2.cvtColor(degrade_scan(img, seed=3), cv2.COLOR_BGR2GRAY)
+
+    q_clean, q_scan = probe_quality(clean), probe_quality(scan)
+    assert q_clean["noise"] < q_scan["noise"]
+    assert q_clean["contrast"] > q_scan["contrast"]
+    assert choose_profile(q_clean) == "fast"
+    assert choose_profile(q_scan) == "scan"
+
+
+def test_every_profile_produces_binary_mask():
+    img, _ = render_floorplan(400, 300, seed=1)
+    for profile in list(PREPROCESS_PROFILES) + ["auto"]:
+        th = preprocess_for_ocr(img, profile)
+        assert th.shape == (300, 400)
+        assert set(th.ravel().tolist()) <= {0, 255}
+        # 文字/墙线为白色前景，只占少部分
+        assert 0 < (th == 255).mean() < 0.5
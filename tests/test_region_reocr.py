@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+区域重新识别测试
+Region re-OCR test
+"""
+
+import cv2
+import numpy as np
+
+import fp2layout
+from room_regions import annotate_palace_area, segment_rooms
+
+
+def fake_ocr_lines(prep):
+    # 裁剪区域内的坐标（相对于裁剪框左上角）
+    return [{"text": "KITCHEN", "bbox": [10, 10, 60, 30], "conf": 0.9}]
+
+
+def test_reocr_region_merges_and_maps_back(monkeypatch):
+    """框内旧标签被替换，新标签坐标映射回整图"""
+    monkeypatch.setattr(fp2layout, "ocr_lines", fake_ocr_lines)
+    img = np.full((400, 600, 3), 255, dtype=np.uint8)
+    layout = {
+        "image_size": {"width": 600, "height": 400},
+        "north_deg": 0.0,
+        "house_facing": "S",
+        "rooms": [
+            {
+                "raw_text": "KITCHFN",
+                "norm_label": "bath",
+                "bbox": [420, 220, 40, 20],
+                "conf": 0.3,
+                "center_xy": [0.73, 0.575],
+                "direction8": "E",
+                "palace9": "E",
+            },
+            {
+                "raw_text": "ENTRY",
+                "norm_label": "entry",
+                "bbox": [280, 370, 40, 20],
+                "conf": 0.8,
+                "center_xy": [0.5, 0.95],
+                "direction8": "S",
+                "palace9": "S",
+            },
+        ],
+        "schema_version": "v1",
+    }
+
+    out = fp2layout.reocr_region(img, (400, 200, 150, 100), layout)
+
+    labels = sorted(r["norm_label"] for r in out["rooms"])
+    assert labels == ["entry", "kitchen"]
+    kitchen = next(r for r in out["rooms"] if r["norm_label"] == "kitchen")
+    assert tuple(kitchen["bbox"]) == (410, 210, 50, 20)
+    assert kitchen["palace9"] == "E"
+    assert out["house_facing"] == "S"
+    # 原 layout 不被修改
+    assert len(layout["rooms"]) == 2 and layout["rooms"][0]["norm_label"] == "bath"
+
+
+def test_reocr_region_keeps_palace_area(monkeypatch):
+    """分割过的 layout（房间带 palace_area）、未指定朝向时也能重新识别"""
+    monkeypatch.setattr(fp2layout, "ocr_lines", fake_ocr_lines)
+    gray = np.full((400, 600), 255, np.uint8)
+    cv2.rectangle(gray, (50, 50), (550, 350), 0, 6)
+    cv2.line(gray, (300, 50), (300, 350), 0, 6)
+    frame = [50, 50, 500, 300]
+    lines = [
+        {"text": "ENTRY", "bbox": [150, 300, 200, 320], "conf": 0.8},
+        {"text": "BATH", "bbox": [420, 220, 460, 240], "conf": 0.3},
+    ]
+    layout = fp2layout.assemble_layout(lines, 600, 400, 0.0, frame=frame)
+    raster = segment_rooms(gray, frame)
+    assert annotate_palace_area(layout["rooms"], raster, 0.0) == 2
+
+    img = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+    out = fp2layout.reocr_region(img, (400, 200, 150, 100), layout, None)
+
+    assert sorted(r["norm_label"] for r in out["rooms"]) == ["entry", "kitchen"]
+    assert all("palace_area" in r for r in out["rooms"])
+    kitchen = next(r for r in out["rooms"] if r["norm_label"] == "kitchen")
+    assert set(kitchen["palace_area"]) <= {"N", "NE", "C", "E", "S", "SE"}
+    assert out["house_facing"] == "SW"
+
+
+def test_clamp_roi():
+    """超出图像的框被裁剪，空框报错"""
+    assert fp2layout.clamp_roi((-10, -10, 50, 50), 100, 80) == (0, 0, 40, 40)
+    try:
+        fp2layout.clamp_roi((200, 10, 50, 50), 100, 80)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("empty ROI should raise")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+修订版平面图增量识别测试
+Differential re-OCR test for revised plans
+"""
+
+import json
+import sys
+
+import cv2
+import pytest
+
+import fp2layout
+from benchmarks.synth_floorplan import render_floorplan
+
+
+def truth_lines(truth):
+    return [
+        {
+            "text": lb["text"],
+            "bbox": [
+                lb["bbox"][0],
+                lb["bbox"][1],
+                lb["bbox"][0] + lb["bbox"][2],
+                lb["bbox"][1] + lb["bbox"][3],
+            ],
+            "conf": 0.9,
+        }
+        for lb in truth["labels"]
+    ]
+
+
+@pytest.fixture
+def revised(monkeypatch):
+    img, truth = render_floorplan(1600, 1200, seed=4)
+    previous = fp2layout.assemble_layout(truth_lines(truth), 1600, 1200, 0.0)
+    # 修订：第一个房间改名为 STUDY
+    new = img.copy()
+    l, t, w, h = truth["labels"][0]["bbox"]
+    new[t : t + h, l : l + w] = 255
+    cv2.putText(new, "STUDY", (l, t + h - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.9, 0, 2)
+
+    crops = []
+
+    def fake_ocr_lines(prep, detect_scale=None):
+        crops.append(prep.shape)
+        return [{"text": "STUDY", "bbox": [5, 5, 80, 30], "conf": 0.8}]
+
+    monkeypatch.setattr(fp2layout, "ocr_lines", fake_ocr_lines)
+    return img, new, previous, truth, crops
+
+
+def test_only_changed_region_is_reocred(revised):
+    img, new, previous, truth, crops = revised
+    layout = fp2layout.revise_layout(new, img, previous)
+
+    rev = layout["revision"]
+    assert rev["mode"] == "diff"
+    assert rev["kept_rooms"] == len(previous["rooms"]) - 1
+    assert len(crops) == 1 and crops[0][0] * crops[0][1] < 0.05 * 1600 * 1200
+    raw = [r["raw_text"] for r in layout["rooms"]]
+    assert truth["labels"][0]["text"] not in raw
+    assert "STUDY" in raw and len(raw) == len(previous["rooms"])
+
+
+def test_resized_revision_is_registered(revised):
+    img, new, previous, _, crops = revised
+    small = cv2.resize(new, (1200, 900), interpolation=cv2.INTER_AREA)
+    layout = fp2layout.revise_layout(small, img, previous)
+    assert layout["revision"]["mode"] == "diff"
+    assert layout["image_size"] == {"width": 1200, "height": 900}
+    assert len(crops) == 1
+    kept = {r["raw_text"]: r for r in layout["rooms"]}
+    for room in previous["rooms"][1:]:
+        l, t, w, h = room["bbox"]
+        nl, nt, _, _ = kept[room["raw_text"]]["bbox"]
+        assert abs(nl - l * 0.75) <= 2 and abs(nt - t * 0.75) <= 2
+
+
+def test_unrelated_image_falls_back_to_full_ocr(revised):
+    img, _, previous, _, crops = revised
+    other, _ = render_floorplan(1600, 1200, seed=30)
+    layout = fp2layout.revise_layout(other, img, previous)
+    assert layout["revision"]["mode"] == "full"
+
+
+def test_changed_region_escalates_when_key_label_is_gone(monkeypatch):
+    """变化区域走 detect_layout 的识别流程：改掉的是厨房时照样升级补识别"""
+    img, truth = render_floorplan(1600, 1200, seed=4)
+    previous = fp2layout.assemble_layout(truth_lines(truth), 1600, 1200, 0.0, "S")
+    (kitchen,) = [lb for lb in truth["labels"] if lb["text"] == "KITCHEN"]
+    new = img.copy()
+    l, t, w, h = kitchen["bbox"]
+    new[t : t + h, l : l + w] = 255
+    cv2.putText(new, "STUDY", (l, t + h - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.9, 0, 2)
+
+    crops = []
+
+    def fake_ocr_lines(prep, detect_scale=None):
+        crops.append(prep.shape)
+        return [{"text": "STUDY", "bbox": [5, 5, 80, 30], "conf": 0.8}]
+
+    monkeypatch.setattr(fp2layout, "ocr_lines", fake_ocr_lines)
+    layout = fp2layout.revise_layout(new, img, previous, house_facing="S")
+    assert layout["revision"]["mode"] == "diff"
+    # 首轮 + 旋转 90°/270°（Tesseract 下第 1 步与首轮相同被跳过）
+    assert len(crops) > 1
+    assert all(a * b < 0.05 * 1600 * 1200 for a, b in crops)
+
+
+def test_cli_revision_keeps_previous_north_deg(revised, tmp_path, monkeypatch):
+    """--revise-from 不给 --north-deg 时沿用上一版的 north_deg"""
+    img, new, previous, _, _ = revised
+    previous = dict(previous, north_deg=90.0)
+    paths = {k: str(tmp_path / k) for k in ("new.png", "old.png", "old.json")}
+    cv2.imwrite(paths["new.png"], new)
+    cv2.imwrite(paths["old.png"], img)
+    with open(paths["old.json"], "w", encoding="utf-8") as f:
+        json.dump(previous, f)
+    out = str(tmp_path / "layout.json")
+    argv = ["fp2layout.py", "--image", paths["new.png"], "--out", out]
+    argv += ["--revise-from", paths["old.png"], "--previous-layout", paths["old.json"]]
+    monkeypatch.setattr(sys, "argv", argv)
+    fp2layout.main()
+    with open(out, encoding="utf-8") as f:
+        layout = json.load(f)
+    assert layout["revision"]["mode"] == "diff" and layout["north_deg"] == 90.0
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+房间分割与九宫面积占比测试
+Room segmentation and palace occupancy tests
+"""
+
+import cv2
+import numpy as np
+
+import fp2layout
+from room_regions import segment_rooms
+from zhongxuan_scorer import score_layout
+
+FRAME = (100, 100, 600, 400)
+
+
+def three_rooms() -> np.ndarray:
+    """左侧竖条 A + 右上 B + 右下 C，内墙各留一个门洞"""
+    img = np.full((600, 800), 255, np.uint8)
+    cv2.rectangle(img, (100, 100), (700, 500), 0, 8)
+    cv2.line(img, (300, 100), (300, 500), 0, 6)
+    cv2.line(img, (300, 300), (700, 300), 0, 6)
+    cv2.line(img, (300, 200), (300, 240), 255, 8)  # A-B 门洞
+    cv2.line(img, (450, 300), (500, 300), 255, 8)  # B-C 门洞
+    cv2.putText(img, "BED 2", (420, 210), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+    return img
+
+
+def test_rooms_are_separated_despite_door_gaps():
+    raster = segment_rooms(three_rooms(), FRAME)
+    a, b, c = (raster.region_at(x, y) for x, y in [(200, 300), (500, 150), (500, 450)])
+    assert len({a, b, c}) == 3 and 0 not in (a, b, c)
+    assert raster.region_at(50, 50) == 0  # 平面外
+    assert len(raster.region_ids) == 3
+
+
+def test_palace_fractions_follow_north_rotation():
+    raster = segment_rooms(three_rooms(), FRAME)
+    b = raster.region_at(500, 150)
+    # B 占外框 u∈[1/3,1], v∈[0,1/2]：N、NE 各 1/3，C、E 各 1/6
+    got = raster.occupancy(0.0).fractions(b)
+    want = {"N": 1 / 3, "NE": 1 / 3, "C": 1 / 6, "E": 1 / 6}
+    assert set(got) == set(want)
+    for p, f in want.items():
+        assert abs(got[p] - f) < 0.03
+    # 北朝下时九宫整体翻转
+    flipped = raster.occupancy(180.0).fractions(b)
+    assert set(flipped) == {"S", "SW", "C", "W"}
+    assert abs(flipped["S"] - got["N"]) < 0.03
+
+
+def test_detect_layout_attaches_palace_area(monkeypatch):
+    def fake_ocr_lines(prep, detect_scale=None):
+        # 坐标相对于外框裁剪图；落在 B 内
+        return [{"text": "KITCHEN", "bbox": [300, 60, 400, 90], "conf": 0.9}]
+
+    monkeypatch.setattr(fp2layout, "ocr_lines", fake_ocr_lines)
+    img = cv2.cvtColor(three_rooms(), cv2.COLOR_GRAY2BGR)
+    layout = fp2layout.detect_layout(img, 0.0, "S", escalate=False)
+    (room,) = layout["rooms"]
+    assert room["palace9"] == "N"
+    assert set(room["palace_area"]) == {"N", "NE", "C", "E"}
+    assert abs(sum(room["palace_area"].values()) - 1.0) < 1e-3
+
+
+def test_scorer_weights_by_palace_area():
+    room = {
+        "norm_label": "kitchen",
+        "palace9": "N",
+        "center_xy": (0.5, 0.2),
+        "bbox": (0, 0, 10, 10),
+    }
+    point = score_layout({"house_facing": "S", "rooms": [dict(room)]})
+    area = score_layout(
+        {"house_facing": "S", "rooms": [dict(room, palace_area={"N": 0.4, "C": 0.6})]}
+    )
+    k = point["breakdown"]["kitchen"]["score"]
+    assert area["breakdown"]["kitchen"]["score"] == int(round(0.4 * k - 6))
+    assert point["breakdown"]["center_c"]["score"] == 0
+    assert area["breakdown"]["center_c"]["score"] == -3
+
+
+def test_explanations_follow_area_weights():
+    """跨宫房间的说明逐宫列出占比与加权分，与得分一致"""
+    rooms = [
+        {"norm_label": "kitchen", "palace9": "N", "palace_area": {"N": 0.3, "C": 0.7}},
+        {"norm_label": "bath", "palace9": "E", "palace_area": {"E": 0.6, "NE": 0.4}},
+        {"norm_label": "laundry", "palace9": "W"},
+    ]
+    for r, xy in zip(rooms, [(0.5, 0.1), (0.9, 0.5), (0.1, 0.5)]):
+        r.update(center_xy=xy, bbox=(0, 0, 10, 10))
+    for lang in ("zh", "en"):
+        bd = score_layout({"house_facing": "S", "rooms": rooms}, language=lang)
+        kitchen = bd["breakdown"]["kitchen"]["why"]
+        # 标题按占比最大的中宫，明细列出两宫
+        assert "中宫" in kitchen or "center palace" in kitchen
+        assert "C 70% -7.0" in kitchen and "N 30% -2.4" in kitchen
+        assert bd["breakdown"]["kitchen"]["score"] == int(round(-7.0 - 2.4))
+        # 跨宫的浴室逐宫列出，只在一宫的洗衣房仍是整数分
+        wet = bd["breakdown"]["bath_laundry"]["why"]
+        assert "E 60% -1.2" in wet and "NE 40% +0.8" in wet and "W+2" in wet
+        assert bd["breakdown"]["bath_laundry"]["score"] == int(round(-1.2 + 0.8 + 2))
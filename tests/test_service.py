@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+评分服务测试（仅本机）
+Scoring service test (localhost only)
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("tornado")
+from tornado.testing import AsyncHTTPTestCase
+
+import service
+
+LAYOUT = {
+    "house_facing": "S",
+    "rooms": [
+        {"norm_label": "entry", "palace9": "S", "center_xy": [0.5, 0.9]},
+        {"norm_label": "kitchen", "palace9": "E", "center_xy": [0.8, 0.5]},
+    ],
+}
+
+
+class ServiceTest(AsyncHTTPTestCase):
+    def get_app(self):
+        self.pool = service.OcrPool(workers=1, max_queue=0, executor="thread")
+        return service.make_app(self.pool)
+
+    def tearDown(self):
+        self.pool.shutdown()
+        super().tearDown()
+
+    def test_health_and_ready(self):
+        assert self.fetch("/healthz").code == 200
+        assert self.fetch("/readyz").code == 503
+        self.io_loop.run_sync(self.pool.start)
+        resp = self.fetch("/readyz")
+        assert resp.code == 200 and json.loads(resp.body)["status"] == "ready"
+
+    def test_score_endpoint(self):
+        resp = self.fetch(
+            "/v1/score?hemisphere=southern&language=en",
+            method="POST",
+            body=json.dumps(LAYOUT),
+        )
+        assert resp.code == 200
+        data = json.loads(resp.body)
+        assert "Southern Hemisphere" in data["house_gua"]
+
+        bad = self.fetch("/v1/score", method="POST", body=json.dumps({"rooms": []}))
+        assert bad.code == 400 and "house_facing" in json.loads(bad.body)["error"]
+        bad = self.fetch("/v1/score?language=fr", method="POST", body="{}")
+        assert bad.code == 400
+
+    def test_analyze_and_backpressure(self):
+        """队列满时返回 429，释放后正常返回结果"""
+        release = threading.Event()
+
+        def slow_analyze(data, north_deg, house_facing):
+            release.wait(5)
+            return {**LAYOUT, "north_deg": north_deg, "image_size": {}}
+
+        orig = service.analyze_image
+        service.analyze_image = slow_analyze
+        try:
+            url = self.get_url("/v1/analyze?north_deg=0&language=en")
+            first = self.http_client.fetch(
+                url, method="POST", body=b"png", raise_error=False
+            )
+
+            async def wait_busy():
+                while self.pool.inflight < 1:
+                    await asyncio.sleep(0.01)
+
+            self.io_loop.run_sync(wait_busy)
+            # 不同的图片不会与正在进行的分析合并
+            busy = self.fetch("/v1/analyze", method="POST", body=b"other")
+            assert busy.code == 429 and busy.headers["Retry-After"] == "1"
+
+            release.set()
+            resp = self.io_loop.run_sync(lambda: first)
+            assert resp.code == 200
+            data = json.loads(resp.body)
+            assert data["layout"]["house_facing"] == "S"
+            assert data["score"]["total"] >= 0
+        finally:
+            service.analyze_image = orig
+            release.set()
+
+        assert self.fetch("/v1/analyze", method="POST", body=b"").code == 400
+        metrics = self.fetch("/metrics").body.decode("utf-8")
+        assert "fengshui_ocr_queue_depth 0" in metrics
+
+    def test_analyze_coalesces_identical_requests(self):
+        """相同图片 + 参数的并发请求只分析一次"""
+        calls = []
+        release = threading.Event()
+
+        def counting_analyze(data, north_deg, house_facing):
+            calls.append(data)
+            release.wait(5)
+            return {**LAYOUT, "north_deg": north_deg, "image_size": {}}
+
+        orig = service.analyze_image
+        service.analyze_image = counting_analyze
+        try:
+            url = self.get_url("/v1/analyze?north_deg=0")
+            reqs = [
+                self.http_client.fetch(url, method="POST", body=b"same")
+                for _ in range(3)
+            ]
+
+            async def wait_started():
+                while not calls:
+                    await asyncio.sleep(0.01)
+                release.set()
+                return await asyncio.gather(*reqs)
+
+            resps = self.io_loop.run_sync(wait_started)
+            assert [r.code for r in resps] == [200, 200, 200]
+            # 完成后的短期缓存
+            assert self.fetch(url, method="POST", body=b"same").code == 200
+            assert len(calls) == 1
+        finally:
+            service.analyze_image = orig
+            release.set()
+
+
+def test_process_pool_reports_worker_counters():
+    """进程池模式：工作进程里的 OCR 计数器在主进程的 /metrics 中可见"""
+    import cv2
+
+    import fp2layout
+    from benchmarks.synth_floorplan import render_floorplan
+    from pipeline_metrics import REGISTRY
+
+    img, _ = render_floorplan(400, 300, seed=1)
+    data = cv2.imencode(".png", img)[1].tobytes()
+    name = "fengshui_ocr_requests_total"
+    labels = {"engine": fp2layout.OCR_ENGINE_NAME}
+    before = REGISTRY.get_sample_value(name, labels) or 0.0
+
+    async def run():
+        pool = service.OcrPool(workers=1, max_queue=0, executor="process")
+        try:
+            await pool.analyze(data, 0.0, "S")
+        except Exception:
+            pass  # 没装 OCR 引擎时解析失败，但引擎已被调用并计数
+        finally:
+            pool.executor.shutdown(wait=True)
+
+    asyncio.run(run())
+    assert (REGISTRY.get_sample_value(name, labels) or 0.0) > before
+    assert f'{name}{{engine="{labels["engine"]}"}}' in REGISTRY.render()
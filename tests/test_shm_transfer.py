@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+共享内存传图测试
+Shared-memory transfer tests
+"""
+
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from shm_transfer import ShmRing, call_with_shm
+
+
+def _shm_exists(name):
+    return os.path.exists(os.path.join("/dev/shm", name.lstrip("/")))
+
+
+def test_ring_round_trip_reuse_and_cleanup():
+    img = np.arange(120 * 80, dtype=np.uint8).reshape(120, 80)
+    with ShmRing(slots=1) as ring:
+        handle = ring.put(img)
+        assert len(pickle.dumps(handle)) < 300
+        assert ring.free == 0
+        assert call_with_shm(lambda a: a.copy(), handle).tolist() == img.tolist()
+        with pytest.raises(ValueError):  # 工作进程拿到的是只读视图
+            call_with_shm(lambda a: a.fill(0), handle)
+        ring.release(handle)
+
+        # 更大的图重新分配块，旧块被 unlink
+        big = np.ones((300, 400, 3), np.uint8)
+        handle2 = ring.put(big)
+        assert handle2.shape == (300, 400, 3)
+        assert call_with_shm(lambda a: int(a.sum()), handle2) == big.size
+        ring.release(handle2)
+        names = [handle.name, handle2.name]
+    if os.path.isdir("/dev/shm"):
+        assert not any(_shm_exists(n) for n in names)
+
+
+def test_ring_blocks_when_full_and_releases_on_error():
+    with ShmRing(slots=1) as ring:
+        handle = ring.put(np.zeros((4, 4), np.uint8))
+        with pytest.raises(TimeoutError):
+            ring.put(np.zeros((4, 4), np.uint8), timeout=0.05)
+        ring.release(handle)
+        with pytest.raises(TypeError):
+            ring.put(object())  # 无法拷贝的数据也要归还块
+        assert ring.free == 1
+
+
+def test_put_stack_writes_layers_in_place(monkeypatch):
+    """put_stack 逐层写入块，与 np.stack 结果一致，不先拼出中间数组"""
+    gray = np.arange(60 * 40, dtype=np.uint8).reshape(60, 40)
+    prep = 255 - gray
+    stacks = []
+    monkeypatch.setattr(np, "stack", lambda *a, **k: stacks.append(a) or None)
+    with ShmRing(slots=1) as ring:
+        handle = ring.put_stack((gray, prep))
+        assert handle.shape == (2, 60, 40) and not stacks
+        pair = call_with_shm(lambda a: a.copy(), handle)
+        assert (pair[0] == gray).all() and (pair[1] == prep).all()
+        ring.release(handle)
+        with pytest.raises(ValueError):  # 形状不同不能叠放，块也要归还
+            ring.put_stack((gray, prep[:10]))
+        assert ring.free == 1
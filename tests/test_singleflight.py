@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+相同请求合并测试
+Single-flight coalescing tests
+"""
+
+import asyncio
+
+import pytest
+
+from singleflight import AsyncSingleFlight, request_key
+
+
+def test_request_key_depends_on_content_and_params():
+    a = request_key(b"img", north_deg=0.0, house_facing=None)
+    assert a == request_key(b"img", house_facing=None, north_deg=0.0)
+    assert a != request_key(b"img2", north_deg=0.0, house_facing=None)
+    assert a != request_key(b"img", north_deg=90.0, house_facing=None)
+
+
+def test_async_singleflight_runs_once_and_copies():
+    flight = AsyncSingleFlight(ttl=5)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"rooms": [1]}
+
+    async def main():
+        results = await asyncio.gather(*[flight.do("k", work) for _ in range(4)])
+        assert len(calls) == 1 and len(results) == 4
+        results[0]["rooms"].append(2)
+        assert results[1] == {"rooms": [1]}
+        # 缓存命中
+        assert await flight.do("k", work) == {"rooms": [1]} and len(calls) == 1
+
+    asyncio.run(main())
+
+
+def test_async_singleflight_propagates_errors_without_caching():
+    flight = AsyncSingleFlight(ttl=5)
+    calls = []
+
+    async def boom():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("bad image")
+
+    async def main():
+        outs = await asyncio.gather(
+            *[flight.do("k", boom) for _ in range(3)], return_exceptions=True
+        )
+        assert all(isinstance(o, ValueError) for o in outs)
+        assert flight.inflight == 0
+        with pytest.raises(ValueError):
+            await flight.do("k", boom)
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_async_singleflight_survives_waiter_cancellation():
+    flight = AsyncSingleFlight(ttl=0)
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == {"ok": True}
+
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+空间索引、标签片段合并与房间关系测试
+Spatial index, label fragment merging and room relation tests
+"""
+
+import random
+
+from fp2layout import merge_fragments, normalize_lines
+from spatial_index import GridIndex
+from zhongxuan_scorer import room_index, rooms_near, score_layout
+
+
+def line(text, l, t, r, b, conf=0.9):
+    return {"text": text, "bbox": [l, t, r, b], "conf": conf}
+
+
+def test_grid_index_matches_brute_force():
+    rng = random.Random(0)
+    boxes = {}
+    index = GridIndex(cell=50)
+    for i in range(300):
+        x, y = rng.uniform(0, 1000), rng.uniform(0, 1000)
+        boxes[i] = (x, y, x + rng.uniform(0, 80), y + rng.uniform(0, 30))
+        index.insert(i, boxes[i])
+    for k in range(0, 300, 3):
+        index.remove(k)
+        del boxes[k]
+    for _ in range(50):
+        x, y = rng.uniform(0, 1000), rng.uniform(0, 1000)
+        q = (x, y, x + 120, y + 60)
+        want = [
+            k
+            for k, (l, t, r, b) in boxes.items()
+            if l <= q[2] and r >= q[0] and t <= q[3] and b >= q[1]
+        ]
+        assert index.query(q) == want
+
+
+def test_split_labels_are_merged_before_normalization():
+    lines = [
+        line("MASTER", 100, 100, 180, 120),
+        line("BED", 190, 100, 230, 120),
+        line("WALK IN", 400, 100, 480, 120, conf=0.7),
+        line("ROBE", 410, 126, 460, 146),
+        line("KITCHEN", 600, 100, 690, 120),
+        line("3.6 x 4.2", 600, 126, 680, 140),
+        line("BED", 100, 400, 140, 420),
+    ]
+    merged = merge_fragments(lines)
+    texts = [ln["text"] for ln in merged]
+    assert texts == ["MASTER BED", "WALK IN ROBE", "KITCHEN", "3.6 x 4.2", "BED"]
+    assert merged[1]["bbox"] == [400, 100, 480, 146]
+    assert merged[1]["conf"] == 0.7
+    labels = [norm[0] for _, norm in normalize_lines(lines)]
+    assert labels == ["master_bedroom", "wir", "kitchen", "bedroom"]
+
+
+def test_distinct_rooms_on_one_line_are_not_merged():
+    lines = [line("BATH", 100, 100, 150, 120), line("BED 3", 160, 100, 220, 120)]
+    assert merge_fragments(lines) == lines
+
+
+def room(label, x, y, palace="N"):
+    return {"norm_label": label, "center_xy": (x, y), "palace9": palace}
+
+
+def test_throughline_checks_every_entry():
+    rooms = [
+        room("entry", 0.2, 0.9, "SW"),
+        room("porch", 0.7, 0.95, "SE"),
+        room("alfresco", 0.72, 0.1, "NE"),
+    ]
+    result = score_layout({"house_facing": "S", "rooms": rooms})
+    assert result["breakdown"]["throughline"]["score"] == -8
+
+
+def test_rooms_near_finds_adjacent_wet_areas():
+    rooms = [
+        room("kitchen", 0.5, 0.2),
+        room("bath", 0.6, 0.25, "N"),
+        room("laundry", 0.5, 0.8, "S"),
+        room("bedroom", 0.45, 0.2),
+    ]
+    index = room_index(rooms)
+    near = rooms_near(index, rooms, rooms[0], {"bath", "laundry"})
+    assert near == [rooms[1]]
+    wide = rooms_near(index, rooms, rooms[0], {"bath", "laundry"}, 0.7)
+    assert sorted(r["norm_label"] for r in wide) == ["bath", "laundry"]
+    # 邻近关系不改变厨房得分
+    far = [rooms[0], rooms[2]]
+    a = score_layout({"house_facing": "S", "rooms": far})["breakdown"]["kitchen"]
+    b = score_layout({"house_facing": "S", "rooms": rooms})["breakdown"]["kitchen"]
+    assert a == b
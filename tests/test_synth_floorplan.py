@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+合成平面图生成器测试
+Synthetic floorplan generator test
+"""
+
+import numpy as np
+
+from benchmarks.bench_pipeline import match_labels
+from benchmarks.synth_floorplan import check_vocab, render_floorplan
+
+
+def test_vocab_matches_room_patterns():
+    """生成器词汇必须能被 ROOM_PATTERNS 归一化为对应类型"""
+    assert check_vocab() == []
+
+
+def test_deterministic_and_in_bounds():
+    """同一种子生成完全相同的图与真值，标签框都在图内"""
+    img1, truth1 = render_floorplan(800, 600, seed=7)
+    img2, truth2 = render_floorplan(800, 600, seed=7)
+    assert np.array_equal(img1, img2)
+    assert truth1 == truth2
+
+    labels = {lb["norm_label"] for lb in truth1["labels"]}
+    assert {"entry", "kitchen", "master_bedroom"} <= labels
+    for lb in truth1["labels"]:
+        l, t, w, h = lb["bbox"]
+        assert 0 <= l and l + w <= 800 and 0 <= t and t + h <= 600
+        # 标签区域里确实画了文字
+        assert img1[t : t + h, l : l + w].min() < 128
+
+
+def test_match_labels():
+    """真值与检测结果的匹配统计"""
+    _, truth = render_floorplan(800, 600, seed=1)
+    rooms = [
+        {"norm_label": lb["norm_label"], "bbox": lb["bbox"], "palace9": lb["palace9"]}
+        for lb in truth["labels"]
+    ]
+    stats = match_labels(truth["labels"], rooms[:-1])
+    assert stats["matched"] == len(rooms) - 1
+    assert stats["palace_ok"] == stats["matched"]
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+合成 layout 语料测试
+Synthetic layout corpus test
+"""
+
+from benchmarks.synth_layouts import (
+    PALACE_CELLS,
+    generate_layouts,
+    read_jsonl,
+    write_jsonl,
+)
+from zhongxuan_scorer import score_layout
+
+
+def test_layouts_are_deterministic_and_scorable(tmp_path):
+    """同一种子可复现，中心坐标落在所属宫格内，且都能评分"""
+    a = list(generate_layouts(200, seed=3))
+    assert a == list(generate_layouts(200, seed=3))
+
+    for layout in a:
+        for r in layout["rooms"]:
+            col, row = PALACE_CELLS[r["palace9"]]
+            x, y = r["center_xy"]
+            assert col / 3 <= x <= (col + 1) / 3 and row / 3 <= y <= (row + 1) / 3
+        result = score_layout(layout, "southern", "en")
+        assert 0 <= result["total"] <= 100
+
+    path = tmp_path / "layouts.jsonl"
+    write_jsonl(str(path), 50, seed=3)
+    assert list(read_jsonl(str(path))) == a[:50]
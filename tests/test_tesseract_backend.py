@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+进程内 Tesseract 后端与词->行聚合测试
+In-process Tesseract backend and word-to-line aggregation tests
+"""
+
+import random
+from types import SimpleNamespace
+
+import numpy as np
+
+import fp2layout
+
+
+def loop_aggregate(data):
+    """旧版逐词循环实现，作为对照"""
+    lines = {}
+    for i in range(len(data["text"])):
+        conf = float(data["conf"][i])
+        if conf < 0:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        l, t = int(data["left"][i]), int(data["top"][i])
+        r, b = l + int(data["width"][i]), t + int(data["height"][i])
+        v = lines.setdefault(key, {"text": [], "bbox": [l, t, r, b], "confs": []})
+        v["text"].append(str(data["text"][i]).strip())
+        v["confs"].append(conf)
+        v["bbox"] = [
+            min(v["bbox"][0], l),
+            min(v["bbox"][1], t),
+            max(v["bbox"][2], r),
+            max(v["bbox"][3], b),
+        ]
+    out = []
+    for v in lines.values():
+        joined = " ".join(x for x in v["text"] if x)
+        if joined.strip():
+            out.append(
+                {"text": joined, "bbox": v["bbox"], "conf": float(np.mean(v["confs"]))}
+            )
+    return out
+
+
+def random_words(seed, n=400):
+    rng = random.Random(seed)
+    cols = {c: [] for c in fp2layout._TSV_COLUMNS}
+    for _ in range(n):
+        row = {
+            "level": 5,
+            "page_num": 1,
+            "block_num": rng.randint(1, 4),
+            "par_num": rng.randint(1, 2),
+            "line_num": rng.randint(1, 6),
+            "word_num": 1,
+            "left": rng.randint(0, 2000),
+            "top": rng.randint(0, 1500),
+            "width": rng.randint(5, 120),
+            "height": rng.randint(8, 30),
+            "conf": rng.choice(["-1", "12.5", "96", "70.25", 88]),
+            "text": rng.choice(["BED", "", "KITCHEN", " ", "3.6x4.2"]),
+        }
+        for c, v in row.items():
+            cols[c].append(v)
+    return cols
+
+
+def test_vectorized_aggregation_matches_loop():
+    for seed in range(5):
+        data = random_words(seed)
+        got = fp2layout.words_to_lines(data)
+        want = loop_aggregate(data)
+        assert [(g["text"], g["bbox"]) for g in got] == [
+            (w["text"], w["bbox"]) for w in want
+        ]
+        assert np.allclose([g["conf"] for g in got], [w["conf"] for w in want])
+    assert fp2layout.words_to_lines({c: [] for c in fp2layout._TSV_COLUMNS}) == []
+
+
+class FakeApi:
+    created = 0
+
+    def __init__(self, **kwargs):
+        FakeApi.created += 1
+        self.kwargs = kwargs
+
+    def SetImageBytes(self, data, w, h, bpp, bpl):
+        assert len(data) == w * h and bpp == 1 and bpl == w
+        self.size = (w, h)
+
+    def Recognize(self):
+        pass
+
+    def GetTSVText(self, page):
+        w, h = self.size
+        return (
+            "1\t1\t0\t0\t0\t0\t0\t0\t%d\t%d\t-1\t\n"
+            "5\t1\t1\t1\t1\t1\t10\t20\t60\t18\t91\tMASTER\n"
+            "5\t1\t1\t1\t1\t2\t75\t21\t40\t18\t87\tBED\n"
+            "5\t1\t1\t1\t2\t1\t10\t60\t80\t18\t95\tKITCHEN\n" % (w, h)
+        )
+
+
+def test_in_process_engine_is_reused(monkeypatch):
+    fake = SimpleNamespace(
+        PyTessBaseAPI=FakeApi,
+        PSM=SimpleNamespace(SINGLE_BLOCK=6),
+        OEM=SimpleNamespace(DEFAULT=3),
+    )
+    monkeypatch.setattr(fp2layout, "tesserocr", fake, raising=False)
+    monkeypatch.setattr(fp2layout, "TESSERACT_BACKEND", "tesserocr")
+    monkeypatch.setattr(fp2layout, "_tesseract_local", fp2layout.threading.local())
+    FakeApi.created = 0
+
+    img = np.full((120, 200, 3), 255, np.uint8)
+    for _ in range(3):
+        lines = fp2layout.ocr_with_tesseract(img)
+    assert FakeApi.created == 1
+    assert lines == [
+        {"text": "MASTER BED", "bbox": [10, 20, 115, 39], "conf": 89.0},
+        {"text": "KITCHEN", "bbox": [10, 60, 90, 78], "conf": 95.0},
+    ]
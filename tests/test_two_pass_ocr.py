@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+双分辨率 OCR 测试（伪造 EasyOCR reader）
+Two-resolution OCR test with a fake EasyOCR reader
+"""
+
+import numpy as np
+
+import fp2layout
+
+
+class FakeReader:
+    def __init__(self):
+        self.calls = []
+
+    def readtext(self, img):
+        self.calls.append(("readtext", img.shape))
+        return []
+
+    def detect(self, img):
+        self.calls.append(("detect", img.shape))
+        # 缩小图上的框：[x_min, x_max, y_min, y_max]
+        return [[[100, 140, 50, 60]]], [[]]
+
+    def recognize(self, img, horizontal_list, free_list):
+        self.calls.append(("recognize", img.shape))
+        x0, x1, y0, y1 = horizontal_list[0]
+        return [([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], "KITCHEN", 0.9)]
+
+
+def test_detect_on_downscaled_recognize_on_full(monkeypatch):
+    reader = FakeReader()
+    monkeypatch.setattr(fp2layout, "get_easyocr_reader", lambda: reader)
+    img = np.zeros((2400, 3200), np.uint8)
+
+    lines = fp2layout.ocr_with_easyocr(img, detect_scale=0.25)
+
+    assert reader.calls == [("detect", (600, 800)), ("recognize", (2400, 3200))]
+    (line,) = lines
+    # 检测框放大 4 倍并外扩 4 像素
+    assert line["text"] == "KITCHEN"
+    assert line["bbox"] == [396, 196, 564, 244]
+
+
+def test_scale_chosen_from_image_size(monkeypatch):
+    reader = FakeReader()
+    monkeypatch.setattr(fp2layout, "get_easyocr_reader", lambda: reader)
+    assert fp2layout.choose_detect_scale((2400, 3200)) == 0.4
+    fp2layout.ocr_with_easyocr(np.zeros((600, 800), np.uint8))
+    assert reader.calls == [("readtext", (600, 800))]
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+矢量平面图（SVG / DXF）文字提取测试
+Vector floorplan (SVG / DXF) ingestion tests
+"""
+
+import cv2
+import pytest
+
+import fp2layout
+from benchmarks.synth_floorplan import render_floorplan
+from vector_plans import is_vector_plan, mtext_plain, read_vector_plan
+
+
+def plan_svg(truth) -> bytes:
+    """合成平面图的真值 -> SVG：外墙矩形 + 居中的 <text>（y 为基线）"""
+    l, t, w, h = truth["plan_bbox"]
+    W, H = truth["image_size"]["width"], truth["image_size"]["height"]
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{W}" height="{H}">',
+        f'<rect x="{l}" y="{t}" width="{w}" height="{h}" fill="none"/>',
+    ]
+    for lb in truth["labels"]:
+        bl, bt, bw, bh = lb["bbox"]
+        fs = bh * 0.6
+        cx, cy = bl + bw / 2, bt + bh / 2
+        out.append(
+            f'<text x="{cx}" y="{cy + 0.3 * fs}" font-size="{fs}" '
+            f'text-anchor="middle">{lb["text"]}</text>'
+        )
+    out.append("</svg>")
+    return "\n".join(out).encode()
+
+
+def dxf(*entities) -> bytes:
+    rows = ["0", "SECTION", "2", "ENTITIES"]
+    for kind, groups in entities:
+        rows += ["0", kind]
+        for code, value in groups:
+            rows += [str(code), str(value)]
+    rows += ["0", "ENDSEC", "0", "EOF"]
+    return "\n".join(rows).encode()
+
+
+def test_svg_matches_raster_truth():
+    _, truth = render_floorplan(1600, 1200, seed=4)
+    plan = read_vector_plan(plan_svg(truth))
+    assert plan.kind == "svg" and plan.size == (1600, 1200)
+    assert plan.frame == truth["plan_bbox"]
+
+    layout = fp2layout.assemble_layout(plan.lines, *plan.size, 0.0, frame=plan.frame)
+    got = sorted((r["raw_text"], r["palace9"], r["conf"]) for r in layout["rooms"])
+    want = sorted((lb["text"], lb["palace9"], 1.0) for lb in truth["labels"])
+    assert got == want
+
+
+def test_svg_transforms_and_viewbox():
+    svg = b"""<?xml version="1.0"?>
+<svg xmlns="http://www.w3.org/2000/svg" viewBox="100 100 500 400" width="1000">
+  <g transform="translate(100 100) scale(2)">
+    <text x="50" y="40" style="font-size:10px">KITCHEN</text>
+    <text x="150" y="100" font-size="10" transform="rotate(90 150 100)">
+      <tspan>MASTER</tspan> <tspan>BED</tspan>
+    </text>
+    <text x="200" y="150" font-size="10"><tspan x="200">ENTRY</tspan>
+      <tspan x="200" dy="1.2em">HALL</tspan></text>
+  </g>
+</svg>"""
+    plan = read_vector_plan(svg)
+    # 只给了 width：高度按 viewBox 宽高比推出
+    assert plan.size == (1000, 800)
+    by_text = {ln["text"]: ln["bbox"] for ln in plan.lines}
+    assert set(by_text) == {"KITCHEN", "MASTER BED", "ENTRY", "HALL"}
+    l, t, r, b = by_text["KITCHEN"]
+    # x: (100 + 2 * 50 - 100) * 2 = 200；字号 10 * 2 * 2 = 40 像素
+    assert l == 200 and r - l == round(0.6 * 40 * 7)
+    l, t, r, b = by_text["MASTER BED"]
+    assert b - t > 3 * (r - l)  # 旋转 90° 后是竖排框
+    assert by_text["HALL"][1] > by_text["ENTRY"][3] - 5
+
+
+def test_dxf_text_and_mtext():
+    data = dxf(
+        (
+            "LWPOLYLINE",
+            [
+                (90, 4),
+                (10, 0),
+                (20, 0),
+                (10, 20),
+                (20, 0),
+                (10, 20),
+                (20, 10),
+                (10, 0),
+                (20, 10),
+            ],
+        ),
+        ("TEXT", [(10, 2), (20, 8), (40, 0.5), (1, "KITCHEN")]),
+        (
+            "MTEXT",
+            [(10, 15), (20, 2), (40, 0.4), (71, 5), (1, r"{\fArial|b1;MASTER}\PBED")],
+        ),
+        (
+            "TEXT",
+            [(10, 10), (20, 5), (11, 10), (21, 5), (40, 0.5), (72, 4), (1, "ENTRY")],
+        ),
+    )
+    assert is_vector_plan(data)
+    plan = read_vector_plan(data)
+    assert plan.kind == "dxf" and plan.size == (2000, 1000)
+    assert plan.frame == [0, 0, 2000, 1000]
+    by_text = {ln["text"]: ln["bbox"] for ln in plan.lines}
+    assert set(by_text) == {"KITCHEN", "MASTER", "BED", "ENTRY"}
+    # Y 轴翻转：y=8 在图纸上方 -> 图像上部
+    assert by_text["KITCHEN"][3] == 200 and by_text["KITCHEN"][0] == 200
+    assert by_text["MASTER"][3] < by_text["BED"][1] + 1
+    l, t, r, b = by_text["ENTRY"]
+    assert abs((l + r) / 2 - 1000) <= 1 and abs((t + b) / 2 - 500) <= 1
+
+    layout = fp2layout.assemble_layout(plan.lines, *plan.size, 0.0, frame=plan.frame)
+    palaces = {r["norm_label"]: r["palace9"] for r in layout["rooms"]}
+    assert palaces["kitchen"] == "NW" and palaces["entry"] == "C"
+
+
+def test_mtext_formatting_is_stripped():
+    assert mtext_plain(r"{\H1.5x;\C1;LIVING}\P\LDINING\l") == ["LIVING", "DINING"]
+    assert mtext_plain(r"BED\~2") == ["BED 2"]
+
+
+def test_detect_layout_skips_ocr_for_vector_input(monkeypatch, tmp_path):
+    def no_ocr(*args, **kwargs):
+        raise AssertionError("OCR should not run for vector plans")
+
+    monkeypatch.setattr(fp2layout, "ocr_lines", no_ocr)
+    img, truth = render_floorplan(1600, 1200, seed=6)
+    svg = plan_svg(truth)
+    layout = fp2layout.detect_layout(svg, 0.0, "S", metrics=True)
+    assert layout["metrics"]["recognizer"] == "vector"
+    assert layout["footprint"] == truth["plan_bbox"]
+    assert len(layout["rooms"]) == len(truth["labels"])
+
+    path = tmp_path / "plan.svg"
+    path.write_bytes(svg)
+    by_path = fp2layout.detect_layout(str(path), 0.0, "S")
+    assert by_path["rooms"] == layout["rooms"]
+
+    assert not is_vector_plan(cv2.imencode(".png", img)[1].tobytes())
+    assert not is_vector_plan(img)
+
+
+def test_rejects_bad_vector_input():
+    with pytest.raises(ValueError):
+        read_vector_plan(b"AutoCAD Binary DXF\r\n\x1a\x00")
+    with pytest.raises(ValueError):
+        read_vector_plan(b"<svg xmlns='http://www.w3.org/2000/svg'><text>")
+
+
+def test_batch_pipeline_reads_vector_plans(monkeypatch, tmp_path):
+    import asyncio
+
+    from async_pipeline import analyze_batch
+
+    def no_ocr(*args, **kwargs):
+        raise AssertionError("OCR should not run for vector plans")
+
+    monkeypatch.setattr(fp2layout, "ocr_lines", no_ocr)
+    _, truth = render_floorplan(1600, 1200, seed=6)
+    path = tmp_path / "plan.dxf"
+    path.write_bytes(
+        dxf(
+            ("LINE", [(10, 0), (20, 0), (11, 20), (21, 10)]),
+            ("TEXT", [(10, 9), (20, 1), (40, 0.5), (1, "ENTRY")]),
+        )
+    )
+    results = asyncio.run(
+        analyze_batch([plan_svg(truth), str(path)], executor="thread", ocr_workers=1)
+    )
+    assert [r.error for r in results] == [None, None]
+    assert len(results[0].layout["rooms"]) == len(truth["labels"])
+    assert results[1].layout["rooms"][0]["norm_label"] == "entry"
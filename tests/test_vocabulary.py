@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+房间词表受限识别测试
+Room-vocabulary constrained recognition tests
+"""
+
+import shlex
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import fp2layout
+from fp2layout import lexicon_decode, normalize_label
+
+
+def line(text, conf=0.8):
+    return {"text": text, "bbox": [0, 0, 100, 20], "conf": conf}
+
+
+def test_vocabulary_matches_room_patterns():
+    for phrase in fp2layout.ROOM_VOCABULARY:
+        assert normalize_label(phrase) is not None, phrase
+    assert "x" not in fp2layout.ROOM_ALLOWLIST.lower()
+
+
+@pytest.mark.parametrize(
+    "raw, want",
+    [
+        ("KITCHFN", "KITCHEN"),
+        ("BEDR00M 2", "BEDROOM 2"),
+        ("BED2", "BED 2"),
+        ("Master Bed", "MASTER BED"),
+        ("L'DRY", "LDRY"),
+        ("WALK-IN ROBE", "WALK IN ROBE"),
+        ("LAUNDRY 3.6 x 2.1", "LAUNDRY"),
+    ],
+)
+def test_lexicon_corrects_labels(raw, want):
+    out = lexicon_decode([line(raw)])
+    assert [ln["text"] for ln in out] == [want]
+    assert normalize_label(out[0]["text"]) == normalize_label(want)
+
+
+def test_lexicon_rejects_non_labels():
+    lines = [line(t) for t in ("3.6 x 4.2", "D1", "W2 1200", "NOTES", "2400", "BATH")]
+    assert [ln["text"] for ln in lexicon_decode(lines)] == ["BATH"]
+
+
+def test_vocabulary_mode_is_applied_in_ocr_lines(monkeypatch):
+    seen = []
+
+    def fake_tesseract(img, allowlist=None):
+        seen.append(allowlist)
+        return [line("KITCHEM"), line("3600 x 2400")]
+
+    monkeypatch.setattr(fp2layout, "EASYOCR_AVAILABLE", False)
+    monkeypatch.setattr(fp2layout, "TESSERACT_AVAILABLE", True)
+    monkeypatch.setattr(fp2layout, "ocr_with_tesseract", fake_tesseract)
+    monkeypatch.setattr(fp2layout, "OCR_VOCABULARY", "off")
+
+    assert len(fp2layout.ocr_lines(None)) == 2
+    fp2layout.warm_up("lexicon")
+    assert [ln["text"] for ln in fp2layout.ocr_lines(None)] == ["KITCHEN"]
+    assert seen == [None, fp2layout.ROOM_ALLOWLIST]
+    with pytest.raises(ValueError):
+        fp2layout.set_ocr_vocabulary("strict")
+
+
+def test_pytesseract_config_survives_shlex(monkeypatch):
+    """白名单含 '：config 必须能被 pytesseract 的 shlex.split 正确拆分"""
+    seen = []
+
+    def image_to_data(img, lang, config, output_type):
+        seen.append(shlex.split(config))  # 与 pytesseract 内部相同
+        return {k: [] for k in fp2layout._TSV_COLUMNS}
+
+    fake = SimpleNamespace(image_to_data=image_to_data, Output=SimpleNamespace(DICT=1))
+    monkeypatch.setattr(fp2layout, "pytesseract", fake, raising=False)
+    monkeypatch.setattr(fp2layout, "TESSERACT_BACKEND", "pytesseract")
+    monkeypatch.setattr(fp2layout, "OCR_MODEL_DIR", None)
+    fp2layout.ocr_with_tesseract(np.zeros((20, 20), np.uint8), fp2layout.ROOM_ALLOWLIST)
+    args = seen[0]
+    value = args[args.index("-c") + 1]
+    assert value == "tessedit_char_whitelist=" + fp2layout.ROOM_ALLOWLIST.replace(
+        " ", ""
+    )
+    assert "'" in value
@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+矢量平面图（SVG / DXF）文字提取
+Read room labels straight from vector floorplans (SVG / DXF), no OCR.
+
+开发商和设计院给的平面图经常本来就是矢量文件，文字以文本实体保存，
+栅格化后再 OCR 既慢又会引入识别错误。这里直接解析文本实体及其位置，
+产出与 OCR 相同格式的行（整图像素坐标 bbox [l, t, r, b]，conf=1.0），
+交给 fp2layout.assemble_layout 走同一条归一化 -> 方位 -> 九宫流程。
+
+- SVG：<text>/<tspan> 的 x/y、font-size、text-anchor 与各级 transform；
+  画布取 viewBox（有 width/height 时按其换算为像素）。
+- DXF（ASCII）：ENTITIES 段的 TEXT / MTEXT；Y 轴翻转为图像坐标，
+  按最长边 VECTOR_SIDE 像素换算。
+- 文本框宽度按平均字宽估计（矢量文件不带字形度量），只用于定位中心。
+- 墙线等几何图元的外包框作为平面外框（九宫按其划分）。
+
+只依赖标准库。
+"""
+
+import math
+import os
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+VECTOR_SUFFIXES = {".svg": "svg", ".dxf": "dxf"}
+VECTOR_SIDE = 2000  # DXF（图纸单位）换算到像素后的最长边
+CHAR_WIDTH = 0.6  # 平均字宽 / 字高
+ASCENT = 0.8  # 基线以上高度 / 字号（SVG 的 y 为基线）
+LINE_SPACING = 1.5  # MTEXT 行距 / 字高
+FOOTPRINT_MIN_AREA = 0.2  # 几何外包框小于画布的该比例时不当作外框
+SNIFF_BYTES = 1024
+
+Matrix = Tuple[float, float, float, float, float, float]  # SVG (a b c d e f)
+IDENTITY: Matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+@dataclass
+class VectorPlan:
+    lines: List[Dict]  # 与 fp2layout.ocr_lines 相同：text / bbox [l, t, r, b] / conf
+    size: Tuple[int, int]  # 画布 (W, H) 像素
+    frame: Optional[List[int]]  # 平面外框 (l, t, w, h)，无几何图元时为 None
+    kind: str  # "svg" / "dxf"
+
+
+def vector_kind(source) -> Optional[str]:
+    """按扩展名或文件头判断：返回 "svg" / "dxf"，栅格图或数组返回 None"""
+    if isinstance(source, str):
+        return VECTOR_SUFFIXES.get(os.path.splitext(source)[1].lower())
+    if not isinstance(source, (bytes, bytearray, memoryview)):
+        return None
+    head = bytes(source[:SNIFF_BYTES]).lstrip(b"\xef\xbb\xbf \t\r\n")
+    if head.startswith(b"<"):
+        return "svg" if b"<svg" in head else None
+    parts = head.split(b"\n", 2)
+    if len(parts) > 2 and parts[0].strip() == b"0" and parts[1].strip() == b"SECTION":
+        return "dxf"
+    return None
+
+
+def is_vector_plan(source) -> bool:
+    return vector_kind(source) is not None
+
+
+def read_vector_plan(source: Union[str, bytes]) -> VectorPlan:
+    """矢量平面图（路径或文件字节）-> VectorPlan；无法识别时抛 ValueError"""
+    kind = vector_kind(source)
+    if kind is None:
+        raise ValueError("not an SVG or DXF floorplan")
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            data = f.read()
+    else:
+        data = bytes(source)
+    return read_svg(data) if kind == "svg" else read_dxf(data)
+
+
+# ---- 公共几何 ----
+
+
+def text_box(
+    x: float, y0: float, y1: float, width: float, anchor: float
+) -> List[Tuple[float, float]]:
+    """锚点 x、纵向范围 [y0, y1]、宽度、水平对齐比例（0 左 / 0.5 中 / 1 右）-> 四角"""
+    l = x - anchor * width
+    return [(l, y0), (l + width, y0), (l + width, y1), (l, y1)]
+
+
+def bounds(points: Iterable[Tuple[float, float]]) -> Tuple[float, float, float, float]:
+    xs, ys = zip(*points)
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def make_line(text: str, corners: Sequence[Tuple[float, float]]) -> Dict:
+    l, t, r, b = bounds(corners)
+    return {
+        "text": text,
+        "bbox": [round(l), round(t), round(r), round(b)],
+        "conf": 1.0,
+    }
+
+
+def geometry_frame(
+    points: List[Tuple[float, float]], W: int, H: int
+) -> Optional[List[int]]:
+    """几何图元外包框 (l, t, w, h)；太小（只是图例、比例尺）时返回 None"""
+    if not points:
+        return None
+    l, t, r, b = bounds(points)
+    l, t = max(l, 0.0), max(t, 0.0)
+    r, b = min(r, float(W)), min(b, float(H))
+    if r <= l or b <= t or (r - l) * (b - t) < FOOTPRINT_MIN_AREA * W * H:
+        return None
+    return [round(l), round(t), round(r - l), round(b - t)]
+
+
+# ---- SVG ----
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_TRANSFORM = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+_PATH_TOKEN = re.compile(
+    r"[MmLlHhVvCcSsQqTtAaZz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+)
+_PATH_ARGS = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7}
+_SHAPES = {"line", "rect", "polyline", "polygon", "path"}
+
+
+def _tag(el: ET.Element) -> str:
+    return el.tag.rsplit("}", 1)[-1] if isinstance(el.tag, str) else ""
+
+
+def _numbers(s: Optional[str]) -> List[float]:
+    return [float(v) for v in _NUMBER.findall(s or "")]
+
+
+def _length(s: Optional[str], font_size: float = 16.0) -> Optional[float]:
+    """SVG 长度（px / pt / em 等）-> 用户单位；缺省或百分比时返回 None"""
+    if not s or s.strip().endswith("%"):
+        return None
+    m = _NUMBER.match(s.strip())
+    if not m:
+        return None
+    v, unit = float(m.group()), s.strip()[m.end() :].strip()
+    if unit == "em":
+        return v * font_size
+    return v * {
+        "pt": 4 / 3,
+        "pc": 16.0,
+        "mm": 96 / 25.4,
+        "cm": 96 / 2.54,
+        "in": 96.0,
+    }.get(unit, 1.0)
+
+
+def _multiply(m: Matrix, n: Matrix) -> Matrix:
+    a, b, c, d, e, f = m
+    a2, b2, c2, d2, e2, f2 = n
+    return (
+        a * a2 + c * b2,
+        b * a2 + d * b2,
+        a * c2 + c * d2,
+        b * c2 + d * d2,
+        a * e2 + c * f2 + e,
+        b * e2 + d * f2 + f,
+    )
+
+
+def _apply(m: Matrix, x: float, y: float) -> Tuple[float, float]:
+    a, b, c, d, e, f = m
+    return a * x + c * y + e, b * x + d * y + f
+
+
+def parse_transform(s: Optional[str]) -> Matrix:
+    m = IDENTITY
+    for name, args in _TRANSFORM.findall(s or ""):
+        v = _numbers(args)
+        if name == "matrix" and len(v) == 6:
+            t = tuple(v)
+        elif name == "translate" and v:
+            t = (1.0, 0.0, 0.0, 1.0, v[0], v[1] if len(v) > 1 else 0.0)
+        elif name == "scale" and v:
+            t = (v[0], 0.0, 0.0, v[1] if len(v) > 1 else v[0], 0.0, 0.0)
+        elif name == "rotate" and v:
+            r = math.radians(v[0])
+            cos, sin = math.cos(r), math.sin(r)
+            t = (cos, sin, -sin, cos, 0.0, 0.0)
+            if len(v) == 3:
+                cx, cy = v[1], v[2]
+                t = _multiply((1.0, 0.0, 0.0, 1.0, cx, cy), t)
+                t = _multiply(t, (1.0, 0.0, 0.0, 1.0, -cx, -cy))
+        elif name == "skewX" and v:
+            t = (1.0, 0.0, math.tan(math.radians(v[0])), 1.0, 0.0, 0.0)
+        elif name == "skewY" and v:
+            t = (1.0, math.tan(math.radians(v[0])), 0.0, 1.0, 0.0, 0.0)
+        else:
+            continue
+        m = _multiply(m, t)
+    return m
+
+
+def _style(el: ET.Element, name: str) -> Optional[str]:
+    """表现属性，style="..." 中的同名声明优先"""
+    for decl in (el.get("style") or "").split(";"):
+        key, _, value = decl.partition(":")
+        if key.strip() == name:
+            return value.strip()
+    return el.get(name)
+
+
+def path_points(d: str) -> List[Tuple[float, float]]:
+    """路径各段端点（曲线只取端点，足够估计外包框）"""
+    pts: List[Tuple[float, float]] = []
+    x = y = sx = sy = 0.0
+    cmd = None
+    tokens = _PATH_TOKEN.findall(d or "")
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok.isalpha():
+            cmd = tok
+            i += 1
+            if cmd in "Zz":
+                x, y = sx, sy
+                continue
+        if cmd is None or cmd in "Zz":
+            break
+        n = _PATH_ARGS[cmd.upper()]
+        chunk = tokens[i : i + n]
+        if len(chunk) < n or any(t.isalpha() for t in chunk):
+            break
+        args = [float(v) for v in chunk]
+        i += n
+        rel = cmd.islower()
+        up = cmd.upper()
+        if up == "H":
+            x = args[0] + (x if rel else 0.0)
+        elif up == "V":
+            y = args[0] + (y if rel else 0.0)
+        else:
+            x, y = (args[-2] + x, args[-1] + y) if rel else (args[-2], args[-1])
+        if up == "M":
+            sx, sy = x, y
+            cmd = "l" if rel else "L"  # M 后续坐标对按 L 处理
+        pts.append((x, y))
+    return pts
+
+
+def shape_points(el: ET.Element, tag: str) -> List[Tuple[float, float]]:
+    if tag == "line":
+        v = [_length(el.get(k)) or 0.0 for k in ("x1", "y1", "x2", "y2")]
+        return [(v[0], v[1]), (v[2], v[3])]
+    if tag == "rect":
+        x, y = _length(el.get("x")) or 0.0, _length(el.get("y")) or 0.0
+        w, h = _length(el.get("width")) or 0.0, _length(el.get("height")) or 0.0
+        return [(x, y), (x + w, y), (x + w, y + h), (x, y + h)] if w and h else []
+    if tag in ("polyline", "polygon"):
+        v = _numbers(el.get("points"))
+        return list(zip(v[0::2], v[1::2]))
+    return path_points(el.get("d", ""))
+
+
+def _text_runs(el: ET.Element, x: float, y: float, font_size: float):
+    """
+    <text> -> [(文字, x, y, font_size, tspan 元素或 None)]。
+    带 x/y/dy 的 tspan 另起一行（多行标签导出的常见写法），其余内联拼接。
+    """
+    runs = [[el.text or "", x, y, font_size, None]]
+    for child in el:
+        if _tag(child) != "tspan":
+            runs[-1][0] += "".join(child.itertext()) + (child.tail or "")
+            continue
+        fs = _length(_style(child, "font-size"), font_size) or font_size
+        xs, ys = _numbers(child.get("x")), _numbers(child.get("y"))
+        dy = _length(child.get("dy"), fs)
+        if xs or ys or dy:
+            nx = xs[0] if xs else runs[-1][1]
+            ny = ys[0] if ys else runs[-1][2]
+            runs.append(["".join(child.itertext()), nx, ny + (dy or 0.0), fs, child])
+        else:
+            runs[-1][0] += "".join(child.itertext())
+        runs[-1][0] += child.tail or ""
+    return [tuple(r) for r in runs if r[0].strip()]
+
+
+def read_svg(data: bytes) -> VectorPlan:
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError as e:
+        raise ValueError(f"cannot parse SVG: {e}") from None
+    if _tag(root) != "svg":
+        raise ValueError("not an SVG document")
+
+    vb = _numbers(root.get("viewBox"))
+    width, height = _length(root.get("width")), _length(root.get("height"))
+    if len(vb) == 4 and vb[2] > 0 and vb[3] > 0:
+        # 只给一边时另一边按 viewBox 宽高比推出
+        W = width or (height * vb[2] / vb[3] if height else vb[2])
+        H = height or W * vb[3] / vb[2]
+        # viewBox -> 像素（忽略 preserveAspectRatio，按各轴独立缩放）
+        base = (W / vb[2], 0.0, 0.0, H / vb[3], -vb[0] * W / vb[2], -vb[1] * H / vb[3])
+    elif width and height:
+        W, H, base = width, height, IDENTITY
+    else:
+        W = H = None
+        base = IDENTITY
+
+    lines: List[Dict] = []
+    geometry: List[Tuple[float, float]] = []
+
+    def walk(el: ET.Element, m: Matrix, font_size: float, anchor: str) -> None:
+        tag = _tag(el)
+        if tag in ("defs", "symbol", "clipPath", "mask", "title", "desc", "metadata"):
+            return
+        m = _multiply(m, parse_transform(el.get("transform")))
+        font_size = _length(_style(el, "font-size"), font_size) or font_size
+        anchor = _style(el, "text-anchor") or anchor
+        if tag == "text":
+            xs, ys = _numbers(el.get("x")), _numbers(el.get("y"))
+            x, y = (xs or [0.0])[0], (ys or [0.0])[0]
+            for text, tx, ty, fs, span in _text_runs(el, x, y, font_size):
+                a = (
+                    _style(span, "text-anchor") if span is not None else None
+                ) or anchor
+                text = " ".join(text.split())
+                corners = text_box(
+                    tx,
+                    ty - ASCENT * fs,
+                    ty + (1 - ASCENT) * fs,
+                    CHAR_WIDTH * fs * len(text),
+                    {"middle": 0.5, "end": 1.0}.get(a, 0.0),
+                )
+                lines.append(make_line(text, [_apply(m, px, py) for px, py in corners]))
+            return
+        if tag in _SHAPES:
+            geometry.extend(_apply(m, px, py) for px, py in shape_points(el, tag))
+        for child in el:
+            walk(child, m, font_size, anchor)
+
+    walk(root, base, 16.0, "start")
+
+    if W is None:  # 没有画布尺寸：取全部内容的外包框
+        pts = geometry + [pt for ln in lines for pt in _corners(ln["bbox"])]
+        if not pts:
+            raise ValueError("SVG has no size and no content")
+        l, t, r, b = bounds(pts)
+        lines = [_shift(ln, -l, -t) for ln in lines]
+        geometry = [(x - l, y - t) for x, y in geometry]
+        W, H = r - l, b - t
+    W, H = max(1, round(W)), max(1, round(H))
+    return VectorPlan(lines, (W, H), geometry_frame(geometry, W, H), "svg")
+
+
+def _corners(bbox: Sequence[float]) -> List[Tuple[float, float]]:
+    l, t, r, b = bbox
+    return [(l, t), (r, b)]
+
+
+def _shift(ln: Dict, dx: float, dy: float) -> Dict:
+    l, t, r, b = ln["bbox"]
+    return dict(ln, bbox=[round(l + dx), round(t + dy), round(r + dx), round(b + dy)])
+
+
+# ---- DXF ----
+
+_MTEXT_CODE = re.compile(r"\\[ACFHQTWfp][^;\\{}]*;|\\[LlOoKk]")
+_MTEXT_ATTACH = {  # 71 -> (水平对齐比例, 垂直对齐比例：0 顶 / 0.5 中 / 1 底)
+    1: (0.0, 0.0),
+    2: (0.5, 0.0),
+    3: (1.0, 0.0),
+    4: (0.0, 0.5),
+    5: (0.5, 0.5),
+    6: (1.0, 0.5),
+    7: (0.0, 1.0),
+    8: (0.5, 1.0),
+    9: (1.0, 1.0),
+}
+_TEXT_HALIGN = {1: 0.5, 2: 1.0, 4: 0.5}  # 72：0 左 1 中 2 右 4 居中（3/5 按左）
+_TEXT_VALIGN = {1: 0.0, 2: 0.5, 3: 1.0}  # 73：基线/底 0、中 0.5、顶 1（基线以上比例）
+
+
+def dxf_pairs(data: bytes) -> List[Tuple[int, str]]:
+    """ASCII DXF -> [(组码, 值)]"""
+    if data.startswith(b"AutoCAD Binary DXF"):
+        raise ValueError("binary DXF is not supported, export as ASCII DXF")
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        text = data.decode("cp1252", errors="replace")
+    rows = text.splitlines()
+    pairs = []
+    for i in range(0, len(rows) - 1, 2):
+        try:
+            pairs.append((int(rows[i].strip()), rows[i + 1].strip()))
+        except ValueError:
+            raise ValueError(f"malformed DXF group code at line {i + 1}") from None
+    return pairs
+
+
+def dxf_entities(
+    pairs: List[Tuple[int, str]],
+) -> List[Tuple[str, Dict[int, List[str]]]]:
+    """ENTITIES 段 -> [(实体类型, {组码: [值...]})]"""
+    out: List[Tuple[str, Dict[int, List[str]]]] = []
+    section, i = None, 0
+    while i < len(pairs):
+        code, value = pairs[i]
+        if code == 0 and value == "SECTION" and i + 1 < len(pairs):
+            section = pairs[i + 1][1]
+            i += 2
+            continue
+        if code == 0 and value == "ENDSEC":
+            section = None
+        elif code == 0 and section == "ENTITIES":
+            out.append((value, {}))
+        elif section == "ENTITIES" and out:
+            out[-1][1].setdefault(code, []).append(value)
+        i += 1
+    return out
+
+
+def mtext_plain(s: str) -> List[str]:
+    """去掉 MTEXT 格式码，按 \\P 分行"""
+    s = s.replace("\\P", "\n").replace("\\~", " ")
+    s = _MTEXT_CODE.sub("", s)
+    s = re.sub(r"\\S([^;]*)[#^/]([^;]*);", r"\1/\2", s)  # 堆叠分数
+    s = s.replace("{", "").replace("}", "").replace("\\\\", "\\")
+    return [" ".join(part.split()) for part in s.split("\n")]
+
+
+def _f(g: Dict[int, List[str]], code: int, default: float = 0.0) -> float:
+    try:
+        return float(g[code][0])
+    except (KeyError, IndexError, ValueError):
+        return default
+
+
+def _rotate(
+    corners: List[Tuple[float, float]], ox: float, oy: float, deg: float
+) -> List[Tuple[float, float]]:
+    r = math.radians(deg)
+    cos, sin = math.cos(r), math.sin(r)
+    return [
+        (ox + (x - ox) * cos - (y - oy) * sin, oy + (x - ox) * sin + (y - oy) * cos)
+        for x, y in corners
+    ]
+
+
+def dxf_text_boxes(kind: str, g: Dict[int, List[str]]):
+    """TEXT / MTEXT -> [(文字, 图纸坐标四角)]（Y 轴向上）"""
+    h = _f(g, 40, 1.0) or 1.0
+    if kind == "TEXT":
+        text = " ".join(mtext_plain(g.get(1, [""])[0]))
+        halign, valign = int(_f(g, 72)), int(_f(g, 73))
+        x, y = _f(g, 10), _f(g, 20)
+        if (halign or valign) and 11 in g:
+            x, y = _f(g, 11), _f(g, 21)
+        ax = _TEXT_HALIGN.get(halign, 0.0)
+        # 72=4（Middle）同时垂直居中
+        rise = (0.5 if halign == 4 else _TEXT_VALIGN.get(valign, 0.0)) * h
+        corners = text_box(x, y - rise, y - rise + h, CHAR_WIDTH * h * len(text), ax)
+        return [(text, _rotate(corners, x, y, _f(g, 50)))] if text else []
+
+    rows = mtext_plain("".join(g.get(3, [])) + "".join(g.get(1, [])))
+    x, y = _f(g, 10), _f(g, 20)
+    if 11 in g:
+        angle = math.degrees(math.atan2(_f(g, 21), _f(g, 11)))
+    else:
+        angle = _f(g, 50)
+    ax, ay = _MTEXT_ATTACH.get(int(_f(g, 71, 1)), (0.0, 0.0))
+    total = h * (1 + LINE_SPACING * (len(rows) - 1))
+    top = y + ay * total
+    out = []
+    for k, text in enumerate(rows):
+        if not text:
+            continue
+        y1 = top - k * LINE_SPACING * h
+        corners = text_box(x, y1 - h, y1, CHAR_WIDTH * h * len(text), ax)
+        out.append((text, _rotate(corners, x, y, angle)))
+    return out
+
+
+def dxf_geometry(kind: str, g: Dict[int, List[str]]) -> List[Tuple[float, float]]:
+    if kind == "LINE":
+        return [(_f(g, 10), _f(g, 20)), (_f(g, 11), _f(g, 21))]
+    if kind in ("LWPOLYLINE", "VERTEX", "POINT", "SOLID", "3DFACE"):
+        xs = [float(v) for v in g.get(10, [])]
+        ys = [float(v) for v in g.get(20, [])]
+        return list(zip(xs, ys))
+    if kind in ("CIRCLE", "ARC"):
+        x, y, r = _f(g, 10), _f(g, 20), _f(g, 40)
+        return [(x - r, y - r), (x + r, y + r)]
+    return []
+
+
+def read_dxf(data: bytes) -> VectorPlan:
+    texts, geometry = [], []
+    for kind, g in dxf_entities(dxf_pairs(data)):
+        if kind in ("TEXT", "MTEXT"):
+            texts.extend(dxf_text_boxes(kind, g))
+        else:
+            geometry.extend(dxf_geometry(kind, g))
+    pts = geometry + [pt for _, corners in texts for pt in corners]
+    if not pts:
+        raise ValueError("DXF has no drawable entities")
+    l, t, r, b = bounds(pts)
+    scale = VECTOR_SIDE / max(r - l, b - t, 1e-9)
+    W, H = max(1, round((r - l) * scale)), max(1, round((b - t) * scale))
+
+    def to_px(p: Tuple[float, float]) -> Tuple[float, float]:
+        return (p[0] - l) * scale, (b - p[1]) * scale  # Y 轴翻转
+
+    lines = [make_line(text, [to_px(p) for p in corners]) for text, corners in texts]
+    frame = geometry_frame([to_px(p) for p in geometry], W, H)
+    return VectorPlan(lines, (W, H), frame, "dxf")
@@ -5,8 +5,13 @@ import argparse
 import json
 import math
 import sys
+import time
 from collections import Counter, defaultdict
 
+from instrumentation import finish, make_timer
+from pipeline_metrics import SCORE_SECONDS, SCORES
+from spatial_index import GridIndex
+
 # 北半球风水理论
 EAST_GOOD_NORTHERN = {"N", "E", "SE", "S"}
 WEST_GOOD_NORTHERN = {"NW", "NE", "W", "SW"}
@@ -83,6 +88,7 @@ EN_TEXTS = {
             "offenders": "Center palace contains: {offenders}",
             "safe": "Center palace is safe",
         },
+        "by_area": " (by area: {terms})",
         "throughline": {
             "detected": "Entry and back door alignment - suspected direct line through",
             "not_detected": "Not detected/not applicable",
@@ -111,10 +117,16 @@ LABEL_BUCKET = {
 def load_layout(path: str) -> dict:
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
+    return validate_layout(data)
+
+
+def validate_layout(data: dict) -> dict:
     if "house_facing" not in data:
         raise ValueError("layout.json 需包含 house_facing (N/NE/E/SE/S/SW/W/NW)")
     if data["house_facing"] not in ALL_DIR8:
         raise ValueError("house_facing 取值应为: " + ",".join(ALL_DIR8))
+    if not isinstance(data.get("rooms"), list):
+        raise ValueError("layout.json 需包含 rooms 列表")
     return data
 
 
@@ -164,6 +176,95 @@ def in_set(palace: str, s: set):
     return palace in s
 
 
+def palace_shares(room: dict):
+    """[(宫位, 权重)]：有 palace_area（房间面积在各宫的占比）时按面积，否则按标签中心所在宫"""
+    area = room.get("palace_area")
+    if area:
+        return list(area.items())
+    return [(room["palace9"], 1.0)]
+
+
+def area_weighted(room: dict, rule) -> float:
+    """rule(宫位) -> 分数，按面积占比加权；每个房间最多 9 项"""
+    return sum(w * rule(p) for p, w in palace_shares(room))
+
+
+def main_palace(room: dict) -> str:
+    """面积占比最大的宫位（无 palace_area 时即标签中心所在宫），用于说明文字"""
+    return max(palace_shares(room), key=lambda pw: pw[1])[0]
+
+
+def area_terms(room: dict, rule, language: str = "zh") -> str:
+    """跨宫房间逐宫列出占比与加权分（如 "NE 60% +7.2, E 40% -4.8"）；只在一宫时为空"""
+    shares = sorted(palace_shares(room), key=lambda pw: -pw[1])
+    if len(shares) < 2:
+        return ""
+    sep = ", " if language == "en" else "，"
+    return sep.join(f"{p} {w:.0%} {w * rule(p):+.1f}" for p, w in shares)
+
+
+def area_note(room: dict, rule, language: str = "zh") -> str:
+    """附在说明后的面积明细；只在一宫时为空"""
+    terms = area_terms(room, rule, language)
+    if not terms:
+        return ""
+    if language == "en":
+        return get_localized_text("score_explanations.by_area", language, terms=terms)
+    return f"（按面积：{terms}）"
+
+
+# 房间关系（中心坐标为外框归一化坐标）
+ADJACENT_RADIUS = 0.20  # 中心距离小于该值视为相邻
+THROUGH_DX = 0.10  # 同列容差
+THROUGH_DY = 0.50  # 对穿所需的最小纵向距离
+REAR_OPENINGS = {"alfresco", "backyard", "balcony"}
+
+
+def room_index(rooms: list) -> GridIndex:
+    """按房间中心建网格索引（键为 rooms 下标），邻近/对齐查询不做两两比较"""
+    index = GridIndex(ADJACENT_RADIUS)
+    for i, r in enumerate(rooms):
+        x, y = r["center_xy"]
+        index.insert(i, (x, y, x, y))
+    return index
+
+
+def rooms_near(
+    index: GridIndex,
+    rooms: list,
+    room: dict,
+    labels: set,
+    radius: float = ADJACENT_RADIUS,
+):
+    """中心距离 room 不超过 radius、类别在 labels 中的其他房间"""
+    x, y = room["center_xy"]
+    return [
+        rooms[i]
+        for i in index.near(x, y, radius)
+        if rooms[i] is not room and rooms[i]["norm_label"] in labels
+    ]
+
+
+def rooms_in_column(
+    index: GridIndex,
+    rooms: list,
+    room: dict,
+    labels: set,
+    dx: float = THROUGH_DX,
+    min_dy: float = THROUGH_DY,
+):
+    """与 room 近似同列（|x 差| < dx）且纵向距离 > min_dy 的房间"""
+    x, y = room["center_xy"]
+    hits = index.query((x - dx, -1.0, x + dx, 2.0))
+    return [
+        rooms[i]
+        for i in hits
+        if rooms[i]["norm_label"] in labels
+        and abs(rooms[i]["center_xy"][0] - x) < dx
+        and abs(rooms[i]["center_xy"][1] - y) > min_dy
+    ]
+
+
 def get_localized_text(key_path: str, language: str = "zh", **kwargs) -> str:
     """获取本地化文本"""
     if language == "en":
@@ -182,8 +283,18 @@ def get_localized_text(key_path: str, language: str = "zh", **kwargs) -> str:
 
 
 def score_layout(
-    data: dict, hemisphere: str = "northern", language: str = "zh"
+    data: dict,
+    hemisphere: str = "northern",
+    language: str = "zh",
+    metrics: bool = False,
+    on_metrics=None,
 ) -> dict:
+    """
+    metrics=True 时在结果中附加 "metrics"（各阶段墙钟/CPU 时间），
+    on_metrics 回调同样会收到这份数据。
+    """
+    t0 = time.perf_counter()
+    timer = make_timer("score_layout", metrics, on_metrics)
     facing = data["house_facing"]
     group, gua, good, bad = house_group_and_gua(facing, hemisphere)
 
@@ -206,6 +317,8 @@ def score_layout(
         )
 
     breakdown = {}
+    rooms = data["rooms"]
+    index = room_index(rooms)
 
     # 1) 大门
     door = pick_first(data, LABEL_BUCKET["main_door"])
@@ -252,9 +365,10 @@ def score_layout(
         why = "未检测到主卧"
 
     if master:
-        p = master["palace9"]
+        p = main_palace(master)
+        rule = lambda q: 12 if in_set(q, good) else (-10 if q == "C" else -12)
+        s = area_weighted(master, rule)
         if in_set(p, good):
-            s = 12
             if language == "en":
                 why = get_localized_text(
                     "score_explanations.master_bed.good", language, pos=p
@@ -262,7 +376,6 @@ def score_layout(
             else:
                 why = f"主卧在{p}(吉位)"
         elif p == "C":
-            s = -10
             if language == "en":
                 why = get_localized_text(
                     "score_explanations.master_bed.center", language
@@ -270,14 +383,14 @@ def score_layout(
             else:
                 why = "主卧在中宫不宜"
         else:
-            s = -12
             if language == "en":
                 why = get_localized_text(
                     "score_explanations.master_bed.bad", language, pos=p
                 )
             else:
                 why = f"主卧在{p}(凶位)"
-    breakdown["master_bed"] = {"score": s, "why": why}
+        why += area_note(master, rule, language)
+    breakdown["master_bed"] = {"score": int(round(s)), "why": why}
 
     # 3) 厨房
     kitchens = pick_rooms(data, LABEL_BUCKET["kitchen"])
@@ -290,9 +403,10 @@ def score_layout(
     if kitchens:
         # 若有多个，以第一个为准；其余微调
         main_k = kitchens[0]
-        p = main_k["palace9"]
+        p = main_palace(main_k)
+        rule = lambda q: 10 if in_set(q, bad) and q != "C" else (-10 if q == "C" else -8)
+        s = area_weighted(main_k, rule)
         if in_set(p, bad) and p != "C":
-            s = 10
             if language == "en":
                 why = get_localized_text(
                     "score_explanations.kitchen.bad_drain", language, pos=p
@@ -300,42 +414,43 @@ def score_layout(
             else:
                 why = f"厨房在{p}(凶位)属泄凶"
         elif p == "C":
-            s = -10
             if language == "en":
                 why = get_localized_text("score_explanations.kitchen.center", language)
             else:
                 why = "厨房占中宫不宜"
         else:
-            s = -8
             if language == "en":
                 why = get_localized_text(
                     "score_explanations.kitchen.good_drain", language, pos=p
                 )
             else:
                 why = f"厨房在{p}(吉位)易泄吉"
+        why += area_note(main_k, rule, language)
         # 额外：若同时有卫生间同宫，加微扣
-    breakdown["kitchen"] = {"score": s, "why": why}
+    breakdown["kitchen"] = {"score": int(round(s)), "why": why}
 
     # 4) 卫浴/洗衣（湿区）
     wets = pick_rooms(data, LABEL_BUCKET["wet"])
     s = 0
     hits = []
+    rule = lambda q: -4 if q == "C" else (2 if in_set(q, bad) else -2)
     for w in wets:
-        p = w["palace9"]
-        if p == "C":
-            s -= 4
+        p = main_palace(w)
+        s += area_weighted(w, rule)
+        terms = area_terms(w, rule, language)
+        if terms:  # 跨宫：逐宫列出加权分
+            hits.append(terms)
+        elif p == "C":
             if language == "en":
                 hits.append(get_localized_text("score_explanations.bath_laundry.center", language))
             else:
                 hits.append(f"{p}中宫-4")
         elif in_set(p, bad):
-            s += 2
             if language == "en":
                 hits.append(get_localized_text("score_explanations.bath_laundry.bad", language, pos=p))
             else:
                 hits.append(f"{p}+2")
         else:
-            s -= 2
             if language == "en":
                 hits.append(get_localized_text("score_explanations.bath_laundry.good", language, pos=p))
             else:
@@ -345,22 +460,20 @@ def score_layout(
         why = "; ".join(hits) if hits else get_localized_text("score_explanations.bath_laundry.not_found", language)
     else:
         why = "；".join(hits) if hits else "未检测到湿区"
-    breakdown["bath_laundry"] = {"score": s, "why": why}
+    breakdown["bath_laundry"] = {"score": int(round(s)), "why": why}
 
     # 5) 次卧（整体倾向）
     beds = [r for r in data["rooms"] if r["norm_label"].startswith("bedroom")]
     s = 0
     good_n = bad_n = 0
     for b in beds:
-        p = b["palace9"]
+        p = main_palace(b)
+        s += area_weighted(
+            b, lambda q: 3 if in_set(q, good) else (-4 if q == "C" else -3)
+        )
         if in_set(p, good):
-            s += 3
             good_n += 1
-        elif p == "C":
-            s -= 4
-            bad_n += 1
         else:
-            s -= 3
             bad_n += 1
     
     if language == "en":
@@ -368,30 +481,29 @@ def score_layout(
                                good_count=good_n, bad_count=bad_n)
     else:
         why = f"卧室吉{good_n}间、凶{bad_n}间"
-    breakdown["other_bed"] = {"score": s, "why": why}
+    breakdown["other_bed"] = {"score": int(round(s)), "why": why}
 
     # 6) 车库/储物
     gs = pick_rooms(data, LABEL_BUCKET["garage"])
     s = 0
     for g in gs:
-        p = g["palace9"]
-        if in_set(p, bad) and p != "C":
-            s += 1
+        s += area_weighted(g, lambda q: 1 if in_set(q, bad) and q != "C" else 0)
     
     if language == "en":
         why = get_localized_text("score_explanations.garage_store.summary", language, count=len(gs))
     else:
         why = f"{len(gs)}处，凶位给+1/处"
-    breakdown["garage_store"] = {"score": s, "why": why}
+    breakdown["garage_store"] = {"score": int(round(s)), "why": why}
 
     # 7) 中宫占用
     s = 0
     offenders = []
     for r in data["rooms"]:
-        if r["palace9"] == "C" and r["norm_label"] in (
-            LABEL_BUCKET["kitchen"] | LABEL_BUCKET["wet"]
-        ):
-            s -= 5
+        if r["norm_label"] not in (LABEL_BUCKET["kitchen"] | LABEL_BUCKET["wet"]):
+            continue
+        share = area_weighted(r, lambda q: 1 if q == "C" else 0)
+        if share > 0:
+            s -= 5 * share
             offenders.append(r["norm_label"])
     
     if language == "en":
@@ -402,11 +514,9 @@ def score_layout(
             why = get_localized_text("score_explanations.center_c.safe", language)
     else:
         why = "中宫包含：" + ",".join(offenders) if offenders else "中宫安全"
-    breakdown["center_c"] = {"score": s, "why": why}
+    breakdown["center_c"] = {"score": int(round(s)), "why": why}
 
-    # 8) 穿堂直冲（Entry 与后门/Alfresco 近似对线）
-    entry = door
-    alfresco = pick_first(data, {"alfresco", "backyard", "balcony"})
+    # 8) 穿堂直冲（任一 Entry 与后门/Alfresco 近似对线）
     s = 0
     
     if language == "en":
@@ -414,18 +524,19 @@ def score_layout(
     else:
         why = "未检测/不成立"
     
-    if entry and alfresco:
-        ex, ey = entry["center_xy"]
-        ax, ay = alfresco["center_xy"]
+    for entry in pick_rooms(data, LABEL_BUCKET["main_door"]):
         # 同列（x 差<0.1）且纵向距离>0.5 视为对穿
-        if abs(ex - ax) < 0.10 and abs(ey - ay) > 0.50:
+        if rooms_in_column(index, rooms, entry, REAR_OPENINGS):
             s = -8
             if language == "en":
                 why = get_localized_text("score_explanations.throughline.detected", language)
             else:
                 why = "Entry 与后部主要开口近似同列，疑似穿堂"
+            break
     breakdown["throughline"] = {"score": s, "why": why}
 
+    timer.lap("rules")
+
     # 汇总
     total = sum(v["score"] for v in breakdown.values())
     # 归一到 0-100 区间（硬顶/硬底）
@@ -439,14 +550,19 @@ def score_layout(
             else ("B" if total >= 70 else ("C" if total >= 60 else "D"))
         )
     )
+    advice = build_advice(group, breakdown, hemisphere, language)
+    timer.lap("advice")
     out = {
         "total": int(round(total)),
         "grade": grade,
         "house_gua": house_gua_label,
         "breakdown": breakdown,
-        "advice": build_advice(group, breakdown, hemisphere, language),
+        "advice": advice,
     }
-    return out
+    timer.set(room_count=len(data["rooms"]), hemisphere=hemisphere, language=language)
+    SCORES.inc()
+    SCORE_SECONDS.observe(time.perf_counter() - t0)
+    return finish(timer, out, metrics, on_metrics)
 
 
 def build_advice(
@@ -521,9 +637,14 @@ def main():
         default="zh",
         help="语言选择: zh (中文) 或 en (英文)",
     )
+    ap.add_argument(
+        "--metrics",
+        action="store_true",
+        help="在输出中附加各阶段耗时 (metrics)",
+    )
     args = ap.parse_args()
     data = load_layout(args.layout_json)
-    result = score_layout(data, args.hemisphere, args.language)
+    result = score_layout(data, args.hemisphere, args.language, metrics=args.metrics)
     print(json.dumps(result, ensure_ascii=False, indent=2))
 
 